@@ -12,8 +12,9 @@ from flask_marshmallow import Marshmallow
 import redis
 
 from config import config
+from app.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 socketio = SocketIO()
 login_manager = LoginManager()
 session = Session()
@@ -28,6 +29,9 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    from app.json_provider import AppJSONProvider
+    app.json = AppJSONProvider(app)
+
     if config_name == 'production':
         config[config_name].init_app(app)
 
@@ -45,17 +49,15 @@ def create_app(config_name=None):
 
     create_directories(app)
 
-    # Quick SQLite schema self-heal for dev/demo installs.
-    # If the DB was created with an older schema, new columns (e.g. is_moderator)
-    # are missing and *any* auth query will crash with "no such column".
-    # We keep this narrowly scoped to SQLite.
+    # Schema version check: a single read of schema_version. Pending migrations
+    # run here only when SCHEMA_AUTO_MIGRATE is on; otherwise `flask db-upgrade`.
     with app.app_context():
         try:
             # Make sure all models are imported before calling create_all()/migrations.
             # Otherwise SQLAlchemy may not know about the tables yet and won't create them.
             from app import models  # noqa: F401
-            from app.schema_migration import ensure_sqlite_schema
-            ensure_sqlite_schema(app)
+            from app.schema_migration import check_schema
+            check_schema(app)
         except Exception as e:
             app.logger.warning(f'Schema migration skipped/failed: {e}')
 
@@ -70,7 +72,21 @@ def create_app(config_name=None):
 def initialize_extensions(app):
     global redis_client
 
+    from app.postgres_tuning import configure_engine_options, configure_postgres
+    from app.db_routing import register_replica_bind, init_routing
+    configure_engine_options(app)
+    register_replica_bind(app)
+
     db.init_app(app)
+    init_routing(app)
+
+    from app.sqlite_tuning import configure_sqlite
+    from app.write_queue import write_queue
+    from app.stats import stats
+    configure_postgres(app)
+    configure_sqlite(app)
+    write_queue.init_app(app)
+    stats.init_app(app)
 
     ma.init_app(app)
 
@@ -103,6 +119,11 @@ def initialize_extensions(app):
 
     CORS(app, origins=app.config['CORS_ORIGINS'])
 
+    from app.assets import init_assets
+    from app.compression import init_compression
+    init_assets(app)
+    init_compression(app)
+
     app.logger.info('Extensions initialized successfully')
 
 
@@ -236,6 +257,8 @@ def create_directories(app):
     directories = [
         app.config['UPLOAD_FOLDER'],
         app.config['THUMBNAIL_FOLDER'],
+        app.config['THUMBNAIL_DERIVATIVE_FOLDER'],
+        app.config['PREVIEW_FOLDER'],
         os.path.dirname(app.config['LOG_FILE']),
         app.instance_path,
     ]
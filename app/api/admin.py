@@ -1,29 +1,80 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from app import db
-from app.models import User, Video, VideoReport, Room, Channel
-from app.api.auth import require_auth, require_admin
+from app.models import User, Video, VideoReport
+from app.api.auth import require_auth, require_admin, require_moderator
+from app.db_routing import read_only
+from app.http_cache import channel_tags, invalidate, video_tags
+from app.services.admin_service import AdminService
+from app.services.moderation_service import ModerationService
+from app.stats import stats
 
 admin_bp = Blueprint('admin', __name__)
 
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 500
+MODERATION_QUEUE_PAGE_SIZE = 20
+
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+
+def _page_args():
+    before_id = request.args.get('before', type=int)
+    limit = min(max(request.args.get('limit', ADMIN_PAGE_SIZE, type=int), 1), ADMIN_MAX_PAGE_SIZE)
+    return before_id, limit
+
+
+def _bad_request(message):
+    return jsonify({'error': {'code': 'BAD_REQUEST', 'message': message}}), 400
+
+
+def _id_list(data, key, required=True):
+    ids = data.get(key)
+    if ids is None and not required:
+        return None
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise ValueError(f'{key} must be a non-empty list of integer ids')
+    if len(ids) > ModerationService.MAX_BULK_IDS:
+        raise ValueError(f'at most {ModerationService.MAX_BULK_IDS} ids per request')
+    return list(set(ids))
+
+
+def _export_response(chunks, name, fmt):
+    filename = f"{name}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    # stream_with_context keeps the app context (and the DB session) alive while the body is sent.
+    return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 
 @admin_bp.route('/stats', methods=['GET'])
 @require_auth
 @require_admin
 def get_stats():
-    return jsonify({
-        'users': User.query.count(),
-        'videos': Video.query.count(),
-        'rooms': Room.query.filter_by(is_active=True).count(),
-        'channels': Channel.query.count(),
-        'reports': VideoReport.query.filter_by(status='pending').count()
-    }), 200
+    """Totals, cached for STATS_CACHE_TTL seconds."""
+    return jsonify(stats.totals()), 200
+
+
+@admin_bp.route('/stats/series', methods=['GET'])
+@require_auth
+@require_admin
+def get_stats_series():
+    """Hourly uploads, views, active rooms and active sockets for the last `hours` (max STATS_SERIES_HOURS)."""
+    hours = min(max(request.args.get('hours', 24, type=int), 1), current_app.config['STATS_SERIES_HOURS'])
+    return jsonify(stats.series(hours)), 200
 
 
 @admin_bp.route('/users', methods=['GET'])
 @require_auth
 @require_admin
+@read_only
 def list_users():
-    users = User.query.order_by(User.created_at.desc()).all()
+    """Filter with role, vip, created_from, created_to; page with `before=<last id>`."""
+    try:
+        filters = AdminService.user_filters(request.args)
+    except ValueError as e:
+        return _bad_request(str(e))
+    before_id, limit = _page_args()
+    users = AdminService.list_users(filters, before_id=before_id, limit=limit)
     return jsonify([{
         'id': u.id,
         'username': u.username,
@@ -39,6 +90,22 @@ def list_users():
     } for u in users]), 200
 
 
+@admin_bp.route('/users/export', methods=['GET'])
+@require_auth
+@require_admin
+@read_only
+def export_users():
+    """All users matching the list filters, streamed as `format=ndjson` (default) or `csv`."""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in AdminService.EXPORT_FORMATS:
+        return _bad_request('format must be ndjson or csv')
+    try:
+        filters = AdminService.user_filters(request.args)
+    except ValueError as e:
+        return _bad_request(str(e))
+    return _export_response(AdminService.export_users(filters, fmt), 'users', fmt)
+
+
 @admin_bp.route('/users/<int:user_id>', methods=['PUT'])
 @require_auth
 @require_admin
@@ -59,6 +126,7 @@ def update_user(user_id):
     if 'is_author' in data:
         user.is_author = bool(data['is_author'])
     db.session.commit()
+    invalidate(f'user:{user.id}')
     return jsonify({'message': 'User updated'}), 200
 
 
@@ -71,16 +139,26 @@ def delete_user(user_id):
         return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'User not found'}}), 404
     if user.is_admin:
         return jsonify({'error': {'code': 'FORBIDDEN', 'message': 'Cannot delete admin'}}), 403
+    # Their channel and videos go with them.
+    tags = [f'user:{user.id}', 'feed'] + (channel_tags(user.channel.id) if user.channel else [])
     db.session.delete(user)
     db.session.commit()
+    invalidate(*tags)
     return jsonify({'message': 'User deleted'}), 200
 
 
 @admin_bp.route('/reports', methods=['GET'])
 @require_auth
 @require_admin
+@read_only
 def list_reports():
-    reports = VideoReport.query.order_by(VideoReport.created_at.desc()).all()
+    """Filter with status and video_id; page with `before=<last id>`."""
+    try:
+        filters = AdminService.report_filters(request.args)
+    except ValueError as e:
+        return _bad_request(str(e))
+    before_id, limit = _page_args()
+    reports = AdminService.list_reports(filters, before_id=before_id, limit=limit)
     return jsonify([{
         'id': r.id,
         'video_id': r.video_id,
@@ -91,6 +169,21 @@ def list_reports():
     } for r in reports]), 200
 
 
+@admin_bp.route('/reports/export', methods=['GET'])
+@require_auth
+@require_admin
+@read_only
+def export_reports():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in AdminService.EXPORT_FORMATS:
+        return _bad_request('format must be ndjson or csv')
+    try:
+        filters = AdminService.report_filters(request.args)
+    except ValueError as e:
+        return _bad_request(str(e))
+    return _export_response(AdminService.export_reports(filters, fmt), 'reports', fmt)
+
+
 @admin_bp.route('/reports/<int:report_id>', methods=['PUT'])
 @require_auth
 @require_admin
@@ -105,6 +198,52 @@ def update_report(report_id):
     return jsonify({'message': 'Report updated'}), 200
 
 
+@admin_bp.route('/reports/queue', methods=['GET'])
+@require_auth
+@require_moderator
+@read_only
+def report_queue():
+    """Pending reports grouped by video, most reported first; page with `cursor=<last video_id>`."""
+    cursor = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', MODERATION_QUEUE_PAGE_SIZE, type=int), 1), ADMIN_PAGE_SIZE)
+    return jsonify(ModerationService.report_queue(cursor_video_id=cursor, limit=limit)), 200
+
+
+@admin_bp.route('/reports/bulk', methods=['POST'])
+@require_auth
+@require_moderator
+def bulk_update_reports():
+    """Body: {"report_ids": [...], "video_ids": [...], "status": "resolved" | "dismissed"}.
+
+    `video_ids` selects every pending report of those videos; only pending reports change.
+    """
+    data = request.get_json() or {}
+    try:
+        result = ModerationService.set_report_status(
+            data.get('status'), request.current_user,
+            report_ids=_id_list(data, 'report_ids', required=False),
+            video_ids=_id_list(data, 'video_ids', required=False))
+    except ValueError as e:
+        return _bad_request(str(e))
+    return jsonify(result), 200
+
+
+@admin_bp.route('/videos/bulk-remove', methods=['POST'])
+@require_auth
+@require_moderator
+def bulk_remove_videos():
+    """Body: {"video_ids": [...], "reason_code": ..., "reason_text": ...}; resolves their pending reports."""
+    data = request.get_json() or {}
+    reason_code = (data.get('reason_code') or '').strip().lower()
+    reason_text = (data.get('reason_text') or '').strip() or None
+    try:
+        video_ids = _id_list(data, 'video_ids')
+        result = ModerationService.remove_videos(video_ids, request.current_user, reason_code, reason_text)
+    except ValueError as e:
+        return _bad_request(str(e))
+    return jsonify(result), 200
+
+
 @admin_bp.route('/videos/<int:video_id>', methods=['DELETE'])
 @require_auth
 @require_admin
@@ -112,6 +251,8 @@ def admin_delete_video(video_id):
     video = Video.query.get(video_id)
     if not video:
         return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Video not found'}}), 404
+    tags = video_tags(video)
     db.session.delete(video)
     db.session.commit()
+    invalidate(*tags)
     return jsonify({'message': 'Video deleted'}), 200
@@ -6,6 +6,8 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.services.auth_service import AuthService
 from app.models import User
+from app.db_routing import read_only
+from app.http_cache import conditional, invalidate
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
@@ -262,6 +264,7 @@ def update_profile():
         user.notifications_enabled = bool(data['notifications_enabled'])
 
     db.session.commit()
+    invalidate(f'user:{user.id}')
 
     return jsonify({
         'id': user.id,
@@ -310,10 +313,13 @@ def buy_vip():
     user.mexels -= VIP_COST
     user.is_vip = True
     db.session.commit()
+    invalidate(f'user:{user.id}')
     return jsonify({'message': 'VIP activated!', 'mexels': user.mexels, 'is_vip': True}), 200
 
 
 @auth_bp.route('/users/<int:user_id>', methods=['GET'])
+@read_only
+@conditional(lambda user_id: [f'user:{user_id}'])
 def get_user_profile(user_id):
     user = User.query.get(user_id)
     if not user:
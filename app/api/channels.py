@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from app.services.channel_service import ChannelService
 from app.services.video_service import VideoService
 from app.api.auth import require_auth
+from app.db_routing import read_only
+from app.http_cache import cached, conditional
 from app.models import Channel
 
 video_service = VideoService()
@@ -12,6 +14,8 @@ channel_service = ChannelService()
 
 
 @channels_bp.route('', methods=['GET'])
+@read_only
+@cached(['channels'])
 def list_channels():
     try:
         channels = Channel.query.all()
@@ -83,6 +87,8 @@ def create_channel():
 
 
 @channels_bp.route('/<int:channel_id>', methods=['GET'])
+@conditional(lambda channel_id: [f'channel:{channel_id}'])
+@cached(lambda channel_id: [f'channel:{channel_id}'])
 def get_channel(channel_id):
     channel = channel_service.get_channel(channel_id)
 
@@ -142,6 +148,9 @@ def update_channel(channel_id):
 
 
 @channels_bp.route('/<int:channel_id>/videos', methods=['GET'])
+@read_only
+@conditional(lambda channel_id: [f'channel:{channel_id}'])
+@cached(lambda channel_id: [f'channel:{channel_id}'])
 def get_channel_videos(channel_id):
     status = request.args.get('status')
 
@@ -164,6 +173,7 @@ def get_channel_videos(channel_id):
                     'likes_count': video.likes_count,
                     'dislikes_count': video.dislikes_count,
                     'thumbnail_url': video_service.get_thumbnail_url(video) if hasattr(video_service, 'get_thumbnail_url') else None,
+                    'thumbnail_srcset': video_service.get_thumbnail_srcset(video),
                     'created_at': video.created_at.isoformat()
                 }
                 for video in videos
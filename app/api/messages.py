@@ -1,10 +1,27 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models import DirectMessage, User, Notification
+from app.models import DirectMessage, User
 from app.api.auth import require_auth
+from app.services.message_service import MessageService
+from app.services.notification_service import NotificationService
+from app.websocket.user_events import emit_to_user
 
 messages_bp = Blueprint('messages', __name__)
 
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 200
+
+
+def message_to_dict(m):
+    return {
+        'id': m.id,
+        'sender_id': m.sender_id,
+        'recipient_id': m.recipient_id,
+        'content': m.content,
+        'is_read': m.is_read,
+        'created_at': m.created_at.isoformat()
+    }
+
 
 @messages_bp.route('', methods=['POST'])
 @require_auth
@@ -27,86 +44,107 @@ def send_message():
 
     msg = DirectMessage(sender_id=user.id, recipient_id=recipient.id, content=content)
     db.session.add(msg)
+    db.session.flush()
+    MessageService.record_message(msg)
 
+    new_notification = False
     if recipient.notifications_enabled:
-        notif = Notification(
-            user_id=recipient.id,
-            type='direct_message',
-            content=f'New message from {user.get_display_name()}'
+        sender_name = user.get_display_name()
+        # Unread messages from one sender share a single notification.
+        new_notification = NotificationService.notify_grouped(
+            recipient.id, 'direct_message', f'dm:{user.id}',
+            lambda n: f'New message from {sender_name}' if n == 1 else f'{n} new messages from {sender_name}'
         )
-        db.session.add(notif)
 
     db.session.commit()
+    if new_notification:
+        NotificationService.adjust_unread([recipient.id], 1)
+
+    payload = message_to_dict(msg)
+    # The sender's other tabs need the message too.
+    emit_to_user(recipient.id, 'direct_message', payload)
+    emit_to_user(user.id, 'direct_message', payload)
 
-    return jsonify({
-        'id': msg.id,
-        'sender_id': msg.sender_id,
-        'recipient_id': msg.recipient_id,
-        'content': msg.content,
-        'created_at': msg.created_at.isoformat()
-    }), 201
+    return jsonify(payload), 201
 
 
 @messages_bp.route('/conversations', methods=['GET'])
 @require_auth
 def get_conversations():
+    """Inbox, newest thread first. Page with `before=<last_message_id>`."""
     user = request.current_user
-    sent = db.session.query(DirectMessage.recipient_id).filter_by(sender_id=user.id).distinct()
-    received = db.session.query(DirectMessage.sender_id).filter_by(recipient_id=user.id).distinct()
-
-    partner_ids = set()
-    for row in sent:
-        partner_ids.add(row[0])
-    for row in received:
-        partner_ids.add(row[0])
-
-    conversations = []
-    for pid in partner_ids:
-        partner = User.query.get(pid)
-        if not partner:
-            continue
-        last_msg = DirectMessage.query.filter(
-            db.or_(
-                db.and_(DirectMessage.sender_id == user.id, DirectMessage.recipient_id == pid),
-                db.and_(DirectMessage.sender_id == pid, DirectMessage.recipient_id == user.id)
-            )
-        ).order_by(DirectMessage.created_at.desc()).first()
-
-        unread = DirectMessage.query.filter_by(sender_id=pid, recipient_id=user.id, is_read=False).count()
-
-        conversations.append({
-            'user_id': partner.id,
-            'display_name': partner.get_display_name(),
-            'tag': partner.get_full_tag(),
-            'avatar_url': partner.avatar_url,
-            'last_message': last_msg.content[:100] if last_msg else '',
-            'last_message_at': last_msg.created_at.isoformat() if last_msg else '',
-            'unread': unread
-        })
-
-    conversations.sort(key=lambda x: x['last_message_at'], reverse=True)
-    return jsonify(conversations), 200
+    before_id = request.args.get('before', type=int)
+    limit = min(max(request.args.get('limit', MESSAGES_PAGE_SIZE, type=int), 1), MESSAGES_MAX_PAGE_SIZE)
+
+    rows = MessageService.list_conversations(user.id, before_id=before_id, limit=limit)
+    return jsonify([{
+        'user_id': partner.id,
+        'display_name': partner.get_display_name(),
+        'tag': partner.get_full_tag(),
+        'avatar_url': partner.avatar_url,
+        'last_message_id': conv.last_message_id,
+        'last_message': conv.last_message_preview,
+        'last_message_at': conv.last_message_at.isoformat(),
+        'unread': conv.unread_count
+    } for conv, partner in rows]), 200
 
 
 @messages_bp.route('/with/<int:partner_id>', methods=['GET'])
 @require_auth
 def get_messages_with(partner_id):
+    """Conversation history, oldest first.
+
+    Without a cursor returns the latest page. `after_id` fetches only messages
+    newer than what the client already has (used after a socket reconnect),
+    `before_id` pages back through older history. Reading does not mark
+    anything as read; clients report that through POST .../read.
+    """
     user = request.current_user
-    messages = DirectMessage.query.filter(
+    after_id = request.args.get('after_id', type=int)
+    before_id = request.args.get('before_id', type=int)
+    limit = min(max(request.args.get('limit', MESSAGES_PAGE_SIZE, type=int), 1), MESSAGES_MAX_PAGE_SIZE)
+
+    query = DirectMessage.query.filter(
         db.or_(
             db.and_(DirectMessage.sender_id == user.id, DirectMessage.recipient_id == partner_id),
             db.and_(DirectMessage.sender_id == partner_id, DirectMessage.recipient_id == user.id)
         )
-    ).order_by(DirectMessage.created_at.asc()).limit(200).all()
+    )
+    if after_id:
+        messages = query.filter(DirectMessage.id > after_id).order_by(DirectMessage.id.asc()).limit(limit).all()
+    else:
+        if before_id:
+            query = query.filter(DirectMessage.id < before_id)
+        messages = query.order_by(DirectMessage.id.desc()).limit(limit).all()
+        messages.reverse()
+
+    return jsonify([message_to_dict(m) for m in messages]), 200
 
-    DirectMessage.query.filter_by(sender_id=partner_id, recipient_id=user.id, is_read=False).update({'is_read': True})
+
+@messages_bp.route('/with/<int:partner_id>/read', methods=['POST'])
+@require_auth
+def mark_conversation_read(partner_id):
+    """Mark everything from `partner_id` up to `up_to_id` as read in one UPDATE.
+
+    Clients debounce this, so a burst of incoming messages costs one write and
+    an idle open conversation costs none.
+    """
+    user = request.current_user
+    data = request.get_json(silent=True) or {}
+    up_to_id = data.get('up_to_id')
+
+    if up_to_id is not None:
+        try:
+            up_to_id = int(up_to_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': {'code': 'BAD_REQUEST', 'message': 'up_to_id must be an integer'}}), 400
+    updated = MessageService.mark_read(user.id, partner_id, up_to_id)
+    if not updated:
+        return jsonify({'updated': 0}), 200
     db.session.commit()
 
-    return jsonify([{
-        'id': m.id,
-        'sender_id': m.sender_id,
-        'recipient_id': m.recipient_id,
-        'content': m.content,
-        'is_read': m.is_read,
-        'created_at': m.created_at.isoformat()
-    } for m in messages]), 200
+    emit_to_user(partner_id, 'messages_read', {
+        'reader_id': user.id,
+        'up_to_id': up_to_id
+    })
+    return jsonify({'updated': updated}), 200
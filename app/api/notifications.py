@@ -1,20 +1,27 @@
-from flask import Blueprint, request, jsonify
-from app import db
-from app.models import Notification
+from flask import Blueprint, current_app, request, jsonify
 from app.api.auth import require_auth
+from app.services.notification_service import NotificationService
 
 notifications_bp = Blueprint('notifications', __name__)
 
+NOTIFICATIONS_MAX_PAGE_SIZE = 200
+
 
 @notifications_bp.route('', methods=['GET'])
 @require_auth
 def get_notifications():
+    """Newest first. Page back with `before=<id of the last notification shown>`."""
     user = request.current_user
-    notifs = Notification.query.filter_by(user_id=user.id).order_by(Notification.created_at.desc()).limit(50).all()
+    before_id = request.args.get('before', type=int)
+    limit = request.args.get('limit', current_app.config['NOTIFICATIONS_PAGE_SIZE'], type=int)
+    limit = min(max(limit, 1), NOTIFICATIONS_MAX_PAGE_SIZE)
+
+    notifs = NotificationService.list_notifications(user.id, before_id=before_id, limit=limit)
     return jsonify([{
         'id': n.id,
         'type': n.type,
         'content': n.content,
+        'count': n.event_count,
         'is_read': n.is_read,
         'created_at': n.created_at.isoformat()
     } for n in notifs]), 200
@@ -24,19 +31,15 @@ def get_notifications():
 @require_auth
 def unread_count():
     user = request.current_user
-    count = Notification.query.filter_by(user_id=user.id, is_read=False).count()
-    return jsonify({'count': count}), 200
+    return jsonify({'count': NotificationService.get_unread_count(user.id)}), 200
 
 
 @notifications_bp.route('/<int:notif_id>/read', methods=['POST'])
 @require_auth
 def mark_read(notif_id):
     user = request.current_user
-    notif = Notification.query.filter_by(id=notif_id, user_id=user.id).first()
-    if not notif:
+    if NotificationService.mark_read(user.id, notif_id) is None:
         return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Notification not found'}}), 404
-    notif.is_read = True
-    db.session.commit()
     return jsonify({'message': 'Marked as read'}), 200
 
 
@@ -44,6 +47,5 @@ def mark_read(notif_id):
 @require_auth
 def mark_all_read():
     user = request.current_user
-    Notification.query.filter_by(user_id=user.id, is_read=False).update({'is_read': True})
-    db.session.commit()
+    NotificationService.mark_all_read(user.id)
     return jsonify({'message': 'All marked as read'}), 200
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Video, VideoReaction, VideoReport, Notification
 from app.api.auth import require_auth
+from app.http_cache import invalidate, video_counter_tags
 
 reactions_bp = Blueprint('reactions', __name__)
 
@@ -29,6 +30,7 @@ def react_to_video(video_id):
                 video.dislikes_count = max(0, video.dislikes_count - 1)
             db.session.delete(existing)
             db.session.commit()
+            invalidate(*video_counter_tags(video))
             return jsonify({
                 'action': 'removed',
                 'likes': video.likes_count,
@@ -46,6 +48,7 @@ def react_to_video(video_id):
             else:
                 video.dislikes_count += 1
             db.session.commit()
+            invalidate(*video_counter_tags(video))
             return jsonify({
                 'action': 'changed',
                 'likes': video.likes_count,
@@ -60,6 +63,7 @@ def react_to_video(video_id):
             video.dislikes_count += 1
         db.session.add(reaction)
         db.session.commit()
+        invalidate(*video_counter_tags(video))
         return jsonify({
             'action': 'added',
             'likes': video.likes_count,
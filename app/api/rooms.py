@@ -1,8 +1,11 @@
+import math
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
 from app import db
 from app.services.room_service import RoomService
-from app.models import Room, RoomParticipant, User, ChatMessage
+from app.services.chat_service import ChatService
+from app.services.rate_limit_service import RateLimitService
+from app.models import Room, RoomParticipant, ChatMessage
 from app.api.auth import require_auth
 from app.websocket.room_events import kick_user_from_room
 
@@ -77,7 +80,8 @@ def get_room(room_id):
 def list_rooms():
     cleanup_inactive_rooms()
     rooms = room_service.get_active_rooms()
-    return jsonify([room_service.to_dict(room) for room in rooms]), 200
+    counts = room_service.participant_counts([room.id for room in rooms])
+    return jsonify([room_service.to_dict(room, current_participants=counts.get(room.id, 0)) for room in rooms]), 200
 
 
 @rooms_bp.route('/<int:room_id>', methods=['DELETE'])
@@ -213,19 +217,24 @@ def send_chat_message(room_id):
     if len(message_text) > 500:
         return jsonify({'error': {'code': 'BAD_REQUEST', 'message': 'Message too long (max 500)'}}), 400
 
+    remaining = RateLimitService.check_room_chat(room, user.id)
+    if remaining:
+        wait = math.ceil(remaining)
+        return jsonify({'error': {
+            'code': 'TOO_MANY_REQUESTS',
+            'message': f'Please wait {wait} seconds before sending another message'
+        }}), 429, {'Retry-After': str(wait)}
+
     msg = ChatMessage(room_id=room_id, user_id=user.id, content=message_text)
     db.session.add(msg)
     participant.last_message_at = datetime.utcnow()
     room.last_activity = datetime.utcnow()
     db.session.commit()
 
-    return jsonify({
-        'id': msg.id,
-        'user_id': user.id,
-        'display_name': user.get_display_name(),
-        'message': msg.content,
-        'timestamp': msg.timestamp.isoformat()
-    }), 201
+    entry = ChatService.to_dict(msg, user)
+    ChatService.append(room_id, entry)
+
+    return jsonify(entry), 201
 
 
 @rooms_bp.route('/<int:room_id>/chat', methods=['GET'])
@@ -235,20 +244,4 @@ def get_chat_messages(room_id):
         return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Room not found'}}), 404
 
     after_id = request.args.get('after', 0, type=int)
-    query = ChatMessage.query.filter_by(room_id=room_id)
-    if after_id:
-        query = query.filter(ChatMessage.id > after_id)
-    messages = query.order_by(ChatMessage.id.asc()).limit(100).all()
-
-    result = []
-    for m in messages:
-        u = User.query.get(m.user_id)
-        result.append({
-            'id': m.id,
-            'user_id': m.user_id,
-            'display_name': u.get_display_name() if u else f'User #{m.user_id}',
-            'message': m.content,
-            'timestamp': m.timestamp.isoformat()
-        })
-
-    return jsonify(result), 200
+    return jsonify(ChatService.get_messages(room_id, after_id=after_id, limit=100)), 200
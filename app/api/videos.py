@@ -1,13 +1,24 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from sqlalchemy.orm import joinedload
+from app.services.preview_service import PreviewService
 from app.services.video_service import VideoService, CATEGORIES
 from app.services.channel_service import ChannelService
+from app.services.comment_service import CommentService
+from app.services.moderation_service import ModerationService, MODERATION_REASON_CODES
+from app.schemas import dump_feed_video
 from app.api.auth import require_auth, require_moderator
-from app import db
-from app.models import Video, Channel, VideoComment, ModerationLog, User
+from app.db_routing import read_only
+from app.http_cache import cached, conditional
+from app.models import Video, Channel, VideoComment
 import random
 
 videos_bp = Blueprint('videos', __name__)
+
+COMMENTS_PAGE_SIZE = 50
+COMMENTS_MAX_PAGE_SIZE = 200
+COMMENT_REPLIES_PREVIEW = 3
+COMMENT_REPLIES_MAX_PREVIEW = 20
 video_service = VideoService()
 channel_service = ChannelService()
 
@@ -52,6 +63,7 @@ def upload_video():
 
 
 @videos_bp.route('/categories', methods=['GET'])
+@conditional(max_age=3600)
 def get_categories():
     labels = {
         'gaming': 'Игры', 'music': 'Музыка', 'education': 'Образование',
@@ -62,6 +74,8 @@ def get_categories():
 
 
 @videos_bp.route('/<int:video_id>', methods=['GET'])
+@conditional(lambda video_id: [f'video:{video_id}'])
+@cached(lambda video_id: [f'video:{video_id}'])
 def get_video(video_id):
     video = video_service.get_video(video_id)
     if not video:
@@ -97,16 +111,6 @@ def delete_video(video_id):
         return jsonify({'error': {'code': 'NOT_FOUND', 'message': str(e)}}), 404
 
 
-MODERATION_REASON_CODES = {
-    'spam': 'Спам/реклама',
-    'adult': '18+/неподходящий контент',
-    'copyright': 'Нарушение авторских прав',
-    'violence': 'Насилие/шок',
-    'harassment': 'Хейт/травля',
-    'other': 'Другое'
-}
-
-
 @videos_bp.route('/<int:video_id>/moderate/remove', methods=['POST'])
 @require_auth
 @require_moderator
@@ -121,21 +125,10 @@ def moderate_remove_video(video_id):
     reason_code = (data.get('reason_code') or '').strip().lower()
     reason_text = (data.get('reason_text') or '').strip() or None
 
-    if reason_code not in MODERATION_REASON_CODES:
-        return jsonify({'error': {'code': 'BAD_REQUEST', 'message': 'Invalid reason_code'}}), 400
-    if reason_code == 'other' and not reason_text:
-        return jsonify({'error': {'code': 'BAD_REQUEST', 'message': 'reason_text is required for other'}}), 400
-
-    video.status = 'removed'
-    log = ModerationLog(
-        video_id=video.id,
-        moderator_id=moderator.id,
-        action='remove',
-        reason_code=reason_code,
-        reason_text=reason_text
-    )
-    db.session.add(log)
-    db.session.commit()
+    try:
+        ModerationService.remove_videos([video.id], moderator, reason_code, reason_text)
+    except ValueError as e:
+        return jsonify({'error': {'code': 'BAD_REQUEST', 'message': str(e)}}), 400
 
     return jsonify({'message': 'Video removed by moderator', 'video_id': video.id}), 200
 
@@ -168,7 +161,8 @@ def get_stream_url(video_id):
     try:
         stream_url = video_service.get_stream_url(video)
         show_ads = video_service.should_show_ads(video, user)
-        return jsonify({'video_id': video.id, 'stream_url': stream_url, 'has_ads': show_ads}), 200
+        return jsonify({'video_id': video.id, 'stream_url': stream_url, 'has_ads': show_ads,
+                        'preview_track_url': PreviewService.get_track_url(video)}), 200
     except ValueError as e:
         return jsonify({'error': {'code': 'UNPROCESSABLE_ENTITY', 'message': str(e)}}), 422
 
@@ -194,55 +188,39 @@ def check_video_access(video_id):
 
 
 @videos_bp.route('/feed', methods=['GET'])
+@read_only
+@conditional(['feed'])
+@cached(['feed'])
 def get_feed():
     category = request.args.get('category')
-    query = Video.query.filter_by(status='ready', access_level='public')
+    query = Video.query.options(joinedload(Video.channel)).filter_by(status='ready', access_level='public')
     if category and category != 'all':
         query = query.filter((Video.category == category) | (Video.all_categories == True))
     all_videos = query.all()
 
-    def video_to_feed(v):
-        ch = Channel.query.get(v.channel_id)
-        comments_count = VideoComment.query.filter_by(video_id=v.id, deleted_at=None).count()
-        return {
-            'id': v.id,
-            'title': v.title,
-            'description': v.description,
-            'duration': v.duration,
-            'category': v.category or 'other',
-            'tags': v.tags,
-            'access_level': v.access_level,
-            'views_count': v.views_count or 0,
-            'likes_count': v.likes_count,
-            'dislikes_count': v.dislikes_count,
-            'comments_count': comments_count,
-            'thumbnail_url': video_service.get_thumbnail_url(v),
-            'created_at': v.created_at.isoformat(),
-            'channel': {'id': ch.id, 'name': ch.name} if ch else None
-        }
-
     new_videos = sorted(all_videos, key=lambda v: v.created_at, reverse=True)[:12]
     popular_videos = sorted(all_videos, key=lambda v: (v.views_count or 0) + v.likes_count * 3, reverse=True)[:12]
 
     def rec_score(v: Video) -> float:
         # Simple hybrid: popularity + engagement + freshness.
         age_hours = max(1.0, (datetime.utcnow() - v.created_at).total_seconds() / 3600.0)
-        comments_count = VideoComment.query.filter_by(video_id=v.id, deleted_at=None).count()
-        base = (v.views_count or 0) * 1.0 + (v.likes_count or 0) * 4.0 + comments_count * 2.0
+        base = (v.views_count or 0) * 1.0 + (v.likes_count or 0) * 4.0 + (v.comments_count or 0) * 2.0
         # Time decay: older -> lower.
         return base / (age_hours ** 0.6)
 
     recommended = sorted(all_videos, key=rec_score, reverse=True)[:12]
 
     return jsonify({
-        'recommended': [video_to_feed(v) for v in recommended],
-        'new': [video_to_feed(v) for v in new_videos],
-        'popular': [video_to_feed(v) for v in popular_videos],
+        'recommended': [dump_feed_video(v) for v in recommended],
+        'new': [dump_feed_video(v) for v in new_videos],
+        'popular': [dump_feed_video(v) for v in popular_videos],
         'total': len(all_videos)
     }), 200
 
 
 @videos_bp.route('/search', methods=['GET'])
+@read_only
+@cached(['feed'])
 def search_videos():
     q = request.args.get('q', '').strip()
     category = request.args.get('category')
@@ -267,6 +245,7 @@ def search_videos():
             'views_count': v.views_count or 0,
             'likes_count': v.likes_count,
             'thumbnail_url': video_service.get_thumbnail_url(v),
+            'thumbnail_srcset': video_service.get_thumbnail_srcset(v),
             'created_at': v.created_at.isoformat(),
             'channel': {'id': ch.id, 'name': ch.name} if ch else None
         })
@@ -279,29 +258,66 @@ def search_videos():
 # ---------------------------
 
 
+def comment_to_dict(c, u):
+    return {
+        'id': c.id,
+        'video_id': c.video_id,
+        'parent_id': c.parent_id,
+        'thread_id': c.thread_id,
+        'depth': CommentService.depth(c),
+        'user': {
+            'id': u.id if u else c.user_id,
+            'username': u.username if u else 'deleted',
+            'display_name': u.get_display_name() if u else 'Удалённый пользователь'
+        },
+        'content': c.content,
+        'created_at': c.created_at.isoformat()
+    }
+
+
 @videos_bp.route('/<int:video_id>/comments', methods=['GET'])
+@read_only
 def list_comments(video_id):
+    """Top-level comments, each with `reply_count` and its first `replies=<K>` replies.
+
+    `order=oldest|newest`; page with `cursor=<id of the last comment shown>`.
+    """
     video = Video.query.get(video_id)
     if not video or video.status == 'removed':
         return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Video not found'}}), 404
-    comments = VideoComment.query.filter_by(video_id=video.id, deleted_at=None).order_by(VideoComment.created_at.asc()).limit(200).all()
+    order = request.args.get('order', 'oldest')
+    if order not in CommentService.ORDERS:
+        return jsonify({'error': {'code': 'BAD_REQUEST', 'message': 'order must be oldest or newest'}}), 400
+    cursor_id = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', COMMENTS_PAGE_SIZE, type=int), 1), COMMENTS_MAX_PAGE_SIZE)
+    per_thread = min(max(request.args.get('replies', COMMENT_REPLIES_PREVIEW, type=int), 0),
+                     COMMENT_REPLIES_MAX_PREVIEW)
+
+    rows = CommentService.list_comments(video.id, order=order, cursor_id=cursor_id, limit=limit)
+    replies = CommentService.first_replies([c.id for c, _ in rows if c.reply_count], per_thread)
     out = []
-    for c in comments:
-        u = User.query.get(c.user_id)
-        out.append({
-            'id': c.id,
-            'video_id': c.video_id,
-            'user': {
-                'id': u.id if u else c.user_id,
-                'username': u.username if u else 'deleted',
-                'display_name': u.get_display_name() if u else 'Удалённый пользователь'
-            },
-            'content': c.content,
-            'created_at': c.created_at.isoformat()
-        })
+    for c, u in rows:
+        item = comment_to_dict(c, u)
+        item['reply_count'] = c.reply_count
+        item['replies'] = [comment_to_dict(rc, ru) for rc, ru in replies.get(c.id, [])]
+        out.append(item)
     return jsonify(out), 200
 
 
+@videos_bp.route('/comments/<int:comment_id>/replies', methods=['GET'])
+@read_only
+def list_comment_replies(comment_id):
+    """Replies of a top-level comment's thread, depth-first; page with `cursor=<id of the last reply shown>`."""
+    comment = VideoComment.query.get(comment_id)
+    if not comment or comment.deleted_at or comment.parent_id is not None:
+        return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Комментарий не найден'}}), 404
+    cursor_id = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', COMMENTS_PAGE_SIZE, type=int), 1), COMMENTS_MAX_PAGE_SIZE)
+
+    rows = CommentService.list_replies(comment, cursor_id=cursor_id, limit=limit)
+    return jsonify([comment_to_dict(c, u) for c, u in rows]), 200
+
+
 @videos_bp.route('/<int:video_id>/comments', methods=['POST'])
 @require_auth
 def add_comment(video_id):
@@ -315,16 +331,13 @@ def add_comment(video_id):
         return jsonify({'error': {'code': 'BAD_REQUEST', 'message': 'Комментарий не может быть пустым'}}), 400
     if len(content) > 2000:
         content = content[:2000]
-    comment = VideoComment(video_id=video.id, user_id=user.id, content=content)
-    db.session.add(comment)
-    db.session.commit()
-    return jsonify({
-        'id': comment.id,
-        'video_id': comment.video_id,
-        'user': {'id': user.id, 'username': user.username, 'display_name': user.get_display_name()},
-        'content': comment.content,
-        'created_at': comment.created_at.isoformat()
-    }), 201
+    parent = None
+    if data.get('parent_id') is not None:
+        parent = VideoComment.query.get(data['parent_id'])
+        if not parent or parent.deleted_at or parent.video_id != video.id:
+            return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Комментарий не найден'}}), 404
+    comment = CommentService.add_comment(video, user, content, parent=parent)
+    return jsonify(comment_to_dict(comment, user)), 201
 
 
 @videos_bp.route('/comments/<int:comment_id>', methods=['DELETE'])
@@ -336,8 +349,8 @@ def delete_comment(comment_id):
     user = request.current_user
     if comment.user_id != user.id and not (user.is_admin or getattr(user, 'is_moderator', False)):
         return jsonify({'error': {'code': 'FORBIDDEN', 'message': 'No permission'}}), 403
-    comment.deleted_at = datetime.utcnow()
-    db.session.commit()
+    if not CommentService.delete_comment(comment):
+        return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Комментарий не найден'}}), 404
     return jsonify({'message': 'Комментарий удалён'}), 200
 
 
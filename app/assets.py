@@ -0,0 +1,111 @@
+"""Fingerprinted, precompressed static assets.
+
+`flask build-assets` copies every file under `static/` to
+`static/dist/<path>.<hash>.<ext>`, writes `.gz` (and `.br` when the brotli
+package is installed) next to compressible ones, and records the mapping in
+`static/dist/manifest.json`. Templates link assets with `asset_url()`,
+which resolves through the manifest and falls back to the plain static URL
+when there is no build (or in debug mode, so edits show up at once).
+
+`/static/dist/...` is served by `serve_dist()`: the best precompressed
+variant the client accepts, with far-future immutable caching, since a
+changed file gets a new name.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip only without it
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.map', '.txt', '.html'}
+# Below this, the compressed variant is rarely worth the extra file.
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# (encoding, file suffix), most preferred first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build_assets(static_folder: str) -> Dict[str, str]:
+    """Fingerprint and precompress every static file; returns the manifest."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            rel = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            stem, ext = os.path.splitext(rel)
+            hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            target = os.path.join(dist, hashed)
+            _write(target, data)
+            if ext.lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE:
+                # mtime=0: rebuilding the same input gives byte-identical output.
+                _write(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _write(target + '.br', brotli.compress(data, quality=11))
+            manifest[rel] = f'{DIST_DIR}/{hashed}'
+
+    # Old fingerprinted files are kept: pages rendered before a deploy still point at them.
+    tmp = os.path.join(dist, MANIFEST_NAME + '.tmp')
+    _write(tmp, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    os.replace(tmp, os.path.join(dist, MANIFEST_NAME))
+    return manifest
+
+
+def _load_manifest(app) -> Optional[Dict[str, str]]:
+    path = os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME)
+    if app.debug or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def asset_url(filename: str) -> str:
+    manifest = current_app.extensions.get('asset_manifest')
+    return url_for('static', filename=manifest.get(filename, filename) if manifest else filename)
+
+
+def serve_dist(filename: str):
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(os.path.join(dist, filename + suffix)):
+            response = send_from_directory(dist, filename + suffix, mimetype=mimetype,
+                                           max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(dist, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app):
+    app.extensions['asset_manifest'] = _load_manifest(app)
+    app.jinja_env.globals['asset_url'] = asset_url
+    # More specific than the built-in /static/<path:filename>, so it wins for built files.
+    app.add_url_rule(f'{app.static_url_path}/{DIST_DIR}/<path:filename>', 'static_dist', serve_dist)
@@ -0,0 +1,69 @@
+"""gzip for dynamic responses.
+
+JSON (and the other text types in `COMPRESSIBLE_MIMETYPES`) bodies of at
+least `COMPRESS_MIN_SIZE` bytes are gzipped when the client accepts it;
+smaller ones fit in a packet or two and gain nothing. Streamed responses
+(the admin exports) have no size up front and are always compressed, chunk
+by chunk, through the same `zlib` compressor, so the body is never held in
+memory. Responses that already carry a `Content-Encoding`, file downloads
+(`direct_passthrough`) and partial content are left alone.
+
+Static files are precompressed at build time instead (app/assets.py).
+"""
+
+import zlib
+
+from flask import request
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+}
+# wbits 16 + MAX_WBITS: gzip container rather than a raw zlib stream.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def _compressor(level: int):
+    return zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+
+def _compress_stream(chunks, level: int):
+    compressor = _compressor(level)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _should_compress(response) -> bool:
+    return (response.status_code in (200, 201)
+            and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+            and bool(request.accept_encodings['gzip']))
+
+
+def init_compression(app):
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config.get('COMPRESS_ENABLED') or not _should_compress(response):
+            return response
+        level = app.config['COMPRESS_LEVEL']
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < app.config['COMPRESS_MIN_SIZE']:
+                return response
+            compressor = _compressor(level)
+            response.set_data(compressor.compress(data) + compressor.flush())
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,148 @@
+"""Send read-only requests to the read replica.
+
+Views marked with `@read_only` run their SELECTs on the `replica` bind
+(DATABASE_REPLICA_URL) unless one of these holds, in which case everything
+stays on the primary:
+
+- no replica is configured, or its last lag check failed or exceeded
+  REPLICA_MAX_LAG_SECONDS (checked at most every REPLICA_LAG_CHECK_INTERVAL
+  seconds per process);
+- the caller wrote something in the last READ_YOUR_WRITES_SECONDS. Every
+  request that sends INSERT/UPDATE/DELETE through the session marks its bearer
+  token in Redis, so a user sees their own comment or upload right away;
+- the current request has already written.
+
+Flushes and DML statements always go to the primary, whatever the request.
+The replica can be any database the primary is copied to, including a
+second SQLite file for local testing.
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+
+_lag_lock = threading.Lock()
+_lag_state = {'checked_at': 0.0, 'healthy': False}
+
+
+def read_only(f):
+    """Allow this view's queries to be served by the read replica."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _bearer_token():
+    parts = (request.headers.get('Authorization') or '').split()
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        return parts[1]
+    return None
+
+
+def _sticky_key(token: str) -> str:
+    return 'db_sticky:' + hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def _recently_wrote() -> bool:
+    from app import redis_client
+    token = _bearer_token()
+    if not token or not redis_client:
+        return False
+    try:
+        return bool(redis_client.exists(_sticky_key(token)))
+    except Exception:
+        # Unknown: play safe and read from the primary.
+        return True
+
+
+def _replica_lag(engine) -> float:
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            # The replay timestamp is that of the last replayed transaction, so it keeps
+            # ageing while the primary is idle; it only means lag if WAL is still unapplied.
+            lag = conn.execute(text(
+                "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+                "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )).scalar()
+            return float(lag or 0)
+        conn.execute(text('SELECT 1'))
+        return 0.0
+
+
+def replica_healthy(engine) -> bool:
+    interval = current_app.config['REPLICA_LAG_CHECK_INTERVAL']
+    now = time.monotonic()
+    if now - _lag_state['checked_at'] < interval:
+        return _lag_state['healthy']
+    with _lag_lock:
+        if now - _lag_state['checked_at'] < interval:
+            return _lag_state['healthy']
+        try:
+            lag = _replica_lag(engine)
+            healthy = lag <= current_app.config['REPLICA_MAX_LAG_SECONDS']
+            if not healthy:
+                current_app.logger.warning(f'Read replica is {lag:.1f}s behind, reading from primary')
+        except Exception as e:
+            current_app.logger.warning(f'Read replica unavailable, reading from primary: {e}')
+            healthy = False
+        _lag_state.update(checked_at=time.monotonic(), healthy=healthy)
+        return healthy
+
+
+def _use_replica(engines) -> bool:
+    if not has_request_context() or not g.get('db_read_only') or g.get('db_wrote'):
+        return False
+    replica = engines.get(REPLICA_BIND)
+    if replica is None:
+        return False
+    if 'db_use_replica' not in g:
+        # Decided once per request so a page never mixes primary and replica reads.
+        g.db_use_replica = not _recently_wrote() and replica_healthy(replica)
+    return g.db_use_replica
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                if has_request_context():
+                    g.db_wrote = True
+            elif _use_replica(self._db.engines):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def register_replica_bind(app):
+    """Add the `replica` bind before db.init_app(); reuses the primary's engine options."""
+    url = app.config.get('DATABASE_REPLICA_URL')
+    if not url:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.setdefault(REPLICA_BIND, {'url': url, **(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})})
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_routing(app):
+    @app.after_request
+    def remember_writes(response):
+        if g.get('db_wrote'):
+            from app import redis_client
+            token = _bearer_token()
+            if token and redis_client:
+                try:
+                    redis_client.setex(_sticky_key(token), app.config['READ_YOUR_WRITES_SECONDS'], 1)
+                except Exception as e:
+                    app.logger.warning(f'Failed to mark read-your-writes window: {e}')
+        return response
@@ -0,0 +1,233 @@
+"""HTTP caching for public read endpoints: conditional GETs and a response cache.
+
+A cacheable response is described by content tags such as `video:<id>`,
+`channel:<id>`, `user:<id>` or `feed`. Each tag has a version counter in
+Redis that writers bump after they commit (`invalidate('video:5')`). The weak
+ETag hashes the route and query string, the versions of the response's tags,
+the viewer and the current `HTTP_CACHE_REVALIDATE_WINDOW` bucket, so it is
+known before the view runs and a matching `If-None-Match` is answered with
+304 without touching the database.
+
+The time bucket bounds how stale a 304 can be for data written without a
+version bump (view counts from the write queue, replica lag).
+
+Anonymous responses are `public` with a short `max-age`; responses to a
+bearer token are `private, no-cache` and their ETag includes the token. All
+carry `Vary: Authorization`.
+
+`cached()` additionally keeps whole anonymous 200 responses in Redis for
+`HTTP_RESPONSE_CACHE_TTL` seconds. Its key includes the same tag versions,
+so `invalidate()` retires entries without deleting them: the next request
+simply misses and old entries expire on their own. On a miss only one
+request per key recomputes (a short Redis lock); concurrent requests for the
+same key wait up to `HTTP_RESPONSE_CACHE_WAIT` seconds for its result.
+"""
+
+import hashlib
+import time
+import uuid
+from functools import wraps
+from typing import Callable, Iterable, List, Optional, Union
+
+from flask import current_app, g, make_response, request
+
+VERSION_KEY_PREFIX = 'cache_version:'
+RESPONSE_KEY_PREFIX = 'resp_cache:'
+POLL_INTERVAL = 0.025
+
+
+def video_tags(video) -> List[str]:
+    """Everything that shows a video: its own page, its channel's pages and the feed (and search)."""
+    return [f'video:{video.id}', f'channel:{video.channel_id}', 'feed']
+
+
+def video_counter_tags(video) -> List[str]:
+    """Tags to bump when only a video's counters change (reactions, comments).
+
+    Just the video's own page: bumping `feed` on every click would retire every
+    feed, search and channel entry at once. Listings pick the new counts up when
+    their cached copy expires (`HTTP_RESPONSE_CACHE_TTL`) and their ETag window rolls over.
+    """
+    return [f'video:{video.id}']
+
+
+def channel_tags(channel_id: int) -> List[str]:
+    """A channel's own pages and the channel list."""
+    return [f'channel:{channel_id}', 'channels']
+
+
+def invalidate(*tags: str) -> None:
+    """Bump the version of every tag; call after the change is committed. Never fails the caller."""
+    from app import redis_client
+    if not tags or redis_client is None:
+        return
+    ttl = current_app.config['HTTP_CACHE_VERSION_TTL']
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for tag in set(tags):
+            pipe.incr(VERSION_KEY_PREFIX + tag)
+            pipe.expire(VERSION_KEY_PREFIX + tag, ttl)
+        pipe.execute()
+    except Exception as e:
+        current_app.logger.warning(f'Failed to invalidate {tags}: {e}')
+
+
+def tag_versions(tags: Iterable[str]) -> Optional[List[int]]:
+    """Current versions of `tags` (0 if never bumped); None if Redis is unavailable.
+
+    Read once per request: `conditional()` and `cached()` on the same view share it.
+    """
+    from app import redis_client
+    tags = list(tags)
+    memo = g.get('_cache_tag_versions')
+    if memo is not None and memo[0] == tags:
+        return memo[1]
+    if not tags:
+        return []
+    if redis_client is None:
+        return None
+    try:
+        values = redis_client.mget([VERSION_KEY_PREFIX + t for t in tags])
+    except Exception as e:
+        current_app.logger.warning(f'Cache versions unavailable: {e}')
+        return None
+    versions = [int(v) if v is not None else 0 for v in values]
+    g._cache_tag_versions = (tags, versions)
+    return versions
+
+
+def normalized_query() -> str:
+    return '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+
+
+def bearer_token() -> Optional[str]:
+    parts = request.headers.get('Authorization', '').split()
+    return parts[1] if len(parts) == 2 and parts[0].lower() == 'bearer' else None
+
+
+def _etag(tags: List[str], versions: List[int], token: Optional[str]) -> str:
+    window = int(time.time() // current_app.config['HTTP_CACHE_REVALIDATE_WINDOW'])
+    viewer = hashlib.sha1(token.encode()).hexdigest() if token else 'anon'
+    raw = f'{request.path}?{normalized_query()}|{",".join(f"{t}={v}" for t, v in zip(tags, versions))}|{window}|{viewer}'
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _cache_headers(response, token: Optional[str], max_age: int):
+    if token:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    response.vary.add('Authorization')
+    return response
+
+
+def conditional(tags: Union[Iterable[str], Callable[..., Iterable[str]]] = (), max_age: Optional[int] = None):
+    """Give a GET view a weak ETag and answer matching `If-None-Match` with 304.
+
+    `tags` is a list of content tags, or a function of the view's URL
+    arguments returning one: `conditional(lambda video_id: [f'video:{video_id}'])`.
+    Only 200 responses get validators and cache headers.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('HTTP_CACHE_ENABLED') or request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            resolved = list(tags(**kwargs) if callable(tags) else tags)
+            versions = tag_versions(resolved)
+            if versions is None:
+                return view(*args, **kwargs)
+
+            token = bearer_token()
+            etag = _etag(resolved, versions, token)
+            age = current_app.config['HTTP_CACHE_MAX_AGE'] if max_age is None else max_age
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                return _cache_headers(response, token, age)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                _cache_headers(response, token, age)
+            return response
+        return wrapper
+    return decorator
+
+
+# --- server-side response cache --------------------------------------------------
+
+def _load(redis_client, key: str):
+    status, mimetype, body = redis_client.hmget(key, 'status', 'mimetype', 'body')
+    if body is None:
+        return None
+    response = current_app.response_class(body, status=int(status), mimetype=mimetype.decode())
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+
+def _store(redis_client, key: str, response, ttl: int):
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hset(key, mapping={'status': response.status_code, 'mimetype': response.mimetype,
+                            'body': response.get_data()})
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+
+def cached(tags: Union[Iterable[str], Callable[..., Iterable[str]]] = (), ttl: Optional[int] = None):
+    """Serve anonymous GETs of a view from Redis; only 200 responses are stored.
+
+    `tags` works as in `conditional()`. Put `conditional()` outside `cached()`
+    so a matching ETag is answered before the cache is even read.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from app import redis_client
+            if not current_app.config.get('HTTP_RESPONSE_CACHE_ENABLED') or request.method not in ('GET', 'HEAD') \
+                    or request.headers.get('Authorization') or redis_client is None:
+                return view(*args, **kwargs)
+            resolved = list(tags(**kwargs) if callable(tags) else tags)
+            versions = tag_versions(resolved)
+            if versions is None:
+                return view(*args, **kwargs)
+
+            raw = f'{request.path}?{normalized_query()}|{",".join(f"{t}={v}" for t, v in zip(resolved, versions))}'
+            key = RESPONSE_KEY_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+            lifetime = current_app.config['HTTP_RESPONSE_CACHE_TTL'] if ttl is None else ttl
+            try:
+                hit = _load(redis_client, key)
+                if hit is not None:
+                    return hit
+
+                lock_key = key + ':lock'
+                token = uuid.uuid4().hex
+                if not redis_client.set(lock_key, token, nx=True,
+                                        ex=current_app.config['HTTP_RESPONSE_CACHE_LOCK_TIMEOUT']):
+                    # Someone else is computing this response: wait for it rather than pile on.
+                    deadline = time.monotonic() + current_app.config['HTTP_RESPONSE_CACHE_WAIT']
+                    while time.monotonic() < deadline:
+                        time.sleep(POLL_INTERVAL)
+                        hit = _load(redis_client, key)
+                        if hit is not None:
+                            return hit
+                    return view(*args, **kwargs)
+            except Exception as e:
+                current_app.logger.warning(f'Response cache unavailable: {e}')
+                return view(*args, **kwargs)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    _store(redis_client, key, response, lifetime)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            finally:
+                try:
+                    # Only our own lock: it may have expired and been taken over meanwhile.
+                    if redis_client.get(lock_key) == token.encode():
+                        redis_client.delete(lock_key)
+                except Exception:
+                    pass
+        return wrapper
+    return decorator
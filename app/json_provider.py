@@ -0,0 +1,67 @@
+"""JSON encoding for API responses: orjson when installed, the stdlib otherwise.
+
+Both paths encode datetimes and dates as ISO 8601 (Flask's default provider
+writes HTTP dates), so payloads can carry them as-is. orjson is used unless
+`JSON_USE_ORJSON` is off; requests that pass encoder options of their own
+(`json.dumps(obj, indent=...)`) always go through the stdlib.
+"""
+
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class AppJSONProvider(DefaultJSONProvider):
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    # orjson keeps insertion order; sorting only on the stdlib path would make the two differ.
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and bool(app.config.get('JSON_USE_ORJSON', True))
+
+    def _orjson_option(self, pretty: bool = False) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        return option | orjson.OPT_INDENT_2 if pretty else option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if not self.use_orjson or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._orjson_option()).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if not self.use_orjson or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        # Bytes straight into the response: no intermediate str.
+        return self._app.response_class(orjson.dumps(obj, default=_default, option=self._orjson_option(pretty)),
+                                        mimetype=self.mimetype)
@@ -30,6 +30,8 @@ class User(UserMixin, db.Model):
     notifications = db.relationship('Notification', backref='user', cascade='all, delete-orphan')
     sent_messages = db.relationship('DirectMessage', foreign_keys='DirectMessage.sender_id', backref='sender', cascade='all, delete-orphan')
     received_messages = db.relationship('DirectMessage', foreign_keys='DirectMessage.recipient_id', backref='recipient', cascade='all, delete-orphan')
+    conversations = db.relationship('Conversation', foreign_keys='Conversation.user_id', cascade='all, delete-orphan')
+    partner_conversations = db.relationship('Conversation', foreign_keys='Conversation.partner_id', cascade='all, delete-orphan')
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -89,8 +91,18 @@ class Video(db.Model):
     views_count = db.Column(db.Integer, default=0, nullable=False)
     likes_count = db.Column(db.Integer, default=0, nullable=False)
     dislikes_count = db.Column(db.Integer, default=0, nullable=False)
+    # Live (not soft-deleted) comments; maintained by CommentService.
+    comments_count = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # Feed/search: status and access level are always pinned, then either
+        # category or nothing, newest first.
+        db.Index('ix_videos_feed', 'status', 'access_level', 'category', 'created_at'),
+        db.Index('ix_videos_public_created', 'status', 'access_level', 'created_at'),
+        db.Index('ix_videos_channel_created', 'channel_id', 'created_at'),
+    )
+
     rooms = db.relationship('Room', backref='video', cascade='all, delete-orphan')
     reactions = db.relationship('VideoReaction', backref='video', cascade='all, delete-orphan')
     reports = db.relationship('VideoReport', backref='video', cascade='all, delete-orphan')
@@ -125,6 +137,12 @@ class VideoReport(db.Model):
     status = db.Column(db.String(20), default='pending', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_video_reports_status_created', 'status', 'created_at'),
+        # Covers the moderation queue: pending reports grouped by video.
+        db.Index('ix_video_reports_status_video', 'status', 'video_id', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<VideoReport {self.id}>'
 
@@ -138,6 +156,25 @@ class VideoComment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
+    # Threads: thread_id is the top-level comment's id (its own id for top-level
+    # ones) and path is the chain of zero-padded ids from it, e.g.
+    # '0000000042/0000000057', so ORDER BY path walks a thread depth-first.
+    parent_id = db.Column(db.Integer, db.ForeignKey('video_comments.id'), nullable=True)
+    thread_id = db.Column(db.Integer, nullable=True)
+    path = db.Column(db.String(255), nullable=True)
+    # Top-level comments only: live replies anywhere in the thread.
+    reply_count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        # Only live comments are ever listed or counted.
+        db.Index('ix_video_comments_live', 'video_id', 'created_at',
+                 sqlite_where=db.text('deleted_at IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL')),
+        db.Index('ix_video_comments_roots', 'video_id', 'created_at',
+                 sqlite_where=db.text('deleted_at IS NULL AND parent_id IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL AND parent_id IS NULL')),
+        db.Index('ix_video_comments_thread_path', 'thread_id', 'path'),
+    )
 
     user = db.relationship('User')
 
@@ -171,7 +208,12 @@ class Subscription(db.Model):
     is_sponsor = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'channel_id', name='unique_user_channel'),)
+    # The unique constraint doubles as the (user_id, channel_id) lookup index;
+    # subscriber lists and fan-out go the other way round.
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'channel_id', name='unique_user_channel'),
+        db.Index('ix_subscriptions_channel_user', 'channel_id', 'user_id'),
+    )
 
     def __repr__(self):
         return f'<Subscription user_id={self.user_id} channel_id={self.channel_id}>'
@@ -238,6 +280,8 @@ class ChatMessage(db.Model):
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (db.Index('ix_chat_messages_room_id_id', 'room_id', 'id'),)
+
     def __repr__(self):
         return f'<ChatMessage {self.id}>'
 
@@ -252,10 +296,38 @@ class DirectMessage(db.Model):
     is_read = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # Threads are paged by id (monotonic with created_at), one direction per side of the OR.
+    __table_args__ = (db.Index('ix_direct_messages_pair', 'sender_id', 'recipient_id', 'id'),)
+
     def __repr__(self):
         return f'<DirectMessage {self.id}>'
 
 
+class Conversation(db.Model):
+    """Inbox summary: one row per participant of a DM thread.
+
+    Maintained by MessageService alongside every DirectMessage insert and read,
+    so listing the inbox never has to aggregate `direct_messages`.
+    """
+    __tablename__ = 'conversations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    partner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    last_message_id = db.Column(db.Integer, nullable=False)
+    last_message_preview = db.Column(db.String(100), nullable=False, default='')
+    last_message_at = db.Column(db.DateTime, nullable=False)
+    unread_count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'partner_id', name='unique_conversation_pair'),
+        db.Index('ix_conversations_user_last_message', 'user_id', 'last_message_id'),
+    )
+
+    def __repr__(self):
+        return f'<Conversation user_id={self.user_id} partner_id={self.partner_id}>'
+
+
 class Advertisement(db.Model):
     __tablename__ = 'advertisements'
 
@@ -278,6 +350,22 @@ class Notification(db.Model):
     content = db.Column(db.Text, nullable=False)
     is_read = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Set by jobs that may be retried (e.g. 'video:42'); NULLs never conflict.
+    dedupe_key = db.Column(db.String(100), nullable=True)
+    # Events with the same group_key (e.g. 'dm:7') collapse into the user's one
+    # unread row for it; event_count says how many it stands for.
+    group_key = db.Column(db.String(100), nullable=True)
+    event_count = db.Column(db.Integer, default=1, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        db.Index('ix_notifications_user_unread', 'user_id', 'is_read', 'created_at'),
+        db.Index('ux_notifications_user_dedupe', 'user_id', 'dedupe_key', unique=True),
+        db.Index('ux_notifications_user_group_unread', 'user_id', 'group_key', unique=True,
+                 sqlite_where=db.text('is_read = 0'), postgresql_where=db.text('is_read = false')),
+        # Retention: read notifications older than the cutoff.
+        db.Index('ix_notifications_read_created', 'is_read', 'created_at'),
+    )
 
     def __repr__(self):
         return f'<Notification {self.id} type={self.type}>'
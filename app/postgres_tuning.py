@@ -0,0 +1,131 @@
+"""Engine options for PostgreSQL deployments.
+
+Every Gunicorn worker and Celery process owns a connection pool, so the pool
+is sized from how many processes share the server's connection budget:
+
+    per_process = DB_MAX_CONNECTIONS // DB_PROCESS_COUNT
+    pool_size   = DB_POOL_SIZE    or min(DB_THREADS_PER_PROCESS, per_process)
+    max_overflow = DB_MAX_OVERFLOW or per_process - pool_size
+
+DB_PROCESS_COUNT defaults to WEB_CONCURRENCY + CELERY_CONCURRENCY. Green-thread
+workers run far more greenlets than that, they simply queue for a connection
+(up to DB_POOL_TIMEOUT seconds).
+
+Statements are capped with `statement_timeout`. Behind PgBouncer in transaction
+mode (DB_PGBOUNCER=True) connection-level settings do not stick to a server
+connection, so the timeout is sent as `SET LOCAL` at the start of every
+transaction instead of as a startup option. Schema migrations run without it
+(`statement_timeout_disabled`, `untimed_connection`): index builds, backfills
+and the migration lock wait take as long as they take.
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+
+
+def _is_postgres(uri: str) -> bool:
+    return uri.startswith('postgresql')
+
+
+def pool_sizing(config) -> dict:
+    processes = max(1, int(config['DB_PROCESS_COUNT']))
+    per_process = max(2, int(config['DB_MAX_CONNECTIONS']) // processes)
+    pool_size = config.get('DB_POOL_SIZE') or min(int(config['DB_THREADS_PER_PROCESS']), per_process)
+    max_overflow = config.get('DB_MAX_OVERFLOW')
+    if max_overflow is None:
+        max_overflow = max(0, per_process - pool_size)
+    return {'pool_size': int(pool_size), 'max_overflow': int(max_overflow)}
+
+
+def engine_options(config) -> dict:
+    options = dict(pool_sizing(config))
+    options.update({
+        # Drop connections the server (or PgBouncer, or a NAT box) closed while idle.
+        'pool_pre_ping': True,
+        'pool_recycle': int(config['DB_POOL_RECYCLE']),
+        'pool_timeout': int(config['DB_POOL_TIMEOUT']),
+        # Reuse the most recent connection so surplus ones idle out and get recycled.
+        'pool_use_lifo': True,
+    })
+    connect_args = {
+        'connect_timeout': int(config['DB_CONNECT_TIMEOUT']),
+        'application_name': config['DB_APPLICATION_NAME'],
+    }
+    timeout = int(config['DB_STATEMENT_TIMEOUT_MS'])
+    if timeout and not config['DB_PGBOUNCER']:
+        connect_args['options'] = f'-c statement_timeout={timeout}'
+    options['connect_args'] = connect_args
+    return options
+
+
+def configure_engine_options(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS before db.init_app()."""
+    if not _is_postgres(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    options = engine_options(app.config)
+    # Explicit settings in the config win over the derived ones.
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def _set_local_timeout(conn, timeout: int):
+    # Goes straight to the DB-API cursor: psycopg2 opens the transaction on
+    # this statement, and the setting ends with it.
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f'SET LOCAL statement_timeout = {int(timeout)}')
+    finally:
+        cursor.close()
+
+
+def configure_postgres(app):
+    """Engine event hooks; call after db.init_app()."""
+    if not _is_postgres(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    timeout = int(app.config['DB_STATEMENT_TIMEOUT_MS'])
+    if not (timeout and app.config['DB_PGBOUNCER']):
+        return
+
+    def set_local_timeout(conn):
+        _set_local_timeout(conn, timeout)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'begin', set_local_timeout)
+
+
+@contextmanager
+def statement_timeout_disabled(engine):
+    """No statement_timeout for transactions begun on `engine` inside the block.
+
+    Registered after the PgBouncer hook, so its `SET LOCAL` wins. AUTOCOMMIT
+    connections have no transaction to scope it to; use `untimed_connection()`.
+    """
+    def disable(conn):
+        _set_local_timeout(conn, 0)
+
+    event.listen(engine, 'begin', disable)
+    try:
+        yield
+    finally:
+        event.remove(engine, 'begin', disable)
+
+
+@contextmanager
+def untimed_connection(engine):
+    """An AUTOCOMMIT connection without statement_timeout, reset before it goes back to the pool."""
+    conn = engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+    try:
+        conn.execute(text('SET statement_timeout = 0'))
+        yield conn
+    finally:
+        try:
+            conn.execute(text('RESET statement_timeout'))
+        except DBAPIError:
+            # Never hand a connection with the timeout off back to the pool.
+            conn.invalidate()
+        conn.close()
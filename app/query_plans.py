@@ -0,0 +1,202 @@
+"""Query-plan audit for the queries behind the hot endpoints.
+
+Every entry in HOT_QUERIES builds the same statement the endpoint runs (with
+sample parameters). `audit_queries()` asks the database how it would execute
+each one and flags full table scans:
+
+    flask audit-queries
+
+SQLite: `EXPLAIN QUERY PLAN`, a `SCAN <table>` step without an index fails.
+PostgreSQL: `EXPLAIN` with seq scans disabled for the transaction, so a
+`Seq Scan` in the plan means no usable index exists (on small tables the
+planner would otherwise prefer a seq scan regardless).
+"""
+
+import re
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import and_, func, or_, select, text
+
+from app import db
+from app.models import (ChatMessage, Conversation, DirectMessage, Notification, Subscription, Video,
+                        VideoComment, VideoReport, User)
+
+
+def _feed():
+    return select(Video).where(Video.status == 'ready', Video.access_level == 'public') \
+        .order_by(Video.created_at.desc())
+
+
+def _feed_category():
+    return select(Video).where(Video.status == 'ready', Video.access_level == 'public') \
+        .where(or_(Video.category == 'music', Video.all_categories == True)) \
+        .order_by(Video.created_at.desc()).limit(20)
+
+
+def _channel_videos():
+    return select(Video).where(Video.channel_id == 1).order_by(Video.created_at.desc()).limit(20)
+
+
+def _comments_list():
+    anchor = datetime(2024, 1, 1)
+    return select(VideoComment, User).outerjoin(User, User.id == VideoComment.user_id) \
+        .where(VideoComment.video_id == 1, VideoComment.deleted_at.is_(None), VideoComment.parent_id.is_(None), or_(
+            VideoComment.created_at < anchor,
+            and_(VideoComment.created_at == anchor, VideoComment.id < 100),
+        )).order_by(VideoComment.created_at.desc(), VideoComment.id.desc()).limit(50)
+
+
+def _comment_first_replies():
+    rn = func.row_number().over(partition_by=VideoComment.thread_id, order_by=VideoComment.path).label('rn')
+    ranked = select(VideoComment.id, rn).where(VideoComment.thread_id.in_([1, 2, 3]),
+                                               VideoComment.parent_id.isnot(None),
+                                               VideoComment.deleted_at.is_(None)).subquery()
+    return select(VideoComment).join(ranked, ranked.c.id == VideoComment.id).where(ranked.c.rn <= 3)
+
+
+def _comment_thread_page():
+    return select(VideoComment).where(VideoComment.thread_id == 1, VideoComment.path > '0000000001/0000000005',
+                                      VideoComment.deleted_at.is_(None)) \
+        .order_by(VideoComment.path).limit(50)
+
+
+def _notifications_list():
+    return select(Notification).where(Notification.user_id == 1) \
+        .order_by(Notification.created_at.desc(), Notification.id.desc()).limit(50)
+
+
+def _notifications_page():
+    anchor = datetime(2024, 1, 1)
+    return select(Notification).where(Notification.user_id == 1, or_(
+        Notification.created_at < anchor,
+        and_(Notification.created_at == anchor, Notification.id < 100),
+    )).order_by(Notification.created_at.desc(), Notification.id.desc()).limit(50)
+
+
+def _notification_group():
+    return select(Notification).where(Notification.user_id == 1, Notification.group_key == 'dm:2',
+                                      Notification.is_read == False)
+
+
+def _notifications_expired():
+    return select(Notification.id).where(Notification.is_read == True,
+                                         Notification.created_at < datetime(2024, 1, 1)) \
+        .order_by(Notification.created_at).limit(5000)
+
+
+def _notifications_unread():
+    return select(func.count()).select_from(Notification) \
+        .where(Notification.user_id == 1, Notification.is_read == False)
+
+
+def _dm_thread():
+    return select(DirectMessage).where(or_(
+        and_(DirectMessage.sender_id == 1, DirectMessage.recipient_id == 2),
+        and_(DirectMessage.sender_id == 2, DirectMessage.recipient_id == 1),
+    )).order_by(DirectMessage.id.desc()).limit(50)
+
+
+def _dm_mark_read():
+    return select(DirectMessage.id).where(DirectMessage.sender_id == 2, DirectMessage.recipient_id == 1,
+                                          DirectMessage.is_read == False, DirectMessage.id <= 100)
+
+
+def _inbox():
+    return select(Conversation, User).join(User, User.id == Conversation.partner_id) \
+        .where(Conversation.user_id == 1).order_by(Conversation.last_message_id.desc()).limit(50)
+
+
+def _subscription_lookup():
+    return select(Subscription).where(Subscription.user_id == 1, Subscription.channel_id == 1)
+
+
+def _channel_subscribers():
+    return select(Subscription.user_id).where(Subscription.channel_id == 1)
+
+
+def _room_chat():
+    return select(ChatMessage, User).outerjoin(User, User.id == ChatMessage.user_id) \
+        .where(ChatMessage.room_id == 1).order_by(ChatMessage.id.desc()).limit(50)
+
+
+def _admin_reports_page():
+    anchor = datetime(2024, 1, 1)
+    return select(VideoReport).where(VideoReport.status == 'pending', or_(
+        VideoReport.created_at < anchor,
+        and_(VideoReport.created_at == anchor, VideoReport.id < 100),
+    )).order_by(VideoReport.created_at.desc(), VideoReport.id.desc()).limit(50)
+
+
+def _moderation_queue():
+    reports = func.count(VideoReport.id)
+    return select(VideoReport.video_id, reports, func.min(VideoReport.created_at)) \
+        .where(VideoReport.status == 'pending').group_by(VideoReport.video_id) \
+        .order_by(reports.desc(), func.min(VideoReport.created_at), VideoReport.video_id).limit(20)
+
+
+def _pending_reports():
+    return select(func.count()).select_from(VideoReport).where(VideoReport.status == 'pending')
+
+
+HOT_QUERIES: Dict[str, Callable] = {
+    'feed': _feed,
+    'feed_category': _feed_category,
+    'channel_videos': _channel_videos,
+    'comments_list': _comments_list,
+    'comment_first_replies': _comment_first_replies,
+    'comment_thread_page': _comment_thread_page,
+    'notifications_list': _notifications_list,
+    'notifications_page': _notifications_page,
+    'notifications_unread': _notifications_unread,
+    'notification_group': _notification_group,
+    'notifications_expired': _notifications_expired,
+    'dm_thread': _dm_thread,
+    'dm_mark_read': _dm_mark_read,
+    'inbox': _inbox,
+    'subscription_lookup': _subscription_lookup,
+    'channel_subscribers': _channel_subscribers,
+    'room_chat': _room_chat,
+    'pending_reports': _pending_reports,
+    'admin_reports_page': _admin_reports_page,
+    'moderation_queue': _moderation_queue,
+}
+
+_SQLITE_FULL_SCAN = re.compile(r'^SCAN (?!.*\bINDEX\b)(?!\()(\S+)')
+# Subqueries SQLite evaluates on its own; scanning their result is not a table scan.
+_SQLITE_SUBQUERY = re.compile(r'^(?:MATERIALIZE|CO-ROUTINE) (\S+)')
+
+
+def explain(stmt) -> List[str]:
+    """Plan lines for `stmt` on the current database."""
+    conn = db.session.connection()
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    if conn.dialect.name == 'sqlite':
+        return [row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        return [row[0] for row in conn.execute(text(f'EXPLAIN {sql}'))]
+    raise RuntimeError(f'Query plan audit does not support {conn.dialect.name}')
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    subqueries = {m.group(1) for m in (_SQLITE_SUBQUERY.match(line.strip()) for line in plan) if m}
+    scans = []
+    for line in plan:
+        match = _SQLITE_FULL_SCAN.match(line.strip())
+        if (match and match.group(1) not in subqueries) or 'Seq Scan' in line:
+            scans.append(line)
+    return scans
+
+
+def audit_queries() -> Dict[str, Dict]:
+    """Explain every hot query; returns {name: {'plan': [...], 'full_scans': [...]}}."""
+    results = {}
+    try:
+        for name, build in HOT_QUERIES.items():
+            plan = explain(build())
+            results[name] = {'plan': plan, 'full_scans': full_scans(plan)}
+    finally:
+        # Drops the SET LOCAL on PostgreSQL; nothing was written.
+        db.session.rollback()
+    return results
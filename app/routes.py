@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, send_from_directory, current_app
+from flask import Blueprint, abort, redirect, render_template, send_from_directory, current_app
 import os
 
+from app.services.thumbnail_service import MIMETYPES, ThumbnailService
+
 web_bp = Blueprint('web', __name__)
 
 
@@ -64,3 +66,31 @@ def serve_video(filename):
 def serve_thumbnail(filename):
     thumb_folder = current_app.config['THUMBNAIL_FOLDER']
     return send_from_directory(thumb_folder, filename)
+
+
+@web_bp.route('/previews/<path:filename>')
+def serve_preview(filename):
+    # A video's sprites and track never change once written.
+    response = send_from_directory(current_app.config['PREVIEW_FOLDER'], filename,
+                                   max_age=current_app.config['PREVIEW_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@web_bp.route('/thumbnails/derived/<filename>')
+def serve_thumbnail_derivative(filename):
+    path, source = ThumbnailService.resolve(filename)
+    if path is None:
+        if source is None:
+            abort(404)
+        # Not generated yet (workers busy, no encoder): the original for now, the derivative next time.
+        response = redirect(f'/thumbnails/{os.path.basename(source)}')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    fmt = filename.rsplit('.', 1)[1]
+    response = send_from_directory(os.path.dirname(path), filename, mimetype=MIMETYPES[fmt],
+                                   max_age=current_app.config['THUMBNAIL_DERIVATIVE_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -1,60 +1,304 @@
-"""Minimal SQLite schema migration helper.
+"""Versioned schema migrations (SQLite and PostgreSQL).
 
-This project historically shipped a pre-created SQLite DB. When we add new columns
-or tables, SQLAlchemy's `create_all()` will create missing tables but will NOT add
-missing columns to existing tables. That can break auth/login immediately.
+The applied version lives in the `schema_version` table. On boot the app only
+reads that number; pending migrations run either right there (when
+`SCHEMA_AUTO_MIGRATE` is on, the default outside production) or explicitly:
 
-For this demo app we keep a small, safe, idempotent migration for SQLite only.
+    flask db-upgrade
+
+A brand new database is built with `create_all()` and stamped with the latest
+version. A database without `schema_version` but with tables is a pre-versioning
+install: every migration runs in order, so each one checks what it is about to
+add. New migrations go at the end of MIGRATIONS and are never renumbered.
+
+Indexes are built with `CREATE INDEX CONCURRENTLY` on PostgreSQL so adding one
+to a large table does not block writes. Migrations run with `statement_timeout`
+off: a backfill or an online index build on a big table outlasts any request cap.
 """
 
 from __future__ import annotations
 
-from sqlalchemy import text
+import re
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateIndex
 
 from app import db
+from app.postgres_tuning import statement_timeout_disabled, untimed_connection
+
+
+schema_version = db.Table(
+    "schema_version",
+    db.Column("version", db.Integer, primary_key=True, autoincrement=False),
+    db.Column("name", db.String(100), nullable=False),
+    db.Column("applied_at", db.DateTime, nullable=False, default=datetime.utcnow),
+)
+
+# Arbitrary key for pg_advisory_lock so concurrently booting workers migrate one at a time.
+_PG_LOCK_KEY = 720301
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[], None]
+    # Non-transactional migrations (CONCURRENTLY) manage their own connection.
+    transactional: bool = True
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str, transactional: bool = True):
+    def register(fn):
+        MIGRATIONS.append(Migration(version, name, fn, transactional))
+        return fn
+    return register
+
+
+def _dialect() -> str:
+    return db.engine.dialect.name
 
 
 def _table_columns(table_name: str) -> set[str]:
-    rows = db.session.execute(text(f"PRAGMA table_info({table_name})")).mappings().all()
-    return {r["name"] for r in rows}
+    return {c["name"] for c in inspect(db.session.connection()).get_columns(table_name)}
 
 
 def _table_exists(table_name: str) -> bool:
-    row = db.session.execute(
-        text("SELECT name FROM sqlite_master WHERE type='table' AND name=:t"),
-        {"t": table_name},
-    ).first()
-    return row is not None
+    return inspect(db.session.connection()).has_table(table_name)
 
 
 def _add_column(table: str, ddl: str) -> None:
-    # ddl should be like: "ADD COLUMN is_moderator INTEGER NOT NULL DEFAULT 0"
+    # ddl should be like: "ADD COLUMN is_moderator BOOLEAN NOT NULL DEFAULT false"
     db.session.execute(text(f"ALTER TABLE {table} {ddl}"))
 
 
-def ensure_sqlite_schema(app) -> None:
-    """Bring an older SQLite DB up to date enough for the app to run."""
+def _bool_default(value: bool) -> str:
+    # SQLite has no real BOOLEAN; INTEGER 0/1 is standard.
+    if _dialect() == "sqlite":
+        return "1" if value else "0"
+    return "true" if value else "false"
+
 
-    uri = str(app.config.get("SQLALCHEMY_DATABASE_URI", ""))
-    if not uri.startswith("sqlite:"):
+def _create_indexes(*names: str) -> None:
+    """Create model-declared indexes by name, online on PostgreSQL."""
+    indexes = {ix.name: ix for table in db.metadata.sorted_tables for ix in table.indexes}
+    if _dialect() != "postgresql":
+        for name in names:
+            indexes[name].create(db.session.connection(), checkfirst=True)
+        db.session.commit()
         return
 
-    # Create missing tables first.
+    with untimed_connection(db.engine) as conn:
+        for name in names:
+            # An interrupted CONCURRENTLY build leaves an INVALID index behind that
+            # IF NOT EXISTS would happily skip.
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": name}).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            ddl = str(CreateIndex(indexes[name], if_not_exists=True).compile(dialect=conn.dialect))
+            conn.execute(text(re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", ddl)))
+
+
+# --- migrations --------------------------------------------------------------
+
+@migration(1, "baseline")
+def _baseline() -> None:
+    # Creates whatever tables an older install is missing; existing tables are left alone.
     db.create_all()
 
-    # USERS: add moderator role flag.
-    if _table_exists("users"):
-        cols = _table_columns("users")
-        if "is_moderator" not in cols:
-            # SQLite doesn't have a real BOOLEAN; INTEGER 0/1 is standard.
-            _add_column("users", "ADD COLUMN is_moderator INTEGER NOT NULL DEFAULT 0")
-
-    # VIDEOS: add all_categories flag and thumbnail_path if missing.
-    if _table_exists("videos"):
-        cols = _table_columns("videos")
-        if "all_categories" not in cols:
-            _add_column("videos", "ADD COLUMN all_categories INTEGER NOT NULL DEFAULT 0")
-        if "thumbnail_path" not in cols:
-            _add_column("videos", "ADD COLUMN thumbnail_path VARCHAR(500)")
 
+@migration(2, "users_is_moderator")
+def _users_is_moderator() -> None:
+    if "is_moderator" not in _table_columns("users"):
+        _add_column("users", f"ADD COLUMN is_moderator BOOLEAN NOT NULL DEFAULT {_bool_default(False)}")
+
+
+@migration(3, "videos_all_categories_thumbnail")
+def _videos_all_categories_thumbnail() -> None:
+    cols = _table_columns("videos")
+    if "all_categories" not in cols:
+        _add_column("videos", f"ADD COLUMN all_categories BOOLEAN NOT NULL DEFAULT {_bool_default(False)}")
+    if "thumbnail_path" not in cols:
+        _add_column("videos", "ADD COLUMN thumbnail_path VARCHAR(500)")
+
+
+@migration(4, "conversations_backfill")
+def _conversations_backfill() -> None:
+    if db.session.execute(text("SELECT 1 FROM conversations LIMIT 1")).first():
+        return
+    from app.services.message_service import MessageService
+    MessageService.backfill_conversations()
+
+
+@migration(5, "hot_query_indexes", transactional=False)
+def _hot_query_indexes() -> None:
+    _create_indexes(
+        "ix_conversations_user_last_message",
+        "ix_videos_feed",
+        "ix_videos_public_created",
+        "ix_videos_channel_created",
+        "ix_video_reports_status_created",
+        "ix_video_comments_live",
+        "ix_subscriptions_channel_user",
+        "ix_chat_messages_room_id_id",
+        "ix_direct_messages_pair",
+        "ix_notifications_user_created",
+        "ix_notifications_user_unread",
+    )
+
+
+@migration(6, "notifications_dedupe_key")
+def _notifications_dedupe_key() -> None:
+    if "dedupe_key" not in _table_columns("notifications"):
+        _add_column("notifications", "ADD COLUMN dedupe_key VARCHAR(100)")
+
+
+@migration(7, "notifications_dedupe_index", transactional=False)
+def _notifications_dedupe_index() -> None:
+    _create_indexes("ux_notifications_user_dedupe")
+
+
+@migration(8, "notifications_grouping")
+def _notifications_grouping() -> None:
+    cols = _table_columns("notifications")
+    if "group_key" not in cols:
+        _add_column("notifications", "ADD COLUMN group_key VARCHAR(100)")
+    if "event_count" not in cols:
+        _add_column("notifications", "ADD COLUMN event_count INTEGER NOT NULL DEFAULT 1")
+
+
+@migration(9, "notifications_grouping_indexes", transactional=False)
+def _notifications_grouping_indexes() -> None:
+    _create_indexes("ux_notifications_user_group_unread", "ix_notifications_read_created")
+
+
+@migration(10, "videos_comments_count")
+def _videos_comments_count() -> None:
+    if "comments_count" not in _table_columns("videos"):
+        _add_column("videos", "ADD COLUMN comments_count INTEGER NOT NULL DEFAULT 0")
+    from app.services.comment_service import CommentService
+    CommentService.recount_comments()
+
+
+@migration(11, "video_comments_threads")
+def _video_comments_threads() -> None:
+    cols = _table_columns("video_comments")
+    if "parent_id" not in cols:
+        _add_column("video_comments", "ADD COLUMN parent_id INTEGER REFERENCES video_comments (id)")
+    if "thread_id" not in cols:
+        _add_column("video_comments", "ADD COLUMN thread_id INTEGER")
+    if "path" not in cols:
+        _add_column("video_comments", "ADD COLUMN path VARCHAR(255)")
+    if "reply_count" not in cols:
+        _add_column("video_comments", "ADD COLUMN reply_count INTEGER NOT NULL DEFAULT 0")
+    # Every existing comment is top-level.
+    padded = "printf('%010d', id)" if _dialect() == "sqlite" else "lpad(id::text, 10, '0')"
+    db.session.execute(text(
+        f"UPDATE video_comments SET thread_id = id, path = {padded} WHERE thread_id IS NULL"
+    ))
+
+
+@migration(12, "video_comments_thread_indexes", transactional=False)
+def _video_comments_thread_indexes() -> None:
+    _create_indexes("ix_video_comments_roots", "ix_video_comments_thread_path")
+
+
+@migration(13, "video_reports_queue_index", transactional=False)
+def _video_reports_queue_index() -> None:
+    _create_indexes("ix_video_reports_status_video")
+
+
+# --- runner --------------------------------------------------------------------
+
+def head_version() -> int:
+    return MIGRATIONS[-1].version
+
+
+def current_version() -> Optional[int]:
+    """Applied version, or None when the database predates `schema_version`."""
+    try:
+        return db.session.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return None
+
+
+def _stamp(m: Migration) -> None:
+    db.session.execute(schema_version.insert().values(version=m.version, name=m.name,
+                                                      applied_at=datetime.utcnow()))
     db.session.commit()
+
+
+def upgrade() -> List[str]:
+    """Apply pending migrations; returns the names of the ones that ran."""
+    with ExitStack() as stack:
+        lock_conn = None
+        if _dialect() == "postgresql":
+            stack.enter_context(statement_timeout_disabled(db.engine))
+            # End the transaction the version check began, so the next one starts untimed.
+            db.session.commit()
+            # Session-level advisory locks belong to a connection, so hold a dedicated one.
+            lock_conn = stack.enter_context(untimed_connection(db.engine))
+            lock_conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _PG_LOCK_KEY})
+        try:
+            return _apply_pending()
+        finally:
+            if lock_conn is not None:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_KEY})
+
+
+def _apply_pending() -> List[str]:
+    # Re-read under the lock: another worker may have just finished.
+    version = current_version()
+    if version is None and not inspect(db.session.connection()).get_table_names():
+        db.create_all()
+        db.session.commit()
+        db.session.execute(schema_version.insert().values(
+            version=head_version(), name=MIGRATIONS[-1].name, applied_at=datetime.utcnow()))
+        db.session.commit()
+        return ["create_all"]
+    if version is None:
+        schema_version.create(db.session.connection())
+        db.session.commit()
+        version = 0
+
+    applied = []
+    for m in MIGRATIONS:
+        if m.version <= version:
+            continue
+        current_app.logger.info(f"Applying schema migration {m.version} {m.name}")
+        try:
+            m.apply()
+            if m.transactional:
+                db.session.flush()
+        except Exception:
+            db.session.rollback()
+            raise
+        _stamp(m)
+        applied.append(m.name)
+    return applied
+
+
+def check_schema(app) -> None:
+    """Boot-time check: one version read, migrate only if behind."""
+    version = current_version()
+    if version is not None and version >= head_version():
+        return
+    if not app.config.get("SCHEMA_AUTO_MIGRATE", True):
+        app.logger.warning(
+            f"Database schema is at version {version or 0}, code expects {head_version()}; "
+            f"run `flask db-upgrade`"
+        )
+        return
+    applied = upgrade()
+    if applied:
+        app.logger.info(f"Schema migrations applied: {', '.join(applied)}")
@@ -0,0 +1,148 @@
+"""Response schemas for videos, channels, rooms and subscriptions.
+
+Each schema is the one place a model's public fields are declared.
+`schema.dump()` validates nothing on the way out but still costs about ten
+times a hand-written dict, so responses use `compile_schema()` instead: it
+reads the declared fields once and returns a plain function that builds the
+same dict with attribute getters. Compiled dumpers support the field types
+used here (plain, DateTime, Function, Method, Nested) and do no type
+coercion; the values come from typed columns already.
+"""
+
+from operator import attrgetter
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from marshmallow import fields
+
+from app import ma
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _nested(attr, dump):
+    def get(obj):
+        value = attr(obj)
+        return dump(value) if value is not None else None
+    return get
+
+
+def compile_schema(schema_cls, only: Optional[Sequence[str]] = None) -> Callable[[Any], Dict[str, Any]]:
+    schema = schema_cls(only=only)
+    getters = []
+    for name, field in schema.dump_fields.items():
+        key = field.data_key or name
+        attr = attrgetter(field.attribute or name)
+        if isinstance(field, fields.Function):
+            getter = field.serialize_func
+        elif isinstance(field, fields.Method):
+            getter = getattr(schema, field.serialize_method_name)
+        elif isinstance(field, fields.Nested):
+            getter = _nested(attr, compile_schema(type(field.schema), only=field.only))
+        elif isinstance(field, fields.DateTime):
+            getter = lambda obj, attr=attr: _iso(attr(obj))
+        else:
+            getter = attr
+        getters.append((key, getter))
+
+    def dump(obj) -> Dict[str, Any]:
+        return {key: get(obj) for key, get in getters}
+
+    dump.schema = schema
+    return dump
+
+
+class _Schema(ma.Schema):
+    class Meta:
+        # Keys in declaration order (or in the order of `only`), the same in every process.
+        ordered = True
+
+
+class ChannelBriefSchema(_Schema):
+    id = fields.Integer()
+    name = fields.String()
+
+
+class SubscriptionChannelSchema(ChannelBriefSchema):
+    description = fields.String()
+    author_id = fields.Integer()
+
+
+class ChannelSchema(SubscriptionChannelSchema):
+    banner_url = fields.String()
+    subscriber_count = fields.Integer()
+    created_at = fields.DateTime()
+
+
+class UserBriefSchema(_Schema):
+    id = fields.Integer()
+    username = fields.String()
+
+
+class VideoSchema(_Schema):
+    id = fields.Integer()
+    channel_id = fields.Integer()
+    title = fields.String()
+    description = fields.String()
+    duration = fields.Integer()
+    category = fields.Function(lambda v: v.category or 'other')
+    all_categories = fields.Function(lambda v: bool(v.all_categories))
+    tags = fields.String()
+    access_level = fields.String()
+    has_ads = fields.Boolean()
+    status = fields.String()
+    views_count = fields.Function(lambda v: v.views_count or 0)
+    likes_count = fields.Integer()
+    dislikes_count = fields.Integer()
+    comments_count = fields.Function(lambda v: v.comments_count or 0)
+    thumbnail_url = fields.Method('get_thumbnail_url')
+    thumbnail_srcset = fields.Method('get_thumbnail_srcset')
+    created_at = fields.DateTime()
+
+    def get_thumbnail_url(self, video):
+        from app.services.video_service import VideoService
+        return VideoService.get_thumbnail_url(video)
+
+    def get_thumbnail_srcset(self, video):
+        from app.services.video_service import VideoService
+        return VideoService.get_thumbnail_srcset(video)
+
+
+class FeedVideoSchema(VideoSchema):
+    channel = fields.Nested(ChannelBriefSchema)
+
+
+FEED_VIDEO_FIELDS = ('id', 'title', 'description', 'duration', 'category', 'tags', 'access_level',
+                     'views_count', 'likes_count', 'dislikes_count', 'comments_count', 'thumbnail_url',
+                     'thumbnail_srcset', 'created_at', 'channel')
+CHANNEL_VIDEO_FIELDS = ('id', 'title', 'description', 'duration', 'category', 'tags', 'access_level',
+                        'status', 'views_count', 'likes_count', 'dislikes_count', 'created_at')
+
+
+class RoomSchema(_Schema):
+    id = fields.Integer()
+    owner_id = fields.Integer()
+    video_id = fields.Integer()
+    name = fields.String()
+    max_participants = fields.Integer()
+    last_activity = fields.DateTime()
+    created_at = fields.DateTime()
+
+
+class SubscriptionSchema(_Schema):
+    id = fields.Integer()
+    user_id = fields.Integer()
+    channel_id = fields.Integer()
+    is_sponsor = fields.Boolean()
+    created_at = fields.DateTime()
+
+
+dump_video = compile_schema(VideoSchema)
+dump_feed_video = compile_schema(FeedVideoSchema, only=FEED_VIDEO_FIELDS)
+dump_channel_video = compile_schema(VideoSchema, only=CHANNEL_VIDEO_FIELDS)
+dump_channel = compile_schema(ChannelSchema)
+dump_subscription_channel = compile_schema(SubscriptionChannelSchema)
+dump_user_brief = compile_schema(UserBriefSchema)
+dump_room = compile_schema(RoomSchema)
+dump_subscription = compile_schema(SubscriptionSchema)
@@ -0,0 +1,159 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, or_, select
+
+from app import db
+from app.models import User, VideoReport
+
+USER_ROLES = ('admin', 'moderator', 'author', 'user')
+REPORT_STATUSES = ('pending', 'resolved', 'dismissed')
+
+USER_EXPORT_COLUMNS = [
+    ('id', User.id),
+    ('username', User.username),
+    ('display_name', User.display_name),
+    ('login_code', User.login_code),
+    ('email', User.email),
+    ('is_author', User.is_author),
+    ('is_admin', User.is_admin),
+    ('is_moderator', User.is_moderator),
+    ('is_vip', User.is_vip),
+    ('mexels', User.mexels),
+    ('created_at', User.created_at),
+]
+
+REPORT_EXPORT_COLUMNS = [
+    ('id', VideoReport.id),
+    ('video_id', VideoReport.video_id),
+    ('user_id', VideoReport.user_id),
+    ('reason', VideoReport.reason),
+    ('status', VideoReport.status),
+    ('created_at', VideoReport.created_at),
+]
+
+
+def _parse_bool(value: str, name: str) -> bool:
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def _parse_datetime(value: str, name: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date, e.g. 2024-01-31")
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class AdminService:
+
+    EXPORT_FORMATS = ('ndjson', 'csv')
+    EXPORT_BATCH_SIZE = 1000
+
+    @staticmethod
+    def user_filters(args) -> List:
+        """WHERE clauses from `role`, `vip`, `created_from` and `created_to`; ValueError on bad input."""
+        clauses = []
+        role = args.get('role')
+        if role:
+            if role not in USER_ROLES:
+                raise ValueError(f"role must be one of: {', '.join(USER_ROLES)}")
+            if role == 'admin':
+                clauses.append(User.is_admin == True)
+            elif role == 'moderator':
+                clauses.append(User.is_moderator == True)
+            elif role == 'author':
+                clauses.append(User.is_author == True)
+            else:
+                clauses.extend([User.is_admin == False, User.is_moderator == False])
+        if args.get('vip'):
+            clauses.append(User.is_vip == _parse_bool(args['vip'], 'vip'))
+        if args.get('created_from'):
+            clauses.append(User.created_at >= _parse_datetime(args['created_from'], 'created_from'))
+        if args.get('created_to'):
+            clauses.append(User.created_at < _parse_datetime(args['created_to'], 'created_to'))
+        return clauses
+
+    @staticmethod
+    def report_filters(args) -> List:
+        clauses = []
+        status = args.get('status')
+        if status:
+            if status not in REPORT_STATUSES:
+                raise ValueError(f"status must be one of: {', '.join(REPORT_STATUSES)}")
+            clauses.append(VideoReport.status == status)
+        if args.get('video_id'):
+            try:
+                clauses.append(VideoReport.video_id == int(args['video_id']))
+            except ValueError:
+                raise ValueError("video_id must be an integer")
+        return clauses
+
+    @staticmethod
+    def list_users(filters: List, before_id: Optional[int] = None, limit: int = 50) -> List[User]:
+        """Newest first by id; `before_id` is the last id of the previous page."""
+        query = User.query.filter(*filters)
+        if before_id:
+            query = query.filter(User.id < before_id)
+        return query.order_by(User.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def list_reports(filters: List, before_id: Optional[int] = None, limit: int = 50) -> List[VideoReport]:
+        """Newest first by (created_at, id), which ix_video_reports_status_created serves per status."""
+        query = VideoReport.query.filter(*filters)
+        if before_id:
+            anchor = db.session.query(VideoReport.created_at).filter_by(id=before_id).scalar()
+            if anchor is not None:
+                query = query.filter(or_(VideoReport.created_at < anchor,
+                                         and_(VideoReport.created_at == anchor, VideoReport.id < before_id)))
+            else:
+                query = query.filter(VideoReport.id < before_id)
+        return query.order_by(VideoReport.created_at.desc(), VideoReport.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def _iter_rows(columns, filters: List, order_by) -> Iterator[Dict[str, Any]]:
+        # Plain column rows, no ORM objects: nothing accumulates in the session,
+        # and yield_per streams from a server-side cursor where the driver has one.
+        stmt = select(*[col for _, col in columns]).where(*filters).order_by(order_by) \
+            .execution_options(yield_per=AdminService.EXPORT_BATCH_SIZE)
+        names = [name for name, _ in columns]
+        for row in db.session.execute(stmt):
+            yield {name: _plain(value) for name, value in zip(names, row)}
+
+    @staticmethod
+    def _encode(rows: Iterator[Dict[str, Any]], names: List[str], fmt: str) -> Iterator[str]:
+        if fmt == 'ndjson':
+            for row in rows:
+                yield json.dumps(row, ensure_ascii=False) + '\n'
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        for i, row in enumerate(rows, 1):
+            writer.writerow([row[name] for name in names])
+            if i % AdminService.EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    @staticmethod
+    def export_users(filters: List, fmt: str) -> Iterator[str]:
+        rows = AdminService._iter_rows(USER_EXPORT_COLUMNS, filters, User.id)
+        return AdminService._encode(rows, [name for name, _ in USER_EXPORT_COLUMNS], fmt)
+
+    @staticmethod
+    def export_reports(filters: List, fmt: str) -> Iterator[str]:
+        rows = AdminService._iter_rows(REPORT_EXPORT_COLUMNS, filters, VideoReport.id)
+        return AdminService._encode(rows, [name for name, _ in REPORT_EXPORT_COLUMNS], fmt)
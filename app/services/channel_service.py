@@ -1,6 +1,8 @@
 from typing import Optional, List, Dict, Any
 from app import db
 from app.models import Channel, Video, User
+from app.http_cache import channel_tags, invalidate
+from app.schemas import dump_channel, dump_channel_video
 
 
 class ChannelService:
@@ -24,6 +26,8 @@ class ChannelService:
 
         db.session.add(channel)
         db.session.commit()
+        # The author's public profile shows is_author.
+        invalidate(*channel_tags(channel.id), f'user:{author.id}')
 
         return channel
 
@@ -55,6 +59,7 @@ class ChannelService:
             channel.banner_url = kwargs['banner_url']
 
         db.session.commit()
+        invalidate(*channel_tags(channel.id))
 
         return channel
 
@@ -79,38 +84,13 @@ class ChannelService:
 
         db.session.delete(channel)
         db.session.commit()
+        invalidate(*channel_tags(channel_id), 'feed')
 
         return True
 
     @staticmethod
     def to_dict(channel: Channel, include_videos: bool = False) -> Dict[str, Any]:
-        data = {
-            'id': channel.id,
-            'author_id': channel.author_id,
-            'name': channel.name,
-            'description': channel.description,
-            'banner_url': channel.banner_url,
-            'subscriber_count': channel.subscriber_count,
-            'created_at': channel.created_at.isoformat()
-        }
-
+        data = dump_channel(channel)
         if include_videos:
-            data['videos'] = [
-                {
-                    'id': video.id,
-                    'title': video.title,
-                    'description': video.description,
-                    'duration': video.duration,
-                    'category': getattr(video, 'category', 'other') or 'other',
-                    'tags': getattr(video, 'tags', None),
-                    'access_level': video.access_level,
-                    'status': video.status,
-                    'views_count': getattr(video, 'views_count', 0) or 0,
-                    'likes_count': video.likes_count,
-                    'dislikes_count': video.dislikes_count,
-                    'created_at': video.created_at.isoformat()
-                }
-                for video in channel.videos
-            ]
-
+            data['videos'] = [dump_channel_video(video) for video in channel.videos]
         return data
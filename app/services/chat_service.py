@@ -0,0 +1,128 @@
+import json
+from typing import List, Dict, Any, Optional
+from flask import current_app
+from redis.exceptions import WatchError
+from app import db
+from app.models import ChatMessage, User
+
+
+class ChatService:
+    """Recent room chat kept in a bounded Redis list.
+
+    Each entry is a JSON document with the author's display name already
+    resolved, so late joiners get the last N messages without touching
+    `chat_messages` or `users`. On a cache miss the history is rebuilt from
+    a single joined query and written back, unless the list changed or a
+    message arrived while the query ran (see `get_recent`).
+    """
+
+    HISTORY_PREFIX = 'room_chat:'
+    HISTORY_TTL = 86400
+
+    @staticmethod
+    def _key(room_id: int) -> str:
+        return f"{ChatService.HISTORY_PREFIX}{room_id}"
+
+    @staticmethod
+    def _history_size() -> int:
+        return current_app.config.get('ROOM_CHAT_HISTORY_SIZE', 50)
+
+    @staticmethod
+    def to_dict(message: ChatMessage, user: Optional[User]) -> Dict[str, Any]:
+        return {
+            'id': message.id,
+            'user_id': message.user_id,
+            'username': user.username if user else None,
+            'display_name': user.get_display_name() if user else f'User #{message.user_id}',
+            'message': message.content,
+            'timestamp': message.timestamp.isoformat()
+        }
+
+    @staticmethod
+    def _load_from_db(room_id: int, after_id: int = 0, limit: int = 100, newest: bool = False) -> List[Dict[str, Any]]:
+        query = db.session.query(ChatMessage, User).outerjoin(User, User.id == ChatMessage.user_id) \
+            .filter(ChatMessage.room_id == room_id)
+        if after_id:
+            query = query.filter(ChatMessage.id > after_id)
+        if newest:
+            rows = query.order_by(ChatMessage.id.desc()).limit(limit).all()
+            rows.reverse()
+        else:
+            rows = query.order_by(ChatMessage.id.asc()).limit(limit).all()
+        return [ChatService.to_dict(m, u) for m, u in rows]
+
+    @staticmethod
+    def _write_history(pipe, key: str, entries: List[Dict[str, Any]]) -> None:
+        pipe.multi()
+        pipe.delete(key)
+        if entries:
+            pipe.rpush(key, *[json.dumps(e) for e in entries])
+            pipe.expire(key, ChatService.HISTORY_TTL)
+        pipe.execute()
+
+    @staticmethod
+    def get_recent(room_id: int) -> List[Dict[str, Any]]:
+        from app import redis_client
+        key = ChatService._key(room_id)
+        pipe = None
+        try:
+            pipe = redis_client.pipeline()
+            # Watched from before the DB read: a list another reader rebuilt meanwhile
+            # (and messages appended to it) must not be replaced by our older snapshot.
+            pipe.watch(key)
+            cached = pipe.lrange(key, 0, -1)
+        except Exception:
+            cached = None
+        if cached:
+            pipe.reset()
+            return [json.loads(e) for e in cached]
+
+        entries = ChatService._load_from_db(room_id, limit=ChatService._history_size(), newest=True)
+        if pipe is None:
+            return entries
+        try:
+            ChatService._write_history(pipe, key, entries)
+            # A message sent while the key was missing was dropped by append()'s RPUSHX;
+            # leave the rebuild to the next read rather than cache a list with a gap.
+            if entries and db.session.query(ChatMessage.id).filter(
+                    ChatMessage.room_id == room_id, ChatMessage.id > entries[-1]['id']).first():
+                redis_client.delete(key)
+        except WatchError:
+            pass
+        except Exception as e:
+            current_app.logger.warning(f'Failed to cache chat history for room {room_id}: {e}')
+        finally:
+            pipe.reset()
+        return entries
+
+    @staticmethod
+    def get_messages(room_id: int, after_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        # The cache holds a contiguous tail of the room's chat, so it can answer
+        # any `after` cursor inside that tail, or everything if the room is short.
+        history = ChatService.get_recent(room_id)
+        if len(history) < ChatService._history_size() or after_id >= history[0]['id']:
+            return [e for e in history if e['id'] > after_id][:limit]
+        return ChatService._load_from_db(room_id, after_id=after_id, limit=limit)
+
+    @staticmethod
+    def append(room_id: int, entry: Dict[str, Any]) -> None:
+        from app import redis_client
+        key = ChatService._key(room_id)
+        try:
+            # RPUSHX only extends an existing list: a cold cache is rebuilt from
+            # the DB on the next read instead of holding just this one message.
+            if redis_client.rpushx(key, json.dumps(entry)):
+                pipe = redis_client.pipeline()
+                pipe.ltrim(key, -ChatService._history_size(), -1)
+                pipe.expire(key, ChatService.HISTORY_TTL)
+                pipe.execute()
+        except Exception as e:
+            current_app.logger.warning(f'Failed to append chat history for room {room_id}: {e}')
+
+    @staticmethod
+    def clear(room_id: int) -> None:
+        from app import redis_client
+        try:
+            redis_client.delete(ChatService._key(room_id))
+        except Exception:
+            pass
@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select
+
+from app import db
+from app.http_cache import invalidate, video_counter_tags
+from app.models import User, Video, VideoComment
+
+
+class CommentService:
+
+    ORDERS = ('oldest', 'newest')
+    # Levels in a thread, the top-level comment included; deeper replies go to the parent's level.
+    MAX_DEPTH = 5
+
+    @staticmethod
+    def _path_segment(comment_id: int) -> str:
+        return f'{comment_id:010d}'
+
+    @staticmethod
+    def depth(comment: VideoComment) -> int:
+        return comment.path.count('/') if comment.path else 0
+
+    @staticmethod
+    def list_comments(video_id: int, order: str = 'oldest', cursor_id: Optional[int] = None,
+                      limit: int = 50) -> List[Tuple[VideoComment, Optional[User]]]:
+        """Live top-level comments with their authors, in one query.
+
+        Ordered by (created_at, id); `cursor_id` is the id of the last comment
+        of the previous page. Authors come from an outer join, so comments of
+        deleted accounts still show up with user None.
+        """
+        newest = order == 'newest'
+        query = db.session.query(VideoComment, User) \
+            .outerjoin(User, User.id == VideoComment.user_id) \
+            .filter(VideoComment.video_id == video_id, VideoComment.deleted_at.is_(None),
+                    VideoComment.parent_id.is_(None))
+
+        if cursor_id:
+            anchor = db.session.query(VideoComment.created_at) \
+                .filter_by(id=cursor_id, video_id=video_id).scalar()
+            if anchor is not None:
+                if newest:
+                    query = query.filter(or_(VideoComment.created_at < anchor,
+                                             and_(VideoComment.created_at == anchor, VideoComment.id < cursor_id)))
+                else:
+                    query = query.filter(or_(VideoComment.created_at > anchor,
+                                             and_(VideoComment.created_at == anchor, VideoComment.id > cursor_id)))
+
+        if newest:
+            query = query.order_by(VideoComment.created_at.desc(), VideoComment.id.desc())
+        else:
+            query = query.order_by(VideoComment.created_at.asc(), VideoComment.id.asc())
+        return query.limit(limit).all()
+
+    @staticmethod
+    def first_replies(thread_ids: List[int], per_thread: int) -> Dict[int, List[Tuple[VideoComment, Optional[User]]]]:
+        """The first `per_thread` live replies of each thread, in one query.
+
+        ROW_NUMBER() over each thread in path order, so every thread gets its
+        replies depth-first however many the others have.
+        """
+        result = {tid: [] for tid in thread_ids}
+        if not thread_ids or per_thread <= 0:
+            return result
+        rn = func.row_number().over(partition_by=VideoComment.thread_id, order_by=VideoComment.path).label('rn')
+        ranked = select(VideoComment.id, rn) \
+            .where(VideoComment.thread_id.in_(thread_ids),
+                   VideoComment.parent_id.isnot(None),
+                   VideoComment.deleted_at.is_(None)) \
+            .subquery()
+        rows = db.session.query(VideoComment, User) \
+            .join(ranked, ranked.c.id == VideoComment.id) \
+            .outerjoin(User, User.id == VideoComment.user_id) \
+            .filter(ranked.c.rn <= per_thread) \
+            .order_by(VideoComment.thread_id, VideoComment.path) \
+            .all()
+        for comment, user in rows:
+            result[comment.thread_id].append((comment, user))
+        return result
+
+    @staticmethod
+    def list_replies(thread: VideoComment, cursor_id: Optional[int] = None,
+                     limit: int = 50) -> List[Tuple[VideoComment, Optional[User]]]:
+        """Live replies of a thread in path order; `cursor_id` is the last reply already shown."""
+        query = db.session.query(VideoComment, User) \
+            .outerjoin(User, User.id == VideoComment.user_id) \
+            .filter(VideoComment.thread_id == thread.id,
+                    VideoComment.parent_id.isnot(None),
+                    VideoComment.deleted_at.is_(None))
+        if cursor_id:
+            anchor = db.session.query(VideoComment.path) \
+                .filter_by(id=cursor_id, thread_id=thread.id).scalar()
+            if anchor is not None:
+                query = query.filter(VideoComment.path > anchor)
+        return query.order_by(VideoComment.path).limit(limit).all()
+
+    @staticmethod
+    def add_comment(video: Video, user: User, content: str, parent: Optional[VideoComment] = None) -> VideoComment:
+        if parent is not None and CommentService.depth(parent) + 1 >= CommentService.MAX_DEPTH:
+            # Too deep: answer alongside the parent instead of under it.
+            parent = db.session.get(VideoComment, parent.parent_id)
+
+        comment = VideoComment(video_id=video.id, user_id=user.id, content=content,
+                               parent_id=parent.id if parent else None)
+        db.session.add(comment)
+        db.session.flush()
+        segment = CommentService._path_segment(comment.id)
+        if parent is None:
+            comment.thread_id = comment.id
+            comment.path = segment
+        else:
+            comment.thread_id = parent.thread_id
+            comment.path = f'{parent.path}/{segment}'
+            VideoComment.query.filter_by(id=parent.thread_id).update(
+                {'reply_count': VideoComment.reply_count + 1}, synchronize_session=False)
+        # Relative UPDATE: concurrent commenters never overwrite each other's increment.
+        Video.query.filter_by(id=video.id).update(
+            {'comments_count': Video.comments_count + 1}, synchronize_session=False)
+        db.session.commit()
+        invalidate(*video_counter_tags(video))
+        return comment
+
+    @staticmethod
+    def delete_comment(comment: VideoComment) -> bool:
+        """Soft-delete; False if it was already deleted (e.g. by a concurrent request).
+
+        Deleting a top-level comment deletes its whole thread: only live roots
+        are listed, so replies left under a deleted one could not be reached.
+        """
+        now = datetime.utcnow()
+        deleted = VideoComment.query.filter_by(id=comment.id, deleted_at=None) \
+            .update({'deleted_at': now}, synchronize_session=False)
+        if deleted:
+            if comment.parent_id is not None:
+                VideoComment.query.filter(VideoComment.id == comment.thread_id, VideoComment.reply_count > 0) \
+                    .update({'reply_count': VideoComment.reply_count - 1}, synchronize_session=False)
+            else:
+                deleted += VideoComment.query.filter(VideoComment.thread_id == comment.id,
+                                                     VideoComment.parent_id.isnot(None),
+                                                     VideoComment.deleted_at.is_(None)) \
+                    .update({'deleted_at': now}, synchronize_session=False)
+                VideoComment.query.filter_by(id=comment.id).update({'reply_count': 0}, synchronize_session=False)
+            Video.query.filter(Video.id == comment.video_id).update(
+                {'comments_count': case((Video.comments_count > deleted, Video.comments_count - deleted), else_=0)},
+                synchronize_session=False)
+        db.session.commit()
+        if deleted:
+            invalidate(*video_counter_tags(comment.video))
+        return bool(deleted)
+
+    @staticmethod
+    def recount_comments() -> None:
+        """Recompute every video's comments_count from the live comments."""
+        live = select(func.count(VideoComment.id)) \
+            .where(VideoComment.video_id == Video.id, VideoComment.deleted_at.is_(None)) \
+            .scalar_subquery()
+        db.session.execute(Video.__table__.update().values(comments_count=live))
+        db.session.commit()
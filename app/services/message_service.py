@@ -0,0 +1,111 @@
+from typing import Optional, List, Tuple
+from sqlalchemy import case, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import Conversation, DirectMessage, User
+
+
+PREVIEW_LENGTH = 100
+
+
+class MessageService:
+
+    @staticmethod
+    def _upsert_conversation(user_id: int, partner_id: int, msg: DirectMessage, unread_increment: int) -> None:
+        preview = msg.content[:PREVIEW_LENGTH]
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+            stmt = insert(Conversation).values(
+                user_id=user_id,
+                partner_id=partner_id,
+                last_message_id=msg.id,
+                last_message_preview=preview,
+                last_message_at=msg.created_at,
+                unread_count=unread_increment
+            )
+            # Two messages committed out of order must not move the summary backwards.
+            is_newer = stmt.excluded.last_message_id > Conversation.last_message_id
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'partner_id'],
+                set_={
+                    'last_message_id': case((is_newer, stmt.excluded.last_message_id), else_=Conversation.last_message_id),
+                    'last_message_preview': case((is_newer, stmt.excluded.last_message_preview), else_=Conversation.last_message_preview),
+                    'last_message_at': case((is_newer, stmt.excluded.last_message_at), else_=Conversation.last_message_at),
+                    'unread_count': Conversation.unread_count + unread_increment
+                }
+            )
+            db.session.execute(stmt)
+            return
+
+        conv = Conversation.query.filter_by(user_id=user_id, partner_id=partner_id).with_for_update().first()
+        if not conv:
+            conv = Conversation(user_id=user_id, partner_id=partner_id, last_message_id=0, unread_count=0)
+            db.session.add(conv)
+        if msg.id > conv.last_message_id:
+            conv.last_message_id = msg.id
+            conv.last_message_preview = preview
+            conv.last_message_at = msg.created_at
+        conv.unread_count = (conv.unread_count or 0) + unread_increment
+
+    @staticmethod
+    def record_message(msg: DirectMessage) -> None:
+        """Update both sides' inbox rows. Runs inside the caller's transaction."""
+        if msg.id is None:
+            db.session.flush()
+        MessageService._upsert_conversation(msg.sender_id, msg.recipient_id, msg, 0)
+        MessageService._upsert_conversation(msg.recipient_id, msg.sender_id, msg, 1)
+
+    @staticmethod
+    def mark_read(user_id: int, partner_id: int, up_to_id: Optional[int] = None) -> int:
+        """Mark messages from `partner_id` as read and adjust the reader's unread counter.
+
+        Returns how many messages changed state; the caller commits.
+        """
+        query = DirectMessage.query.filter_by(sender_id=partner_id, recipient_id=user_id, is_read=False)
+        if up_to_id is not None:
+            query = query.filter(DirectMessage.id <= up_to_id)
+        updated = query.update({'is_read': True}, synchronize_session=False)
+        if updated:
+            Conversation.query.filter_by(user_id=user_id, partner_id=partner_id).update({
+                'unread_count': case(
+                    (Conversation.unread_count > updated, Conversation.unread_count - updated),
+                    else_=0
+                )
+            }, synchronize_session=False)
+        return updated
+
+    @staticmethod
+    def list_conversations(user_id: int, before_id: Optional[int] = None, limit: int = 50) -> List[Tuple[Conversation, User]]:
+        """Inbox page, newest thread first, keyed by last_message_id."""
+        query = db.session.query(Conversation, User) \
+            .join(User, User.id == Conversation.partner_id) \
+            .filter(Conversation.user_id == user_id)
+        if before_id:
+            query = query.filter(Conversation.last_message_id < before_id)
+        return query.order_by(Conversation.last_message_id.desc()).limit(limit).all()
+
+    @staticmethod
+    def backfill_conversations() -> int:
+        """Build inbox rows from existing direct messages (one-off migration)."""
+        result = db.session.execute(text(f"""
+            INSERT INTO conversations
+                (user_id, partner_id, last_message_id, last_message_preview, last_message_at, unread_count)
+            SELECT pairs.user_id, pairs.partner_id, pairs.last_id,
+                   SUBSTR(dm.content, 1, {PREVIEW_LENGTH}), dm.created_at, pairs.unread
+            FROM (
+                SELECT user_id, partner_id, MAX(id) AS last_id, SUM(unread) AS unread
+                FROM (
+                    SELECT sender_id AS user_id, recipient_id AS partner_id, id, 0 AS unread
+                    FROM direct_messages
+                    UNION ALL
+                    SELECT recipient_id, sender_id, id, CASE WHEN is_read THEN 0 ELSE 1 END
+                    FROM direct_messages
+                ) AS sides
+                GROUP BY user_id, partner_id
+            ) AS pairs
+            JOIN direct_messages dm ON dm.id = pairs.last_id
+        """))
+        return result.rowcount
@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_
+
+from app import db
+from app.http_cache import invalidate
+from app.models import ModerationLog, User, Video, VideoReport
+
+MODERATION_REASON_CODES = {
+    'spam': 'Спам/реклама',
+    'adult': '18+/неподходящий контент',
+    'copyright': 'Нарушение авторских прав',
+    'violence': 'Насилие/шок',
+    'harassment': 'Хейт/травля',
+    'other': 'Другое'
+}
+
+REPORT_RESOLUTIONS = ('resolved', 'dismissed')
+
+
+class ModerationService:
+
+    MAX_BULK_IDS = 500
+
+    @staticmethod
+    def _log_rows(video_ids: List[int], moderator: User, action: str, reason_code: str,
+                  reason_text: Optional[str]) -> None:
+        if not video_ids:
+            return
+        now = datetime.utcnow()
+        db.session.execute(ModerationLog.__table__.insert(), [{
+            'video_id': vid,
+            'moderator_id': moderator.id,
+            'action': action,
+            'reason_code': reason_code,
+            'reason_text': reason_text,
+            'created_at': now,
+        } for vid in video_ids])
+
+    @staticmethod
+    def set_report_status(status: str, moderator: User, report_ids: Optional[List[int]] = None,
+                          video_ids: Optional[List[int]] = None) -> Dict:
+        """Resolve or dismiss pending reports, picked by id and/or by video, in one UPDATE.
+
+        Writes one log row per affected video.
+        """
+        if status not in REPORT_RESOLUTIONS:
+            raise ValueError(f"status must be one of: {', '.join(REPORT_RESOLUTIONS)}")
+        targets = []
+        if report_ids:
+            targets.append(VideoReport.id.in_(report_ids))
+        if video_ids:
+            targets.append(VideoReport.video_id.in_(video_ids))
+        if not targets:
+            raise ValueError('report_ids or video_ids is required')
+        pending = VideoReport.query.filter(or_(*targets), VideoReport.status == 'pending')
+        affected = sorted({r[0] for r in pending.with_entities(VideoReport.video_id).distinct()})
+        updated = pending.update({'status': status}, synchronize_session=False)
+        ModerationService._log_rows(affected, moderator, f'reports_{status}', 'report', None)
+        db.session.commit()
+        return {'updated': updated, 'video_ids': affected}
+
+    @staticmethod
+    def remove_videos(video_ids: List[int], moderator: User, reason_code: str,
+                      reason_text: Optional[str] = None) -> Dict:
+        """Soft-remove videos and resolve their pending reports, all in one transaction."""
+        if reason_code not in MODERATION_REASON_CODES:
+            raise ValueError('Invalid reason_code')
+        if reason_code == 'other' and not reason_text:
+            raise ValueError('reason_text is required for other')
+
+        rows = db.session.query(Video.id, Video.channel_id) \
+            .filter(Video.id.in_(video_ids), Video.status != 'removed').all()
+        to_remove = [vid for vid, _ in rows]
+        if to_remove:
+            Video.query.filter(Video.id.in_(to_remove)).update({'status': 'removed'}, synchronize_session=False)
+            resolved = VideoReport.query.filter(VideoReport.video_id.in_(to_remove), VideoReport.status == 'pending') \
+                .update({'status': 'resolved'}, synchronize_session=False)
+        else:
+            resolved = 0
+        ModerationService._log_rows(to_remove, moderator, 'remove', reason_code, reason_text)
+        db.session.commit()
+        if rows:
+            invalidate('feed', *[f'video:{vid}' for vid, _ in rows], *{f'channel:{cid}' for _, cid in rows})
+        return {'removed': to_remove, 'reports_resolved': resolved}
+
+    @staticmethod
+    def report_queue(cursor_video_id: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        """Pending reports grouped by video, most reported first, then longest waiting.
+
+        `cursor_video_id` is the last video of the previous page; its position
+        is re-read, so a video that got more reports since may be skipped or
+        shown twice, which is fine for a work queue.
+        """
+        reports = func.count(VideoReport.id).label('reports')
+        first_at = func.min(VideoReport.created_at).label('first_reported_at')
+        last_at = func.max(VideoReport.created_at).label('last_reported_at')
+        query = db.session.query(VideoReport.video_id, reports, first_at, last_at) \
+            .filter(VideoReport.status == 'pending') \
+            .group_by(VideoReport.video_id)
+
+        if cursor_video_id:
+            anchor = db.session.query(func.count(VideoReport.id), func.min(VideoReport.created_at)) \
+                .filter(VideoReport.status == 'pending', VideoReport.video_id == cursor_video_id).first()
+            if anchor and anchor[0]:
+                count, first = anchor
+                query = query.having(or_(
+                    reports < count,
+                    and_(reports == count, first_at > first),
+                    and_(reports == count, first_at == first, VideoReport.video_id > cursor_video_id),
+                ))
+
+        groups = query.order_by(reports.desc(), first_at.asc(), VideoReport.video_id.asc()).limit(limit).all()
+        if not groups:
+            return []
+
+        video_ids = [g.video_id for g in groups]
+        videos = {v.id: v for v in Video.query.filter(Video.id.in_(video_ids))}
+        reasons: Dict[int, List[Dict]] = {vid: [] for vid in video_ids}
+        for r in VideoReport.query.filter(VideoReport.video_id.in_(video_ids), VideoReport.status == 'pending') \
+                .order_by(VideoReport.created_at.desc()):
+            if len(reasons[r.video_id]) < 5:
+                reasons[r.video_id].append({'id': r.id, 'reason': r.reason, 'created_at': r.created_at.isoformat()})
+
+        return [{
+            'video_id': g.video_id,
+            'title': videos[g.video_id].title if g.video_id in videos else None,
+            'video_status': videos[g.video_id].status if g.video_id in videos else None,
+            'reports': g.reports,
+            'first_reported_at': g.first_reported_at.isoformat(),
+            'last_reported_at': g.last_reported_at.isoformat(),
+            'latest_reports': reasons[g.video_id],
+        } for g in groups]
@@ -0,0 +1,390 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from flask import current_app
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from redis.exceptions import WatchError
+
+from app import db, socketio
+from app.models import Notification, Subscription, User, Video
+
+
+# Adjust a cached unread counter only if it exists: a missing key means "unknown",
+# and creating it from a delta would invent a wrong count. A non-numeric value is
+# a reader's pending marker (see get_unread_count): the count it is taking may
+# miss this change, so the marker is spoiled and that count never gets cached.
+# Never goes below zero.
+UNREAD_INCR_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return nil
+end
+if not tonumber(current) then
+    redis.call('SET', KEYS[1], 'stale', 'KEEPTTL')
+    return nil
+end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value < 0 then
+    redis.call('SET', KEYS[1], 0, 'KEEPTTL')
+    value = 0
+end
+return value
+"""
+
+
+class NotificationService:
+
+    UNREAD_KEY_PREFIX = 'notif_unread:'
+    # Lifetime of the marker a reader holds while counting from the database.
+    UNREAD_PENDING_TTL = 30
+
+    _script = None
+    _script_client = None
+    _scripting_available = True
+
+    @staticmethod
+    def _unread_key(user_id: int) -> str:
+        return f"{NotificationService.UNREAD_KEY_PREFIX}{user_id}"
+
+    @staticmethod
+    def _get_script(client):
+        if NotificationService._script is None or NotificationService._script_client is not client:
+            NotificationService._script = client.register_script(UNREAD_INCR_SCRIPT)
+            NotificationService._script_client = client
+        return NotificationService._script
+
+    @staticmethod
+    def _push_unread(user_id: int, count: int):
+        from app.websocket.user_events import emit_to_user
+        emit_to_user(user_id, 'notifications_unread', {'count': int(count)})
+
+    @staticmethod
+    def get_unread_count(user_id: int) -> int:
+        """Unread badge count, from Redis when cached.
+
+        The counter expires after NOTIFICATION_UNREAD_TTL; the next read then
+        recounts from the database, which reconciles any drift. A recount first
+        parks a pending marker in the key, and caches its result only if no
+        unread change spoiled the marker meanwhile: a notification committed
+        after the COUNT would otherwise be missing until the TTL.
+        """
+        from app import redis_client
+        key = NotificationService._unread_key(user_id)
+        token = None
+        try:
+            cached = redis_client.get(key)
+            if cached is not None and cached.isdigit():
+                return int(cached)
+            if cached is None:
+                token = f'pending:{uuid.uuid4().hex}'
+                if not redis_client.set(key, token, nx=True, ex=NotificationService.UNREAD_PENDING_TTL):
+                    token = None
+        except Exception as e:
+            current_app.logger.warning(f'Unread counter cache unavailable: {e}')
+
+        count = Notification.query.filter_by(user_id=user_id, is_read=False).count()
+        if token is not None:
+            try:
+                NotificationService._store_count(redis_client, key, token, count)
+            except Exception:
+                pass
+        return count
+
+    @staticmethod
+    def _store_count(client, key: str, token: str, count: int):
+        with client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                current = pipe.get(key)
+                pipe.multi()
+                if current == token.encode():
+                    pipe.set(key, count, ex=current_app.config['NOTIFICATION_UNREAD_TTL'])
+                elif current == b'stale':
+                    # Spoiled by an unread change: the next read counts again.
+                    pipe.delete(key)
+                pipe.execute()
+            except WatchError:
+                pass
+
+    @staticmethod
+    def _incr_without_scripting(client, key: str, delta: int) -> Optional[int]:
+        # Used when the server has no Lua support (e.g. fakeredis without lupa).
+        current = client.get(key)
+        if current is None:
+            return None
+        if not current.isdigit():
+            client.set(key, 'stale', keepttl=True)
+            return None
+        value = client.incrby(key, delta)
+        if client.ttl(key) == -1:
+            # The key expired between EXISTS and INCRBY and was recreated from the delta.
+            client.delete(key)
+            return None
+        if value < 0:
+            client.set(key, 0, keepttl=True)
+            value = 0
+        return value
+
+    @staticmethod
+    def adjust_unread(user_ids: List[int], delta: int):
+        """Apply `delta` to the cached counters of `user_ids` (after the DB commit) and push them.
+
+        Users without a cached counter are skipped: their next read recounts.
+        """
+        if not user_ids or not delta:
+            return
+        from app import redis_client
+        keys = [NotificationService._unread_key(uid) for uid in user_ids]
+        try:
+            values = None
+            if NotificationService._scripting_available:
+                try:
+                    script = NotificationService._get_script(redis_client)
+                    pipe = redis_client.pipeline(transaction=False)
+                    for key in keys:
+                        script(keys=[key], args=[delta], client=pipe)
+                    values = pipe.execute()
+                except ImportError:
+                    NotificationService._scripting_available = False
+            if values is None:
+                values = [NotificationService._incr_without_scripting(redis_client, key, delta) for key in keys]
+        except Exception as e:
+            current_app.logger.warning(f'Failed to update unread counters: {e}')
+            return
+        for uid, value in zip(user_ids, values):
+            if value is not None:
+                NotificationService._push_unread(uid, value)
+
+    @staticmethod
+    def reset_unread(user_id: int):
+        from app import redis_client
+        try:
+            redis_client.set(NotificationService._unread_key(user_id), 0,
+                             ex=current_app.config['NOTIFICATION_UNREAD_TTL'])
+        except Exception as e:
+            current_app.logger.warning(f'Failed to reset unread counter: {e}')
+        NotificationService._push_unread(user_id, 0)
+
+    @staticmethod
+    def invalidate_unread(user_ids: List[int]):
+        from app import redis_client
+        if not user_ids:
+            return
+        try:
+            redis_client.delete(*[NotificationService._unread_key(uid) for uid in user_ids])
+        except Exception as e:
+            current_app.logger.warning(f'Failed to invalidate unread counters: {e}')
+
+    @staticmethod
+    def mark_read(user_id: int, notification_id: int) -> Optional[bool]:
+        """None if the notification does not exist, else whether it was unread."""
+        changed = Notification.query.filter_by(id=notification_id, user_id=user_id, is_read=False) \
+            .update({'is_read': True}, synchronize_session=False)
+        if not changed and not Notification.query.filter_by(id=notification_id, user_id=user_id).first():
+            return None
+        db.session.commit()
+        if changed:
+            NotificationService.adjust_unread([user_id], -changed)
+        return bool(changed)
+
+    @staticmethod
+    def mark_all_read(user_id: int) -> int:
+        changed = Notification.query.filter_by(user_id=user_id, is_read=False) \
+            .update({'is_read': True}, synchronize_session=False)
+        db.session.commit()
+        NotificationService.reset_unread(user_id)
+        return changed
+
+    @staticmethod
+    def notify_grouped(user_id: int, type: str, group_key: str, render: Callable[[int], str]) -> bool:
+        """Record one event, collapsing it into the user's unread notification for `group_key`.
+
+        `render(n)` builds the text for n collapsed events. The collapsed row is
+        moved to the top of the list. Returns True if a new row was inserted,
+        i.e. the unread count grew; the caller commits.
+        """
+        now = datetime.utcnow()
+        for _ in range(2):
+            collapsed = Notification.query.filter_by(user_id=user_id, group_key=group_key, is_read=False) \
+                .update({'event_count': Notification.event_count + 1, 'created_at': now},
+                        synchronize_session=False)
+            if collapsed:
+                notif = Notification.query.filter_by(user_id=user_id, group_key=group_key, is_read=False).first()
+                notif.content = render(notif.event_count)[:500]
+                return False
+            try:
+                # A concurrent sender may insert the same group first: the partial
+                # unique index rejects ours and the next pass collapses into theirs.
+                with db.session.begin_nested():
+                    db.session.add(Notification(user_id=user_id, type=type, content=render(1)[:500],
+                                                group_key=group_key, event_count=1, created_at=now))
+                return True
+            except IntegrityError:
+                continue
+        return False
+
+    @staticmethod
+    def list_notifications(user_id: int, before_id: Optional[int] = None, limit: int = 50) -> List[Notification]:
+        """Newest first. Page with `before_id` = id of the last notification already shown."""
+        query = Notification.query.filter_by(user_id=user_id)
+        if before_id:
+            anchor = db.session.query(Notification.created_at) \
+                .filter_by(id=before_id, user_id=user_id).scalar()
+            if anchor is not None:
+                query = query.filter(or_(Notification.created_at < anchor,
+                                         and_(Notification.created_at == anchor, Notification.id < before_id)))
+            else:
+                # The anchor was compacted away; ids still grow with time.
+                query = query.filter(Notification.id < before_id)
+        return query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def compact(retention_days: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+        """Delete read notifications older than the retention window, one batch per commit.
+
+        Unread ones are never touched, so the cached unread counters stay valid.
+        """
+        if retention_days is None:
+            retention_days = current_app.config['NOTIFICATION_RETENTION_DAYS']
+        batch_size = batch_size or current_app.config['NOTIFICATION_COMPACTION_BATCH_SIZE']
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+        started = time.perf_counter()
+        deleted = 0
+        while True:
+            ids = [r[0] for r in db.session.query(Notification.id)
+                   .filter(Notification.is_read == True, Notification.created_at < cutoff)
+                   .order_by(Notification.created_at)
+                   .limit(batch_size)]
+            if not ids:
+                break
+            Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+
+        current_app.logger.info(
+            f'Notification compaction: deleted {deleted} read notifications older than {retention_days} days '
+            f'in {time.perf_counter() - started:.2f}s'
+        )
+        return deleted
+
+    @staticmethod
+    def _subscriber_chunk(channel_id: int, after_user_id: int, limit: int) -> List[int]:
+        # Keyset over ix_subscriptions_channel_user; users who muted notifications are skipped here.
+        rows = db.session.query(Subscription.user_id) \
+            .join(User, User.id == Subscription.user_id) \
+            .filter(Subscription.channel_id == channel_id,
+                    Subscription.user_id > after_user_id,
+                    User.notifications_enabled == True) \
+            .order_by(Subscription.user_id) \
+            .limit(limit).all()
+        return [r[0] for r in rows]
+
+    @staticmethod
+    def bulk_insert(rows: List[dict]) -> List[int]:
+        """Insert notification rows in one batch, skipping (user_id, dedupe_key) duplicates.
+
+        Returns the user ids that actually got a row; the caller commits.
+        """
+        if not rows:
+            return []
+        dialect = db.session.get_bind().dialect.name
+        table = Notification.__table__
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+            # One statement executed with many parameter sets: compiled once and
+            # batched by the driver, unlike a giant multi-row VALUES clause.
+            stmt = insert(table).on_conflict_do_nothing(index_elements=['user_id', 'dedupe_key'])
+            if db.session.get_bind().dialect.insert_executemany_returning:
+                return [r[0] for r in db.session.execute(stmt.returning(table.c.user_id), rows)]
+            result = db.session.execute(stmt, rows)
+            if result.rowcount == len(rows):
+                return [r['user_id'] for r in rows]
+            # Some rows were duplicates and the driver cannot say which: their
+            # cached unread counters get recounted instead of incremented.
+            NotificationService.invalidate_unread([r['user_id'] for r in rows])
+            return []
+
+        keys = {r['dedupe_key'] for r in rows if r.get('dedupe_key')}
+        existing = set()
+        if keys:
+            existing = set(db.session.query(Notification.user_id, Notification.dedupe_key).filter(
+                Notification.user_id.in_([r['user_id'] for r in rows]),
+                Notification.dedupe_key.in_(keys)
+            ).all())
+        rows = [r for r in rows if (r['user_id'], r.get('dedupe_key')) not in existing]
+        if rows:
+            db.session.execute(table.insert(), rows)
+        return [r['user_id'] for r in rows]
+
+    @staticmethod
+    def fan_out_new_video(video_id: int, chunk_size: Optional[int] = None) -> dict:
+        """Notify every subscriber of the video's channel about it.
+
+        Works in keyset chunks of subscriber ids, one INSERT and one commit per
+        chunk, so the write lock is never held for long and a crash mid-way
+        loses at most one chunk of work. Safe to re-run: rows carry
+        dedupe_key 'video:<id>' and duplicates are skipped.
+        """
+        chunk_size = chunk_size or current_app.config['NOTIFICATION_FANOUT_CHUNK_SIZE']
+        video = db.session.get(Video, video_id)
+        if not video or video.status != 'ready':
+            return {'video_id': video_id, 'subscribers': 0, 'inserted': 0, 'seconds': 0.0}
+
+        channel = video.channel
+        content = f'New video on {channel.name}: {video.title}'[:500]
+        dedupe_key = f'video:{video.id}'
+        channel_id, author_id = channel.id, channel.author_id
+
+        started = time.perf_counter()
+        subscribers = inserted = 0
+        after = 0
+        while True:
+            user_ids = NotificationService._subscriber_chunk(channel_id, after, chunk_size)
+            if not user_ids:
+                break
+            now = datetime.utcnow()
+            rows = [{
+                'user_id': uid,
+                'type': 'new_video',
+                'content': content,
+                'is_read': False,
+                'created_at': now,
+                'dedupe_key': dedupe_key,
+            } for uid in user_ids if uid != author_id]
+            notified = NotificationService.bulk_insert(rows)
+            db.session.commit()
+            NotificationService.adjust_unread(notified, 1)
+            inserted += len(notified)
+            subscribers += len(user_ids)
+            after = user_ids[-1]
+
+        seconds = time.perf_counter() - started
+        current_app.logger.info(
+            f'New-video fan-out for video {video_id}: {inserted} notifications for {subscribers} subscribers '
+            f'in {seconds:.2f}s ({inserted / max(seconds, 1e-9):.0f}/s)'
+        )
+        return {'video_id': video_id, 'subscribers': subscribers, 'inserted': inserted, 'seconds': seconds}
+
+    @staticmethod
+    def schedule_new_video_fanout(video: Video):
+        """Kick off the fan-out once the upload has committed."""
+        if not current_app.config.get('NOTIFICATION_FANOUT_ASYNC', True):
+            NotificationService.fan_out_new_video(video.id)
+            return
+        app = current_app._get_current_object()
+
+        def run(video_id):
+            with app.app_context():
+                try:
+                    NotificationService.fan_out_new_video(video_id)
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f'New-video fan-out failed for video {video_id}: {e}')
+
+        socketio.start_background_task(run, video.id)
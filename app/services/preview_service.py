@@ -0,0 +1,169 @@
+import math
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from typing import List, Optional, Tuple
+
+from flask import current_app
+
+from app import db, socketio
+from app.models import Video
+
+
+TRACK_NAME = 'thumbnails.vtt'
+SPRITE_NAME = 'sprite-{}.jpg'
+
+
+def _timestamp(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    h, rest = divmod(ms, 3600 * 1000)
+    m, rest = divmod(rest, 60 * 1000)
+    s, ms = divmod(rest, 1000)
+    return f'{h:02d}:{m:02d}:{s:02d}.{ms:03d}'
+
+
+class PreviewService:
+    """Seek-preview sprite sheets and their WebVTT thumbnail track.
+
+    One ffmpeg pass samples a frame every `interval` seconds, scales it to a
+    PREVIEW_TILE_WIDTH x PREVIEW_TILE_HEIGHT tile and packs PREVIEW_COLUMNS x
+    PREVIEW_ROWS tiles per JPEG sheet. `thumbnails.vtt` maps each interval to
+    a sheet region (`sprite-0.jpg#xywh=...`), so a player fetches a handful of
+    images instead of seeking through the video. Files live in
+    PREVIEW_FOLDER/<video file stem>/ and never change once written.
+    """
+
+    _semaphore = None
+    _semaphore_lock = threading.Lock()
+
+    @staticmethod
+    def _dir(video: Video) -> str:
+        stem = os.path.splitext(os.path.basename(video.file_path))[0]
+        return os.path.join(current_app.config['PREVIEW_FOLDER'], stem)
+
+    @staticmethod
+    def interval(duration: int) -> int:
+        """Seconds between frames: PREVIEW_INTERVAL, stretched so long videos stay under PREVIEW_MAX_FRAMES."""
+        base = current_app.config['PREVIEW_INTERVAL']
+        return max(base, math.ceil((duration or 0) / current_app.config['PREVIEW_MAX_FRAMES']))
+
+    @staticmethod
+    def get_track_url(video: Video) -> Optional[str]:
+        """URL of the WebVTT thumbnail track, or None until it has been generated."""
+        if not os.path.exists(os.path.join(PreviewService._dir(video), TRACK_NAME)):
+            return None
+        return f'/previews/{os.path.basename(PreviewService._dir(video))}/{TRACK_NAME}'
+
+    @staticmethod
+    def _cues(duration: int, interval: int, sheets: int) -> List[Tuple[float, float, int, int, int]]:
+        """(start, end, sheet, x, y) per frame that made it into one of `sheets` sheets."""
+        cfg = current_app.config
+        cols, per_sheet = cfg['PREVIEW_COLUMNS'], cfg['PREVIEW_COLUMNS'] * cfg['PREVIEW_ROWS']
+        frames = min(math.ceil(duration / interval), sheets * per_sheet)
+        cues = []
+        for i in range(frames):
+            sheet, cell = divmod(i, per_sheet)
+            row, col = divmod(cell, cols)
+            cues.append((i * interval, min((i + 1) * interval, duration), sheet,
+                         col * cfg['PREVIEW_TILE_WIDTH'], row * cfg['PREVIEW_TILE_HEIGHT']))
+        return cues
+
+    @staticmethod
+    def _write_track(path: str, cues):
+        w, h = current_app.config['PREVIEW_TILE_WIDTH'], current_app.config['PREVIEW_TILE_HEIGHT']
+        lines = ['WEBVTT', '']
+        for start, end, sheet, x, y in cues:
+            lines.append(f'{_timestamp(start)} --> {_timestamp(end)}')
+            # Relative to the track's own URL.
+            lines.append(f'{SPRITE_NAME.format(sheet)}#xywh={x},{y},{w},{h}')
+            lines.append('')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+    @staticmethod
+    def generate(video_id: int) -> bool:
+        """Build sprites and track for a video; a no-op if they exist. Returns whether they exist afterwards."""
+        video = db.session.get(Video, video_id)
+        if not video or not video.duration or not os.path.exists(video.file_path):
+            return False
+        target = PreviewService._dir(video)
+        if os.path.exists(os.path.join(target, TRACK_NAME)):
+            return True
+
+        cfg = current_app.config
+        interval = PreviewService.interval(video.duration)
+        w, h = cfg['PREVIEW_TILE_WIDTH'], cfg['PREVIEW_TILE_HEIGHT']
+        work = f'{target}.{uuid.uuid4().hex}.tmp'
+        os.makedirs(work)
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            # Keyframes only when the interval is long enough that the nearest keyframe is close enough.
+            *(['-skip_frame', 'nokey'] if interval >= cfg['PREVIEW_KEYFRAMES_ONLY_INTERVAL'] else []),
+            '-i', video.file_path,
+            '-an', '-sn',
+            '-vf', (f'fps=1/{interval},'
+                    f'scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,'
+                    f"tile={cfg['PREVIEW_COLUMNS']}x{cfg['PREVIEW_ROWS']}"),
+            '-vsync', 'vfr',
+            '-q:v', str(cfg['PREVIEW_JPEG_QUALITY']),
+            '-start_number', '0',
+            os.path.join(work, SPRITE_NAME.replace('{}', '%d')),
+        ]
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False,
+                           timeout=cfg['PREVIEW_GENERATE_TIMEOUT'])
+            sheets = 0
+            while os.path.exists(os.path.join(work, SPRITE_NAME.format(sheets))):
+                sheets += 1
+            if not sheets:
+                current_app.logger.warning(f'ffmpeg produced no preview sprites for video {video_id}')
+                return False
+            PreviewService._write_track(os.path.join(work, TRACK_NAME),
+                                        PreviewService._cues(video.duration, interval, sheets))
+            # The directory appears complete or not at all.
+            os.replace(work, target)
+        except (OSError, subprocess.SubprocessError) as e:
+            # A concurrent run that renamed its directory into place first makes ours fail.
+            if os.path.exists(os.path.join(target, TRACK_NAME)):
+                return True
+            current_app.logger.warning(f'Preview generation failed for video {video_id}: {e}')
+            return False
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        current_app.logger.info(f'Preview sprites for video {video_id}: {sheets} sheets, every {interval}s')
+        return True
+
+    @staticmethod
+    def remove(video: Video):
+        shutil.rmtree(PreviewService._dir(video), ignore_errors=True)
+
+    @staticmethod
+    def _get_semaphore():
+        with PreviewService._semaphore_lock:
+            if PreviewService._semaphore is None:
+                PreviewService._semaphore = threading.BoundedSemaphore(current_app.config['PREVIEW_MAX_CONCURRENT'])
+            return PreviewService._semaphore
+
+    @staticmethod
+    def schedule(video: Video):
+        """Generate previews in the background once the upload has committed."""
+        if not current_app.config.get('VIDEO_PROCESSING_ENABLED', True):
+            return
+        if not current_app.config.get('PREVIEW_ASYNC', True):
+            PreviewService.generate(video.id)
+            return
+        app = current_app._get_current_object()
+
+        def run(video_id):
+            with app.app_context():
+                # Each job is a CPU-heavy ffmpeg; the rest queue up here.
+                with PreviewService._get_semaphore():
+                    try:
+                        PreviewService.generate(video_id)
+                    except Exception as e:
+                        db.session.rollback()
+                        app.logger.error(f'Preview generation failed for video {video_id}: {e}')
+
+        socketio.start_background_task(run, video.id)
@@ -0,0 +1,82 @@
+from typing import Optional
+from flask import current_app
+
+
+# Fixed-window "one action per interval" limiter. SET NX PX claims the window
+# and lets Redis expire it; if the window is already taken we return the
+# remaining TTL in milliseconds. One round trip, atomic across workers.
+SLOW_MODE_SCRIPT = """
+if redis.call('SET', KEYS[1], '1', 'NX', 'PX', ARGV[1]) then
+    return 0
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[1])
+    return tonumber(ARGV[1])
+end
+return ttl
+"""
+
+
+class RateLimitService:
+
+    KEY_PREFIX = 'slowmode:'
+
+    _script = None
+    _script_client = None
+    _scripting_available = True
+
+    @staticmethod
+    def room_chat_key(room_id: int, user_id: int) -> str:
+        return f"{RateLimitService.KEY_PREFIX}room:{room_id}:user:{user_id}"
+
+    @staticmethod
+    def _get_script(client):
+        if RateLimitService._script is None or RateLimitService._script_client is not client:
+            RateLimitService._script = client.register_script(SLOW_MODE_SCRIPT)
+            RateLimitService._script_client = client
+        return RateLimitService._script
+
+    @staticmethod
+    def _acquire_without_scripting(client, key: str, interval_ms: int) -> int:
+        # Used when the server has no Lua support (e.g. fakeredis without lupa).
+        # SET NX PX is still atomic; only the TTL read is a separate call.
+        if client.set(key, '1', nx=True, px=interval_ms):
+            return 0
+        ttl = client.pttl(key)
+        return ttl if ttl and ttl > 0 else interval_ms
+
+    @staticmethod
+    def acquire(key: str, interval_seconds: float) -> float:
+        """Try to take the slot for `key`.
+
+        Returns 0 when the action is allowed, otherwise the number of seconds
+        until the caller may try again. Fails open if Redis is unreachable.
+        """
+        if not interval_seconds or interval_seconds <= 0:
+            return 0.0
+
+        from app import redis_client
+        interval_ms = int(interval_seconds * 1000)
+        try:
+            if RateLimitService._scripting_available:
+                try:
+                    remaining_ms = RateLimitService._get_script(redis_client)(keys=[key], args=[interval_ms])
+                except ImportError:
+                    RateLimitService._scripting_available = False
+                    remaining_ms = RateLimitService._acquire_without_scripting(redis_client, key, interval_ms)
+            else:
+                remaining_ms = RateLimitService._acquire_without_scripting(redis_client, key, interval_ms)
+        except Exception as e:
+            current_app.logger.warning(f'Rate limiter unavailable, allowing request: {e}')
+            return 0.0
+        return int(remaining_ms) / 1000.0
+
+    @staticmethod
+    def check_room_chat(room, user_id: int) -> Optional[float]:
+        """Enforce `Room.message_delay` for a user; returns seconds to wait or None."""
+        remaining = RateLimitService.acquire(
+            RateLimitService.room_chat_key(room.id, user_id),
+            room.message_delay or 0
+        )
+        return remaining if remaining > 0 else None
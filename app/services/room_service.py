@@ -2,6 +2,8 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from app import db
 from app.models import Room, RoomParticipant, RoomInvitation, User, Video, Subscription
+from app.services.chat_service import ChatService
+from app.schemas import dump_room
 
 
 class RoomService:
@@ -29,6 +31,9 @@ class RoomService:
         db.session.add(room)
         db.session.commit()
 
+        # SQLite may hand out the id of a deleted room again; never show its chat.
+        ChatService.clear(room.id)
+
         RoomService.join_room(room.id, host_id)
         return room
 
@@ -122,28 +127,31 @@ class RoomService:
         return invitation
 
     @staticmethod
-    def to_dict(room: Room, include_participants: bool = False) -> Dict[str, Any]:
-        current_participants = RoomParticipant.query.filter_by(room_id=room.id).count()
-        data = {
-            'id': room.id,
-            'owner_id': room.owner_id,
-            'video_id': room.video_id,
-            'name': room.name,
-            'max_participants': room.max_participants,
-            'current_participants': current_participants,
-            'last_activity': room.last_activity.isoformat() if room.last_activity else None,
-            'created_at': room.created_at.isoformat()
-        }
+    def participant_counts(room_ids: List[int]) -> Dict[int, int]:
+        """Participants per room for a whole list in one grouped query."""
+        if not room_ids:
+            return {}
+        rows = db.session.query(RoomParticipant.room_id, db.func.count(RoomParticipant.id)) \
+            .filter(RoomParticipant.room_id.in_(room_ids)).group_by(RoomParticipant.room_id)
+        return dict(rows)
+
+    @staticmethod
+    def to_dict(room: Room, include_participants: bool = False,
+                current_participants: Optional[int] = None) -> Dict[str, Any]:
+        """Pass `current_participants` (see participant_counts) when serializing many rooms."""
+        data = dump_room(room)
+        if current_participants is None:
+            current_participants = RoomParticipant.query.filter_by(room_id=room.id).count()
+        data['current_participants'] = current_participants
         if include_participants:
-            participants = RoomParticipant.query.filter_by(room_id=room.id).all()
-            data['participants'] = []
-            for p in participants:
-                user = User.query.get(p.user_id)
-                data['participants'].append({
-                    'id': p.id,
-                    'user_id': p.user_id,
-                    'display_name': user.get_display_name() if user else f'User #{p.user_id}',
-                    'tag': user.get_full_tag() if user else '',
-                    'joined_at': p.joined_at.isoformat()
-                })
+            rows = db.session.query(RoomParticipant, User) \
+                .outerjoin(User, User.id == RoomParticipant.user_id) \
+                .filter(RoomParticipant.room_id == room.id).all()
+            data['participants'] = [{
+                'id': p.id,
+                'user_id': p.user_id,
+                'display_name': user.get_display_name() if user else f'User #{p.user_id}',
+                'tag': user.get_full_tag() if user else '',
+                'joined_at': p.joined_at.isoformat()
+            } for p, user in rows]
         return data
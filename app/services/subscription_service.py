@@ -1,6 +1,8 @@
 from typing import Optional, List, Dict, Any
 from app import db
 from app.models import Subscription, User, Channel
+from app.http_cache import channel_tags, invalidate
+from app.schemas import dump_subscription, dump_subscription_channel, dump_user_brief
 
 
 class SubscriptionService:
@@ -26,6 +28,7 @@ class SubscriptionService:
 
         db.session.add(subscription)
         db.session.commit()
+        invalidate(*channel_tags(channel.id))
 
         return subscription
 
@@ -41,6 +44,7 @@ class SubscriptionService:
 
         db.session.delete(subscription)
         db.session.commit()
+        invalidate(*channel_tags(channel.id))
 
         return True
 
@@ -59,6 +63,7 @@ class SubscriptionService:
 
         subscription.is_sponsor = True
         db.session.commit()
+        invalidate(*channel_tags(channel.id))
 
         return subscription
 
@@ -77,6 +82,7 @@ class SubscriptionService:
 
         subscription.is_sponsor = False
         db.session.commit()
+        invalidate(*channel_tags(channel.id))
 
         return subscription
 
@@ -118,26 +124,9 @@ class SubscriptionService:
 
     @staticmethod
     def to_dict(subscription: Subscription, include_channel: bool = True, include_user: bool = False) -> Dict[str, Any]:
-        data = {
-            'id': subscription.id,
-            'user_id': subscription.user_id,
-            'channel_id': subscription.channel_id,
-            'is_sponsor': subscription.is_sponsor,
-            'created_at': subscription.created_at.isoformat()
-        }
-
+        data = dump_subscription(subscription)
         if include_channel and subscription.channel:
-            data['channel'] = {
-                'id': subscription.channel.id,
-                'name': subscription.channel.name,
-                'description': subscription.channel.description,
-                'author_id': subscription.channel.author_id
-            }
-
+            data['channel'] = dump_subscription_channel(subscription.channel)
         if include_user and subscription.user:
-            data['user'] = {
-                'id': subscription.user.id,
-                'username': subscription.user.username
-            }
-
+            data['user'] = dump_user_brief(subscription.user)
         return data
@@ -0,0 +1,246 @@
+import os
+import re
+import shutil
+import hashlib
+import subprocess
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+
+# ffmpeg encoder arguments per output format.
+ENCODERS = {
+    'webp': ['-c:v', 'libwebp', '-quality', '80', '-compression_level', '4'],
+    'avif': ['-c:v', 'libaom-av1', '-still-picture', '1', '-crf', '32', '-b:v', '0', '-cpu-used', '6'],
+}
+MIMETYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+# <source stem>-<source digest>-<width>.<format>
+DERIVATIVE_NAME = re.compile(r'^(?P<stem>[0-9a-f]{32})-(?P<digest>[0-9a-f]{12})-(?P<width>\d+)\.(?P<fmt>[a-z]+)$')
+# Hits refresh a derivative's mtime (its LRU position) at most this often.
+TOUCH_INTERVAL = 3600
+# A derivative ffmpeg failed to produce (e.g. no AVIF encoder) is not retried for this long.
+FAILURE_BACKOFF = 300
+
+
+@lru_cache(maxsize=8192)
+def _digest(path: str, mtime_ns: int, size: int) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            sha.update(block)
+    return sha.hexdigest()[:12]
+
+
+class ThumbnailService:
+    """Resized WebP/AVIF copies of video thumbnails, made on first request.
+
+    Derivatives are named after the source file and a hash of its bytes, so
+    their URLs never change meaning and are served as immutable. They are a
+    cache: generation is capped at THUMBNAIL_MAX_CONCURRENT ffmpeg processes
+    per worker, and once THUMBNAIL_CACHE_MAX_BYTES is exceeded the least
+    recently used files are deleted (to be regenerated if asked for again).
+    """
+
+    _semaphore = None
+    _semaphore_lock = threading.Lock()
+    # Striped: requests for the same derivative share a lock without keeping one per file.
+    _key_locks = [threading.Lock() for _ in range(64)]
+    _evict_lock = threading.Lock()
+    _cache_bytes: Optional[int] = None
+    _failed: Dict[str, float] = {}
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def available() -> bool:
+        return shutil.which('ffmpeg') is not None
+
+    @staticmethod
+    def _folder() -> str:
+        return current_app.config['THUMBNAIL_DERIVATIVE_FOLDER']
+
+    @staticmethod
+    def source_digest(path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return _digest(path, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def derivative_name(source_path: str, width: int, fmt: str) -> Optional[str]:
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        digest = ThumbnailService.source_digest(source_path)
+        if digest is None or not re.fullmatch(r'[0-9a-f]{32}', stem):
+            return None
+        return f'{stem}-{digest}-{width}.{fmt}'
+
+    @staticmethod
+    def srcset(source_path: str) -> Optional[Dict[str, str]]:
+        """`{'webp': '/thumbnails/derived/...-320.webp 320w, ...', ...}`, or None without ffmpeg."""
+        if not ThumbnailService.available():
+            return None
+        result = {}
+        for fmt in current_app.config['THUMBNAIL_FORMATS']:
+            names = [(ThumbnailService.derivative_name(source_path, w, fmt), w)
+                     for w in current_app.config['THUMBNAIL_WIDTHS']]
+            if any(name is None for name, _ in names):
+                return None
+            result[fmt] = ', '.join(f'/thumbnails/derived/{name} {w}w' for name, w in names)
+        return result
+
+    @staticmethod
+    def _find_source(stem: str) -> Optional[str]:
+        from app.services.video_service import VideoService
+        folder = current_app.config['THUMBNAIL_FOLDER']
+        for ext in VideoService.ALLOWED_IMAGE_EXTENSIONS:
+            path = os.path.join(folder, f'{stem}.{ext}')
+            if os.path.isfile(path):
+                return path
+        return None
+
+    @staticmethod
+    def resolve(filename: str) -> Tuple[Optional[str], Optional[str]]:
+        """Path of the derivative `filename` (generated if needed) and its source.
+
+        Returns (None, source) if it cannot be produced right now and the
+        source should be served instead, (None, None) if the name is unknown.
+        """
+        match = DERIVATIVE_NAME.match(filename)
+        if not match or match['fmt'] not in current_app.config['THUMBNAIL_FORMATS'] \
+                or int(match['width']) not in current_app.config['THUMBNAIL_WIDTHS']:
+            return None, None
+        source = ThumbnailService._find_source(match['stem'])
+        if source is None or ThumbnailService.source_digest(source) != match['digest']:
+            return None, None
+
+        path = os.path.join(ThumbnailService._folder(), filename)
+        if ThumbnailService._touch(path):
+            return path, source
+        if not ThumbnailService.available() or \
+                time.monotonic() - ThumbnailService._failed.get(filename, -FAILURE_BACKOFF) < FAILURE_BACKOFF:
+            return None, source
+
+        semaphore = ThumbnailService._get_semaphore()
+        if not semaphore.acquire(timeout=current_app.config['THUMBNAIL_GENERATE_WAIT']):
+            return None, source
+        try:
+            # One ffmpeg per derivative; concurrent requests for it wait and then find the file.
+            with ThumbnailService._key_lock(filename):
+                if not os.path.exists(path) and not ThumbnailService._generate(source, path, int(match['width']),
+                                                                               match['fmt']):
+                    if len(ThumbnailService._failed) > 10000:
+                        ThumbnailService._failed.clear()
+                    ThumbnailService._failed[filename] = time.monotonic()
+                    return None, source
+        finally:
+            semaphore.release()
+        return path, source
+
+    @staticmethod
+    def _get_semaphore():
+        with ThumbnailService._semaphore_lock:
+            if ThumbnailService._semaphore is None:
+                ThumbnailService._semaphore = threading.BoundedSemaphore(
+                    current_app.config['THUMBNAIL_MAX_CONCURRENT'])
+            return ThumbnailService._semaphore
+
+    @staticmethod
+    def _key_lock(key: str) -> threading.Lock:
+        return ThumbnailService._key_locks[hash(key) % len(ThumbnailService._key_locks)]
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return False
+        now = time.time()
+        if now - mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return True
+
+    @staticmethod
+    def _generate(source: str, path: str, width: int, fmt: str) -> bool:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{threading.get_ident()}.tmp.{fmt}'
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-i', source,
+            '-frames:v', '1',
+            # Never upscale; -2 keeps the aspect ratio with an even height.
+            '-vf', f"scale='min({width},iw)':-2",
+            *ENCODERS[fmt],
+            tmp,
+        ]
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False,
+                           timeout=current_app.config['THUMBNAIL_GENERATE_TIMEOUT'])
+            if not os.path.exists(tmp) or os.path.getsize(tmp) == 0:
+                current_app.logger.warning(f'ffmpeg produced no {fmt} for {os.path.basename(source)}')
+                return False
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except (OSError, subprocess.SubprocessError) as e:
+            current_app.logger.warning(f'Thumbnail derivative failed for {os.path.basename(source)}: {e}')
+            return False
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        ThumbnailService._account(size)
+        return True
+
+    @staticmethod
+    def _scan() -> List[Tuple[float, int, str]]:
+        entries = []
+        with os.scandir(ThumbnailService._folder()) as it:
+            for entry in it:
+                if entry.is_file() and DERIVATIVE_NAME.match(entry.name):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    @staticmethod
+    def _account(added: int):
+        budget = current_app.config['THUMBNAIL_CACHE_MAX_BYTES']
+        with ThumbnailService._evict_lock:
+            if ThumbnailService._cache_bytes is None:
+                ThumbnailService._cache_bytes = sum(size for _, size, _ in ThumbnailService._scan())
+            else:
+                ThumbnailService._cache_bytes += added
+            if ThumbnailService._cache_bytes > budget:
+                ThumbnailService._cache_bytes = ThumbnailService.evict(int(budget * 0.9))
+
+    @staticmethod
+    def evict(target_bytes: int) -> int:
+        """Delete least recently used derivatives until at most `target_bytes` remain; returns the total left."""
+        entries = sorted(ThumbnailService._scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        return total
+
+    @staticmethod
+    def remove_derivatives(source_path: str):
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        folder = ThumbnailService._folder()
+        if not os.path.isdir(folder):
+            return
+        for name in os.listdir(folder):
+            if name.startswith(stem + '-') and DERIVATIVE_NAME.match(name):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
@@ -6,6 +6,13 @@ from werkzeug.utils import secure_filename
 from flask import current_app
 from app import db
 from app.models import Video, Channel, User, Subscription
+from app.http_cache import invalidate, video_tags
+from app.schemas import dump_video
+from app.services.notification_service import NotificationService
+from app.services.preview_service import PreviewService
+from app.services.thumbnail_service import ThumbnailService
+from app.stats import stats
+from app.write_queue import write_queue
 
 
 CATEGORIES = ['gaming', 'music', 'education', 'entertainment', 'tech', 'sports', 'news', 'blog', 'other']
@@ -145,6 +152,11 @@ class VideoService:
 
         db.session.add(video)
         db.session.commit()
+        invalidate(*video_tags(video))
+
+        stats.record('uploads')
+        NotificationService.schedule_new_video_fanout(video)
+        PreviewService.schedule(video)
         return video
 
     @staticmethod
@@ -160,10 +172,8 @@ class VideoService:
             if already:
                 return
             redis_client.setex(viewer_key, 1800, "1")
-        video = Video.query.get(video_id)
-        if video:
-            video.views_count = (video.views_count or 0) + 1
-            db.session.commit()
+        write_queue.increment(Video, video_id, 'views_count')
+        stats.record('views')
 
     @staticmethod
     def delete_video(video_id: int) -> bool:
@@ -180,8 +190,13 @@ class VideoService:
                 os.remove(video.thumbnail_path)
             except Exception:
                 pass
+        if video.thumbnail_path:
+            ThumbnailService.remove_derivatives(video.thumbnail_path)
+        PreviewService.remove(video)
+        tags = video_tags(video)
         db.session.delete(video)
         db.session.commit()
+        invalidate(*tags)
         return True
 
     @staticmethod
@@ -273,6 +288,16 @@ class VideoService:
             pass
         return None
 
+    @staticmethod
+    def get_thumbnail_srcset(video: Video) -> Optional[Dict[str, str]]:
+        """`srcset` values of resized thumbnails per image format, e.g. `{'webp': '... 320w, ... 640w'}`.
+
+        The files are generated on first request (ThumbnailService); None when there are none to offer.
+        """
+        if not video.thumbnail_path or not os.path.exists(video.thumbnail_path):
+            return None
+        return ThumbnailService.srcset(video.thumbnail_path)
+
     @staticmethod
     def get_videos_by_channel(channel_id: int, status: str = None) -> List[Video]:
         query = Video.query.filter_by(channel_id=channel_id)
@@ -282,27 +307,11 @@ class VideoService:
 
     @staticmethod
     def to_dict(video: Video, include_stream_url: bool = False) -> Dict[str, Any]:
-        data = {
-            'id': video.id,
-            'channel_id': video.channel_id,
-            'title': video.title,
-            'description': video.description,
-            'duration': video.duration,
-            'category': video.category or 'other',
-            'all_categories': bool(getattr(video, 'all_categories', False)),
-            'tags': video.tags,
-            'access_level': video.access_level,
-            'has_ads': video.has_ads,
-            'status': video.status,
-            'views_count': video.views_count or 0,
-            'likes_count': video.likes_count,
-            'dislikes_count': video.dislikes_count,
-            'thumbnail_url': VideoService.get_thumbnail_url(video),
-            'created_at': video.created_at.isoformat()
-        }
+        data = dump_video(video)
         if include_stream_url and video.status == 'ready':
             try:
                 data['stream_url'] = VideoService.get_stream_url(video)
+                data['preview_track_url'] = PreviewService.get_track_url(video)
             except ValueError:
                 pass
         return data
@@ -0,0 +1,46 @@
+"""Connection pragmas for running on a SQLite file under concurrent load.
+
+Applied to every new DB-API connection when the app is on SQLite and
+`SQLITE_TUNING` is on:
+
+- journal_mode=WAL: readers no longer block the writer (and vice versa);
+- synchronous=NORMAL: fsync at checkpoints only, safe with WAL;
+- busy_timeout: wait for the write lock instead of failing with
+  "database is locked" straight away;
+- cache_size / mmap_size: keep hot pages in memory.
+"""
+
+from sqlalchemy import event
+
+from app import db
+
+
+def _pragmas(app):
+    return [
+        f"PRAGMA journal_mode={app.config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        # Negative cache_size is in KiB rather than pages.
+        f"PRAGMA cache_size=-{int(app.config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}",
+    ]
+
+
+def configure_sqlite(app):
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+    if not app.config.get('SQLITE_TUNING', True):
+        return
+
+    pragmas = _pragmas(app)
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', on_connect)
@@ -46,6 +46,7 @@ function showUserMenu(user) {
         if (adminLink) adminLink.style.display = 'flex';
     }
     loadUnreadNotifCount();
+    getAppSocket(localStorage.getItem('token'));
 }
 
 function showModal(modalId) { document.getElementById(modalId).classList.add('show'); }
@@ -426,6 +427,40 @@ async function generatePwd() {
     } catch (e) {}
 }
 
+// Один сокет на вкладку: подписан на личную комнату пользователя,
+// через него сервер присылает новое значение счётчика непрочитанных.
+let appSocket = null;
+const NOTIF_RECONCILE_MS = 5 * 60 * 1000;
+
+function getAppSocket(token) {
+    if (appSocket || !token || typeof io === 'undefined') return appSocket;
+    appSocket = io({ transports: ['websocket', 'polling'] });
+    appSocket.on('connect', () => {
+        appSocket.emit('subscribe_user', { token });
+        // Пока сокет был отключён, push-события могли потеряться.
+        loadUnreadNotifCount();
+    });
+    appSocket.on('notifications_unread', (d) => {
+        renderNotifBadge(d.count);
+        const panel = document.getElementById('notifPanel');
+        if (panel && panel.style.display !== 'none') loadNotifications();
+    });
+    // Редкая сверка на случай пропущенного события; счётчик отдаётся из Redis.
+    setInterval(() => { if (!document.hidden) loadUnreadNotifCount(); }, NOTIF_RECONCILE_MS);
+    return appSocket;
+}
+
+function renderNotifBadge(count) {
+    const badge = document.getElementById('notifBadge');
+    if (!badge) return;
+    if (count > 0) {
+        badge.textContent = count > 99 ? '99+' : count;
+        badge.style.display = 'flex';
+    } else {
+        badge.style.display = 'none';
+    }
+}
+
 async function loadUnreadNotifCount() {
     const token = localStorage.getItem('token');
     if (!token) return;
@@ -433,13 +468,7 @@ async function loadUnreadNotifCount() {
         const resp = await fetch(`${API_URL}/notifications/unread-count`, { headers: { 'Authorization': `Bearer ${token}` } });
         if (resp.ok) {
             const data = await resp.json();
-            const badge = document.getElementById('notifBadge');
-            if (data.count > 0) {
-                badge.textContent = data.count > 99 ? '99+' : data.count;
-                badge.style.display = 'flex';
-            } else {
-                badge.style.display = 'none';
-            }
+            renderNotifBadge(data.count);
         }
     } catch (e) {}
 }
@@ -454,26 +483,46 @@ async function toggleNotifPanel() {
     }
 }
 
-async function loadNotifications() {
+const NOTIF_PAGE_SIZE = 30;
+let notifLastId = null;
+let notifHasMore = false;
+let notifLoading = false;
+
+function renderNotifItems(notifs) {
+    return notifs.map(n => `
+        <div class="notif-item ${n.is_read ? '' : 'unread'}" onclick="markNotifRead(${n.id}, this)">
+            <div class="notif-content">${escapeHtml(n.content)}</div>
+            <div class="notif-time">${new Date(n.created_at).toLocaleString('ru-RU')}</div>
+        </div>
+    `).join('');
+}
+
+// Первая страница; следующие подгружаются при прокрутке списка (курсор before=<id>).
+async function loadNotifications(more = false) {
     const token = localStorage.getItem('token');
-    if (!token) return;
+    if (!token || notifLoading || (more && !notifHasMore)) return;
+    notifLoading = true;
     try {
-        const resp = await fetch(`${API_URL}/notifications`, { headers: { 'Authorization': `Bearer ${token}` } });
+        const cursor = more && notifLastId ? `&before=${notifLastId}` : '';
+        const resp = await fetch(`${API_URL}/notifications?limit=${NOTIF_PAGE_SIZE}${cursor}`, { headers: { 'Authorization': `Bearer ${token}` } });
         if (resp.ok) {
             const notifs = await resp.json();
             const list = document.getElementById('notifList');
-            if (notifs.length === 0) {
+            notifHasMore = notifs.length === NOTIF_PAGE_SIZE;
+            if (notifs.length) notifLastId = notifs[notifs.length - 1].id;
+            if (more) {
+                list.insertAdjacentHTML('beforeend', renderNotifItems(notifs));
+            } else if (notifs.length === 0) {
                 list.innerHTML = '<div class="notif-empty">Нет уведомлений</div>';
             } else {
-                list.innerHTML = notifs.map(n => `
-                    <div class="notif-item ${n.is_read ? '' : 'unread'}" onclick="markNotifRead(${n.id}, this)">
-                        <div class="notif-content">${escapeHtml(n.content)}</div>
-                        <div class="notif-time">${new Date(n.created_at).toLocaleString('ru-RU')}</div>
-                    </div>
-                `).join('');
+                list.innerHTML = renderNotifItems(notifs);
+                list.onscroll = () => {
+                    if (list.scrollTop + list.clientHeight >= list.scrollHeight - 40) loadNotifications(true);
+                };
             }
         }
     } catch (e) {}
+    notifLoading = false;
 }
 
 async function markNotifRead(id, el) {
@@ -481,7 +530,7 @@ async function markNotifRead(id, el) {
     try {
         await fetch(`${API_URL}/notifications/${id}/read`, { method: 'POST', headers: { 'Authorization': `Bearer ${token}` } });
         if (el) el.classList.remove('unread');
-        loadUnreadNotifCount();
+        if (!appSocket || !appSocket.connected) loadUnreadNotifCount();
     } catch (e) {}
 }
 
@@ -490,7 +539,7 @@ async function markAllNotifsRead() {
     try {
         await fetch(`${API_URL}/notifications/read-all`, { method: 'POST', headers: { 'Authorization': `Bearer ${token}` } });
         loadNotifications();
-        loadUnreadNotifCount();
+        if (!appSocket || !appSocket.connected) loadUnreadNotifCount();
     } catch (e) {}
 }
 
@@ -562,6 +611,82 @@ function escapeHtml(text) {
     return div.innerHTML;
 }
 
+// Превью видео: уменьшенные WebP/AVIF из thumbnail_srcset, оригинал — запасной вариант.
+const THUMB_TYPES = {avif: 'image/avif', webp: 'image/webp'};
+function thumbnailImg(v, sizes = '(max-width: 600px) 100vw, 360px') {
+    if (!v.thumbnail_url) return '';
+    const sources = Object.entries(v.thumbnail_srcset || {})
+        .map(([fmt, srcset]) => `<source type="${THUMB_TYPES[fmt]}" srcset="${srcset}" sizes="${sizes}">`)
+        .join('');
+    return `<picture>${sources}<img src="${v.thumbnail_url}" alt="" loading="lazy" decoding="async"></picture>`;
+}
+
+// Превью при перемотке: полоса под плеером, кадры берутся из WebVTT-дорожки со спрайтами.
+function parseThumbnailTrack(text, baseUrl) {
+    const toSec = t => t.split(':').reduce((acc, p) => acc * 60 + parseFloat(p), 0);
+    const cues = [];
+    for (const block of text.split(/\r?\n\r?\n/)) {
+        const lines = block.trim().split(/\r?\n/);
+        const i = lines.findIndex(l => l.includes('-->'));
+        if (i < 0 || !lines[i + 1]) continue;
+        const [start, end] = lines[i].split('-->').map(s => toSec(s.trim()));
+        const [ref, frag] = lines[i + 1].trim().split('#xywh=');
+        const [x, y, w, h] = (frag || '0,0,0,0').split(',').map(Number);
+        cues.push({start, end, url: new URL(ref, baseUrl).href, x, y, w, h});
+    }
+    return cues;
+}
+
+async function attachSeekPreview(video, trackUrl) {
+    if (!video || !trackUrl || video.dataset.seekPreview) return;
+    let cues;
+    try {
+        const r = await fetch(trackUrl);
+        if (!r.ok) return;
+        cues = parseThumbnailTrack(await r.text(), new URL(trackUrl, window.location.href));
+    } catch (e) { return; }
+    if (!cues.length) return;
+    video.dataset.seekPreview = '1';
+
+    const bar = document.createElement('div');
+    bar.className = 'seek-preview-bar';
+    bar.innerHTML = '<div class="seek-preview-progress"></div><div class="seek-preview-tip"><div class="seek-preview-frame"></div><span></span></div>';
+    video.insertAdjacentElement('afterend', bar);
+    const progress = bar.querySelector('.seek-preview-progress');
+    const tip = bar.querySelector('.seek-preview-tip');
+    const frame = tip.querySelector('.seek-preview-frame');
+    const label = tip.querySelector('span');
+    const timeAt = e => {
+        const rect = bar.getBoundingClientRect();
+        const ratio = Math.min(Math.max((e.clientX - rect.left) / rect.width, 0), 1);
+        return {ratio, t: ratio * (video.duration || cues[cues.length - 1].end)};
+    };
+
+    bar.addEventListener('mousemove', e => {
+        const {ratio, t} = timeAt(e);
+        const cue = cues.find(c => t >= c.start && t < c.end) || cues[cues.length - 1];
+        frame.style.width = cue.w + 'px';
+        frame.style.height = cue.h + 'px';
+        frame.style.backgroundImage = `url("${cue.url}")`;
+        frame.style.backgroundPosition = `-${cue.x}px -${cue.y}px`;
+        label.textContent = formatClock(t);
+        tip.style.left = `clamp(${cue.w / 2}px, ${ratio * 100}%, calc(100% - ${cue.w / 2}px))`;
+        tip.classList.add('show');
+    });
+    bar.addEventListener('mouseleave', () => tip.classList.remove('show'));
+    // Перематывать можно только там, где у плеера включено управление (в комнате — только владельцу).
+    bar.addEventListener('click', e => { if (video.controls && video.duration) video.currentTime = timeAt(e).t; });
+    video.addEventListener('timeupdate', () => {
+        if (video.duration) progress.style.width = (video.currentTime / video.duration * 100) + '%';
+    });
+}
+
+function formatClock(sec) {
+    sec = Math.floor(sec);
+    const h = Math.floor(sec / 3600), m = Math.floor(sec % 3600 / 60), s = sec % 60;
+    return (h ? h + ':' + String(m).padStart(2, '0') : m) + ':' + String(s).padStart(2, '0');
+}
+
 document.addEventListener('keydown', function(event) {
     if (event.key === 'Escape') {
         document.querySelectorAll('.modal.show').forEach(m => m.classList.remove('show'));
@@ -0,0 +1,181 @@
+"""Dashboard statistics without full-table counts on every page load.
+
+- Totals (users, videos, active rooms, channels, pending reports) are counted
+  at most once per `STATS_CACHE_TTL` seconds and cached in Redis.
+- Event series (uploads, views) are hourly Redis hash buckets incremented
+  where the event happens: `stats.record('uploads')`.
+- Gauge series (active rooms, active sockets) are sampled every
+  `STATS_SAMPLE_INTERVAL` seconds by a background thread in each web process.
+  Every process publishes its own socket count; a Redis lock makes only one
+  of them write the samples per interval, keeping each hour's peak.
+
+Buckets older than `STATS_SERIES_HOURS` are trimmed by the sampler.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from flask import current_app
+
+EVENT_METRICS = ('uploads', 'views')
+GAUGE_METRICS = ('active_rooms', 'active_sockets')
+
+TOTALS_KEY = 'stats:totals'
+SAMPLER_LOCK_KEY = 'stats:sampler'
+SOCKETS_KEY_PREFIX = 'stats:sockets:'
+
+
+def _series_key(metric: str) -> str:
+    return f'stats:series:{metric}'
+
+
+def _bucket(moment: datetime) -> str:
+    return moment.strftime('%Y%m%d%H')
+
+
+class Stats:
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.interval = 60
+        self._sockets = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._process_key = None
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = bool(app.config.get('STATS_AGGREGATOR'))
+        self.interval = int(app.config.get('STATS_SAMPLE_INTERVAL', 60))
+        app.extensions['stats'] = self
+        if self.enabled:
+            app.before_request(self._ensure_started)
+
+    # --- recording -------------------------------------------------------------
+
+    def record(self, metric: str, amount: int = 1):
+        """Count an event in the current hour's bucket; never fails the caller."""
+        from app import redis_client
+        try:
+            redis_client.hincrby(_series_key(metric), _bucket(datetime.utcnow()), amount)
+        except Exception as e:
+            current_app.logger.warning(f'Failed to record {metric}: {e}')
+
+    def socket_connected(self):
+        with self._lock:
+            self._sockets += 1
+        if self.enabled:
+            self._ensure_started()
+
+    def socket_disconnected(self):
+        with self._lock:
+            self._sockets = max(0, self._sockets - 1)
+
+    # --- reading ---------------------------------------------------------------
+
+    def totals(self) -> Dict:
+        from app import redis_client
+        try:
+            cached = redis_client.get(TOTALS_KEY)
+            if cached:
+                return json.loads(cached)
+        except Exception as e:
+            current_app.logger.warning(f'Stats cache unavailable: {e}')
+
+        from app.models import Channel, Room, User, Video, VideoReport
+        totals = {
+            'users': User.query.count(),
+            'videos': Video.query.count(),
+            'rooms': Room.query.filter_by(is_active=True).count(),
+            'channels': Channel.query.count(),
+            'reports': VideoReport.query.filter_by(status='pending').count(),
+            'computed_at': datetime.utcnow().isoformat(),
+        }
+        try:
+            redis_client.setex(TOTALS_KEY, current_app.config['STATS_CACHE_TTL'], json.dumps(totals))
+        except Exception:
+            pass
+        return totals
+
+    def series(self, hours: int) -> Dict[str, List]:
+        """The last `hours` hourly buckets of every metric, oldest first; missing buckets are 0."""
+        from app import redis_client
+        now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        moments = [now - timedelta(hours=h) for h in range(hours - 1, -1, -1)]
+        buckets = [_bucket(m) for m in moments]
+        result = {'hours': [m.isoformat() for m in moments]}
+        pipe = redis_client.pipeline(transaction=False)
+        for metric in EVENT_METRICS + GAUGE_METRICS:
+            pipe.hmget(_series_key(metric), buckets)
+        for metric, values in zip(EVENT_METRICS + GAUGE_METRICS, pipe.execute()):
+            result[metric] = [int(v) if v is not None else 0 for v in values]
+        return result
+
+    # --- sampling --------------------------------------------------------------
+
+    def publish_sockets(self):
+        from app import redis_client
+        if self._process_key is None or self._pid != os.getpid():
+            self._process_key = f'{SOCKETS_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}'
+        # Expires on its own if this process dies without cleaning up.
+        redis_client.setex(self._process_key, self.interval * 3, self._sockets)
+
+    def sample(self):
+        """Write one sample of the gauges and trim old buckets."""
+        from app import redis_client
+        from app.models import Room
+
+        total_sockets = 0
+        for key in redis_client.scan_iter(match=f'{SOCKETS_KEY_PREFIX}*', count=500):
+            total_sockets += int(redis_client.get(key) or 0)
+        samples = {
+            'active_rooms': Room.query.filter_by(is_active=True).count(),
+            'active_sockets': total_sockets,
+        }
+
+        bucket = _bucket(datetime.utcnow())
+        for metric, value in samples.items():
+            key = _series_key(metric)
+            # Only one sampler per interval holds the lock, so read-then-write is safe.
+            current = redis_client.hget(key, bucket)
+            if current is None or value > int(current):
+                redis_client.hset(key, bucket, value)
+
+        oldest = _bucket(datetime.utcnow() - timedelta(hours=current_app.config['STATS_SERIES_HOURS']))
+        for metric in EVENT_METRICS + GAUGE_METRICS:
+            key = _series_key(metric)
+            stale = [f for f in redis_client.hkeys(key) if f.decode() < oldest]
+            if stale:
+                redis_client.hdel(key, *stale)
+
+    def _ensure_started(self):
+        # Started lazily and per process: a thread started before a fork does not survive it.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='stats-sampler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        from app import redis_client
+        while True:
+            with self.app.app_context():
+                try:
+                    self.publish_sockets()
+                    if redis_client.set(SAMPLER_LOCK_KEY, os.getpid(), nx=True, ex=max(1, self.interval - 1)):
+                        self.sample()
+                except Exception as e:
+                    current_app.logger.warning(f'Stats sampling failed: {e}')
+            time.sleep(self.interval)
+
+
+stats = Stats()
@@ -1 +1 @@
-from app.websocket import room_events
+from app.websocket import room_events, user_events
@@ -1,14 +1,17 @@
+import math
 from flask import request
 from flask_socketio import emit, join_room, leave_room, rooms
 from datetime import datetime, timedelta
 from app import socketio, db
 from app.models import Room, RoomParticipant, ChatMessage, User
 from app.services.auth_service import AuthService
+from app.services.chat_service import ChatService
+from app.services.rate_limit_service import RateLimitService
+from app.stats import stats
+from app.write_queue import write_queue
 
 active_connections = {}
 
-message_cooldowns = {}
-
 
 def kick_user_from_room(room_id: int, user_id: int, reason: str = "kicked"):
     """Принудительно выкинуть пользователя из Socket.IO комнаты и уведомить клиента.
@@ -62,6 +65,7 @@ def get_current_user():
 @socketio.on('connect')
 def handle_connect():
     print(f'Client connected: {request.sid}')
+    stats.socket_connected()
     emit('connected', {'sid': request.sid})
 
 
@@ -69,6 +73,7 @@ def handle_connect():
 def handle_disconnect():
     sid = request.sid
     print(f'Client disconnected: {sid}')
+    stats.socket_disconnected()
 
     if sid in active_connections:
         conn_info = active_connections[sid]
@@ -167,7 +172,8 @@ def handle_join_room(data):
                     'joined_at': p.joined_at.isoformat()
                 }
                 for p in room.participants
-            ]
+            ],
+            'chat_history': ChatService.get_recent(room.id)
         })
 
         emit('user_joined', {
@@ -257,9 +263,7 @@ def handle_play(data):
             emit('error', {'message': 'Only room owner can control playback'})
             return
 
-        room.is_playing = True
-        room.current_position = int(position)
-        db.session.commit()
+        write_queue.update(Room, room.id, is_playing=True, current_position=int(position))
 
         emit('play_event', {
             'position': position,
@@ -291,9 +295,7 @@ def handle_pause(data):
             emit('error', {'message': 'Only room owner can control playback'})
             return
 
-        room.is_playing = False
-        room.current_position = int(position)
-        db.session.commit()
+        write_queue.update(Room, room.id, is_playing=False, current_position=int(position))
 
         emit('pause_event', {
             'position': position,
@@ -325,8 +327,7 @@ def handle_seek(data):
             emit('error', {'message': 'Only room owner can control playback'})
             return
 
-        room.current_position = int(position)
-        db.session.commit()
+        write_queue.update(Room, room.id, current_position=int(position))
 
         emit('seek_event', {
             'position': position,
@@ -372,20 +373,12 @@ def handle_chat_message(data):
             emit('error', {'message': 'Message too long (max 500 characters)'})
             return
 
-        if room.message_delay > 0:
-            if user.id not in message_cooldowns:
-                message_cooldowns[user.id] = {}
-
-            if room_id in message_cooldowns[user.id]:
-                last_message_time = message_cooldowns[user.id][room_id]
-                time_since_last = (datetime.utcnow() - last_message_time).total_seconds()
-
-                if time_since_last < room.message_delay:
-                    remaining = room.message_delay - time_since_last
-                    emit('error', {
-                        'message': f'Please wait {int(remaining)} seconds before sending another message'
-                    })
-                    return
+        remaining = RateLimitService.check_room_chat(room, user.id)
+        if remaining:
+            emit('error', {
+                'message': f'Please wait {math.ceil(remaining)} seconds before sending another message'
+            })
+            return
 
         chat_message = ChatMessage(
             room_id=room_id,
@@ -398,21 +391,13 @@ def handle_chat_message(data):
 
         db.session.commit()
 
-        if user.id not in message_cooldowns:
-            message_cooldowns[user.id] = {}
-        message_cooldowns[user.id][room_id] = datetime.utcnow()
-
         room.last_activity = datetime.utcnow()
         db.session.commit()
 
-        emit('chat_message_event', {
-            'message_id': chat_message.id,
-            'user_id': user.id,
-            'username': user.username,
-            'display_name': user.get_display_name(),
-            'message': message,
-            'timestamp': chat_message.timestamp.isoformat()
-        }, room=str(room_id))
+        entry = ChatService.to_dict(chat_message, user)
+        ChatService.append(room.id, entry)
+
+        emit('chat_message_event', dict(entry, message_id=chat_message.id), room=str(room_id))
 
     except Exception as e:
         print(f'Error in chat_message: {str(e)}')
@@ -0,0 +1,28 @@
+from flask import request
+from flask_socketio import emit, join_room
+from app import socketio
+from app.services.auth_service import AuthService
+
+
+def user_room(user_id: int) -> str:
+    """Personal Socket.IO room every open tab of a user subscribes to."""
+    return f'user:{user_id}'
+
+
+def emit_to_user(user_id: int, event: str, payload: dict):
+    try:
+        socketio.emit(event, payload, to=user_room(user_id))
+    except Exception as e:
+        # Push is best effort: the HTTP endpoints remain the source of truth.
+        print(f'Error emitting {event} to user {user_id}: {str(e)}')
+
+
+@socketio.on('subscribe_user')
+def handle_subscribe_user(data):
+    token = (data or {}).get('token')
+    user = AuthService().validate_session(token) if token else None
+    if not user:
+        emit('error', {'message': 'Invalid authentication token'})
+        return
+    join_room(user_room(user.id))
+    emit('user_subscribed', {'user_id': user.id, 'sid': request.sid})
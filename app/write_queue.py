@@ -0,0 +1,131 @@
+"""Single-writer queue for small, hot SQLite updates.
+
+SQLite allows one writer at a time. View counters and room playback positions
+are written from many HTTP and Socket.IO threads at once, and each of those
+used to be its own tiny transaction competing for the lock. With the queue
+they are buffered in memory and one background thread applies them every
+`SQLITE_WRITE_QUEUE_INTERVAL_MS` in a single transaction:
+
+- `increment()` is commutative, so deltas for the same row/column are summed;
+- `update()` is last-write-wins per column.
+
+Queued writes become visible after the next flush, and anything still buffered
+is lost if the process dies hard, which is acceptable for counters and
+positions but not for anything a user would miss. Without the queue (other
+databases, in-memory SQLite, `SQLITE_WRITE_QUEUE=False`) both calls write and
+commit straight away.
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import update as sql_update
+
+from app import db
+
+
+class WriteQueue:
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.interval = 0.05
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._increments = defaultdict(int)  # (model, row_id, column) -> delta
+        self._updates = {}                   # (model, row_id) -> {column: value}
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        self.app = app
+        self.enabled = bool(app.config.get('SQLITE_WRITE_QUEUE')) and uri.startswith('sqlite') \
+            and ':memory:' not in uri
+        self.interval = app.config.get('SQLITE_WRITE_QUEUE_INTERVAL_MS', 50) / 1000.0
+        app.extensions['write_queue'] = self
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def increment(self, model, row_id: int, column: str, amount: int = 1):
+        if not self.enabled:
+            db.session.execute(
+                sql_update(model).where(model.id == row_id).values({column: getattr(model, column) + amount})
+            )
+            db.session.commit()
+            return
+        with self._lock:
+            self._increments[(model, row_id, column)] += amount
+        self._notify()
+
+    def update(self, model, row_id: int, **values):
+        if not self.enabled:
+            db.session.execute(sql_update(model).where(model.id == row_id).values(**values))
+            db.session.commit()
+            return
+        with self._lock:
+            self._updates.setdefault((model, row_id), {}).update(values)
+        self._notify()
+
+    def flush(self):
+        """Apply everything buffered so far, synchronously."""
+        if self.enabled:
+            self._drain()
+
+    def _notify(self):
+        # Started lazily and per process: a thread started before a fork does not survive it.
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                    self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # Let more writes pile up so they share one transaction.
+            time.sleep(self.interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def _drain(self):
+        with self._drain_lock:
+            with self._lock:
+                increments, self._increments = self._increments, defaultdict(int)
+                updates, self._updates = self._updates, {}
+            if not increments and not updates:
+                return
+
+            with self.app.app_context():
+                try:
+                    for (model, row_id, column), delta in increments.items():
+                        db.session.execute(
+                            sql_update(model).where(model.id == row_id)
+                            .values({column: getattr(model, column) + delta})
+                        )
+                    for (model, row_id), values in updates.items():
+                        db.session.execute(sql_update(model).where(model.id == row_id).values(**values))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.warning(f'Write queue flush failed, retrying next round: {e}')
+                    self._requeue(increments, updates)
+
+    def _requeue(self, increments, updates):
+        with self._lock:
+            for key, delta in increments.items():
+                self._increments[key] += delta
+            for key, values in updates.items():
+                # Newer values queued meanwhile win over the failed batch.
+                self._updates[key] = {**values, **self._updates.get(key, {})}
+        self._wakeup.set()
+
+
+write_queue = WriteQueue()
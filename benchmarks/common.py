@@ -0,0 +1,176 @@
+"""Helpers shared by the load-generation scripts in this directory.
+
+The scripts talk to a real server over HTTP and Socket.IO. They can either
+attach to an already running process (--url, plus --server-pid for CPU/RSS
+numbers) or spawn `wsgi.py` themselves against a throwaway SQLite file.
+"""
+
+import os
+import sys
+import asyncio
+import time
+import uuid
+import resource
+import tempfile
+import subprocess
+import urllib.request
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+try:
+    import aiohttp
+    import socketio
+except ImportError:  # pragma: no cover - benchmark-only dependencies
+    sys.exit('Benchmarks need the asyncio client: pip install -r benchmarks/requirements.txt')
+
+
+def raise_fd_limit():
+    """Thousands of sockets need thousands of descriptors on both ends."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+class ProcStats:
+    """CPU time and resident memory of a server process, read from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._ticks = os.sysconf('SC_CLK_TCK')
+
+    def rss_kb(self) -> int:
+        with open(f'/proc/{self.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+        return 0
+
+    def cpu_seconds(self) -> float:
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime and stime are fields 14 and 15 of the full line.
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+
+class ServerProcess:
+    """Run wsgi.py in a subprocess with its own database."""
+
+    def __init__(self, port: int, env: dict = None, work_dir: str = None):
+        self.port = port
+        self.url = f'http://127.0.0.1:{port}'
+        # Several nodes can share one work_dir (and so one database).
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='vh-bench-')
+        self.db_file = os.path.join(self.work_dir, 'bench.db')
+        self.env = dict(os.environ)
+        self.env.update({
+            'HOST': '127.0.0.1',
+            'PORT': str(port),
+            'DATABASE_URL': f'sqlite:///{self.db_file}',
+            'UPLOAD_FOLDER': os.path.join(self.work_dir, 'videos'),
+            'THUMBNAIL_FOLDER': os.path.join(self.work_dir, 'thumbnails'),
+            'FLASK_ENV': 'benchmark',
+            'LOG_FILE': os.path.join(self.work_dir, 'app.log'),
+            'LOG_LEVEL': 'WARNING',
+        })
+        self.env.update(env or {})
+        self.proc = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT_DIR, 'wsgi.py')],
+            cwd=ROOT_DIR, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError('Server exited during startup')
+            try:
+                urllib.request.urlopen(self.url + '/api/videos/categories', timeout=1)
+                return self
+            except OSError:
+                time.sleep(0.3)
+        raise RuntimeError('Server did not start in 30s')
+
+    def __exit__(self, *exc):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    @property
+    def pid(self):
+        return self.proc.pid
+
+
+async def register_user(http: aiohttp.ClientSession, base_url: str, prefix: str = 'bench'):
+    """Create an account and return (user_id, session token)."""
+    username = f'{prefix}_{uuid.uuid4().hex[:10]}'
+    password = 'Bench-pass-1'
+    async with http.post(f'{base_url}/api/auth/register', json={
+        'username': username, 'email': f'{username}@bench.local', 'password': password
+    }) as r:
+        if r.status != 201:
+            raise RuntimeError(f'register failed: {r.status} {await r.text()}')
+        user_id = (await r.json())['id']
+    async with http.post(f'{base_url}/api/auth/login', json={'username': username, 'password': password}) as r:
+        if r.status != 200:
+            raise RuntimeError(f'login failed: {r.status} {await r.text()}')
+        return user_id, (await r.json())['token']
+
+
+async def upload_video(http: aiohttp.ClientSession, base_url: str, token: str) -> int:
+    """Upload a tiny placeholder video to attach rooms to."""
+    form = aiohttp.FormData()
+    form.add_field('title', 'Load test')
+    form.add_field('duration', '600')
+    form.add_field('file', b'\x00' * 1024, filename='bench.mp4', content_type='video/mp4')
+    async with http.post(f'{base_url}/api/videos', data=form, headers={'Authorization': f'Bearer {token}'}) as r:
+        if r.status != 201:
+            raise RuntimeError(f'upload failed: {r.status} {await r.text()}')
+        return (await r.json())['id']
+
+
+async def create_room(http: aiohttp.ClientSession, base_url: str, token: str, video_id: int,
+                      max_participants: int) -> int:
+    async with http.post(f'{base_url}/api/rooms', json={
+        'video_id': video_id, 'max_participants': max_participants
+    }, headers={'Authorization': f'Bearer {token}'}) as r:
+        if r.status != 201:
+            raise RuntimeError(f'create room failed: {r.status} {await r.text()}')
+        return (await r.json())['id']
+
+
+async def join_room_socket(base_url: str, room_id: int, token: str, timeout: float = 30.0):
+    """Connect a Socket.IO client and wait until the server confirms the join."""
+    client = socketio.AsyncClient(reconnection=False)
+    joined = asyncio.Event()
+    failure = {}
+
+    @client.on('room_state')
+    async def _on_state(data):
+        joined.set()
+
+    @client.on('error')
+    async def _on_error(data):
+        failure['message'] = data.get('message') if isinstance(data, dict) else str(data)
+        joined.set()
+
+    await client.connect(base_url, transports=['websocket'], wait_timeout=timeout)
+    await client.emit('join_room', {'room_id': room_id, 'token': token})
+    await asyncio.wait_for(joined.wait(), timeout)
+    if failure:
+        await client.disconnect()
+        raise RuntimeError(failure['message'])
+    return client
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
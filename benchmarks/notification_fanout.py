@@ -0,0 +1,96 @@
+"""Throughput of the new-video notification fan-out.
+
+Seeds a channel with --subscribers subscribers (a share of them with
+notifications disabled), publishes a video and runs the fan-out job
+synchronously, then runs it again to show that a retry inserts nothing:
+
+    python benchmarks/notification_fanout.py --subscribers 100000
+    DATABASE_URL=postgresql://... python benchmarks/notification_fanout.py --subscribers 100000
+
+Without DATABASE_URL it uses a scratch SQLite file.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def seed(db, models, subscribers: int, muted_every: int):
+    from werkzeug.security import generate_password_hash
+
+    # One hash for everyone: hashing 100k passwords would dominate the run.
+    password_hash = generate_password_hash('bench-password')
+    owner = models.User(username='bench_owner', email='owner@bench', login_code='0000',
+                        password_hash=password_hash)
+    db.session.add(owner)
+    db.session.flush()
+    channel = models.Channel(author_id=owner.id, name='bench channel')
+    db.session.add(channel)
+    db.session.flush()
+
+    batch = 5000
+    for start in range(0, subscribers, batch):
+        users = [{
+            'username': f'bench_{i}',
+            'email': f'bench_{i}@bench',
+            'login_code': f'{i:010d}'[-10:],
+            'password_hash': password_hash,
+            'notifications_enabled': not (muted_every and i % muted_every == 0),
+        } for i in range(start + 1, min(subscribers, start + batch) + 1)]
+        db.session.execute(models.User.__table__.insert(), users)
+        ids = [r[0] for r in db.session.query(models.User.id)
+               .filter(models.User.username.in_([u['username'] for u in users])).all()]
+        db.session.execute(models.Subscription.__table__.insert(),
+                           [{'user_id': uid, 'channel_id': channel.id} for uid in ids])
+        db.session.commit()
+
+    video = models.Video(channel_id=channel.id, title='bench video', file_path='/dev/null', duration=60,
+                         status='ready')
+    db.session.add(video)
+    db.session.commit()
+    return video.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=None, help='default: NOTIFICATION_FANOUT_CHUNK_SIZE')
+    parser.add_argument('--muted-every', type=int, default=10, help='every Nth subscriber disables notifications')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='fanout-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+    os.environ.setdefault('LOG_FILE', os.path.join(work_dir, 'app.log'))
+    os.environ.setdefault('SOCKETIO_MESSAGE_QUEUE', '')
+    os.environ['NOTIFICATION_FANOUT_ASYNC'] = 'False'
+    logging.disable(logging.INFO)
+    sys.path.insert(0, ROOT_DIR)
+
+    from app import create_app, db, models
+    from app.services.notification_service import NotificationService
+
+    app = create_app('benchmark')
+    with app.app_context():
+        started = time.perf_counter()
+        video_id = seed(db, models, args.subscribers, args.muted_every)
+        print(f'seeded {args.subscribers} subscribers in {time.perf_counter() - started:.1f}s '
+              f'({db.engine.dialect.name})')
+
+        first = NotificationService.fan_out_new_video(video_id, args.chunk_size)
+        print(f"fan-out:  {first['inserted']} notifications for {first['subscribers']} subscribers "
+              f"in {first['seconds']:.2f}s ({first['inserted'] / max(first['seconds'], 1e-9):.0f} rows/s)")
+
+        retry = NotificationService.fan_out_new_video(video_id, args.chunk_size)
+        print(f"retry:    {retry['inserted']} new notifications in {retry['seconds']:.2f}s")
+
+        stored = db.session.query(models.Notification).filter_by(dedupe_key=f'video:{video_id}').count()
+        print(f'stored:   {stored} rows with dedupe key video:{video_id}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Fan-out latency of room broadcasts versus room size and node count.
+
+Every simulated client registers (or reuses) a real account, connects over
+Socket.IO and goes through `join_room`. The room owner then drives `seek`
+traffic and participants drive `chat_message` traffic at a fixed rate; each
+receiver records how long the broadcast took to reach it. The report has
+p50/p99 fan-out latency, delivered events per second and server CPU.
+
+    # single process, broadcasts stay in-process
+    python benchmarks/room_fanout.py --room-sizes 10,50,200
+
+    # N processes sharing Redis as the Socket.IO message queue
+    python benchmarks/room_fanout.py --mq redis --nodes 2 --redis-url redis://localhost:6379
+
+With --mq redis the session store is shared through REDIS_URL too, so a token
+issued by one node is accepted by every other one.
+
+Latency is measured on the client side, so it includes the load generator's
+own event loop. Keep --rate low enough that the client is not the bottleneck.
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from common import (ProcStats, ServerProcess, create_room, join_room_socket, percentile,
+                    raise_fd_limit, register_user, upload_video)
+
+
+class Recorder:
+    def __init__(self):
+        self.sent_at = {}
+        self.latencies = []
+
+    def received(self, seq):
+        sent = self.sent_at.get(seq)
+        if sent is not None:
+            self.latencies.append(time.perf_counter() - sent)
+
+
+async def run_scenario(urls, stats, room_size: int, users: int, events: int, rate: float, kind: str):
+    async with aiohttp.ClientSession() as http:
+        owner_id, owner_token = await register_user(http, urls[0], 'owner')
+        accounts = [await register_user(http, urls[i % len(urls)], 'fan') for i in range(max(1, users))]
+        video_id = await upload_video(http, urls[0], owner_token)
+        room_id = await create_room(http, urls[0], owner_token, video_id, max_participants=room_size + users + 1)
+
+    recorder = Recorder()
+    owner = await join_room_socket(urls[0], room_id, owner_token)
+    clients = []
+    for i in range(room_size - 1):
+        # Spread participants across nodes; the owner always sits on the first.
+        client = await join_room_socket(urls[(i + 1) % len(urls)], room_id, accounts[i % len(accounts)][1])
+        clients.append(client)
+
+    for client in clients:
+        if kind == 'seek':
+            client.on('seek_event', lambda d: recorder.received(int(d['position'])))
+        else:
+            client.on('chat_message_event', lambda d: recorder.received(int(d['message'].split(':', 1)[1])))
+
+    senders = clients or [owner]
+    expected = events * len(clients)
+    cpu_before = [s.cpu_seconds() for s in stats]
+    started = time.perf_counter()
+    for seq in range(events):
+        recorder.sent_at[seq] = time.perf_counter()
+        if kind == 'seek':
+            await owner.emit('seek', {'room_id': room_id, 'position': seq})
+        else:
+            await senders[seq % len(senders)].emit('chat_message', {'room_id': room_id, 'message': f'bench:{seq}'})
+        await asyncio.sleep(1.0 / rate)
+
+    deadline = time.perf_counter() + 10
+    while len(recorder.latencies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    cpu = sum(s.cpu_seconds() - b for s, b in zip(stats, cpu_before)) / elapsed if stats else None
+
+    await asyncio.gather(*(c.disconnect() for c in clients + [owner]), return_exceptions=True)
+
+    lat = recorder.latencies
+    return {
+        'kind': kind,
+        'room_size': room_size,
+        'delivered': f'{len(lat)}/{expected}',
+        'p50_ms': percentile(lat, 50) * 1000,
+        'p99_ms': percentile(lat, 99) * 1000,
+        'events_per_s': len(lat) / elapsed,
+        'cpu': cpu,
+    }
+
+
+def print_row(label, r):
+    cpu = f"{r['cpu'] * 100:6.1f}%" if r['cpu'] is not None else '     n/a'
+    print(f"{label:<14} {r['kind']:<5} {r['room_size']:>6} {r['delivered']:>12} "
+          f"{r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['events_per_s']:>10.0f} {cpu}")
+
+
+async def run_all(urls, stats, args, label):
+    print(f"{'config':<14} {'event':<5} {'room':>6} {'delivered':>12} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'events/s':>10} {'srv CPU':>7}")
+    for size in args.room_sizes:
+        for kind in args.events:
+            result = await run_scenario(urls, stats, size, args.users, args.count, args.rate, kind)
+            print_row(label, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--room-sizes', type=lambda v: [int(x) for x in v.split(',')], default=[10, 50, 200])
+    parser.add_argument('--events', type=lambda v: v.split(','), default=['seek', 'chat'],
+                        help='comma separated: seek, chat')
+    parser.add_argument('--count', type=int, default=50, help='broadcasts sent per scenario')
+    parser.add_argument('--rate', type=float, default=20.0, help='broadcasts per second')
+    parser.add_argument('--users', type=int, default=10, help='distinct participant accounts')
+    parser.add_argument('--mq', choices=['single', 'redis'], default='single')
+    parser.add_argument('--nodes', type=int, default=1, help='server processes (requires --mq redis)')
+    parser.add_argument('--redis-url', default='redis://localhost:6379')
+    parser.add_argument('--url', action='append', help='attach to running node(s) instead of spawning')
+    parser.add_argument('--server-pid', type=int, action='append', help='pids of the --url nodes')
+    parser.add_argument('--port', type=int, default=5080)
+    args = parser.parse_args()
+
+    if args.nodes > 1 and args.mq != 'redis':
+        parser.error('--nodes > 1 needs --mq redis, otherwise broadcasts cannot cross processes')
+
+    raise_fd_limit()
+    if args.url:
+        stats = [ProcStats(pid) for pid in (args.server_pid or [])]
+        asyncio.run(run_all(args.url, stats, args, 'external'))
+        return
+
+    env = {'SOCKETIO_MESSAGE_QUEUE': ''}
+    if args.mq == 'redis':
+        base = args.redis_url.rstrip('/')
+        env = {'REDIS_URL': f'{base}/0', 'SOCKETIO_MESSAGE_QUEUE': f'{base}/1'}
+
+    nodes = []
+    try:
+        work_dir = None
+        for i in range(args.nodes):
+            node = ServerProcess(args.port + i, env=env, work_dir=work_dir).__enter__()
+            work_dir = node.work_dir
+            nodes.append(node)
+        label = f'{args.mq} x{args.nodes}'
+        asyncio.run(run_all([n.url for n in nodes], [ProcStats(n.pid) for n in nodes], args, label))
+    finally:
+        for node in nodes:
+            node.__exit__(None, None, None)
+
+
+if __name__ == '__main__':
+    main()
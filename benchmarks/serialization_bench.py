@@ -0,0 +1,130 @@
+"""Serialization throughput of the feed and room-list payloads.
+
+Loads --videos videos and --rooms rooms into a scratch database, then times
+the two halves of a response separately, in process, without HTTP:
+
+- building the dicts: the old hand-written code, `Schema.dump()` and the
+  compiled dumpers from app/schemas.py;
+- encoding them: the stdlib with Flask's default settings and the app's JSON
+  provider (orjson when installed).
+
+    python benchmarks/serialization_bench.py --videos 36 --rooms 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def seed(db, models, videos: int, rooms: int):
+    owner = models.User(username='bench_owner', email='owner@bench', login_code='0000', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+    channel = models.Channel(author_id=owner.id, name='bench channel', description='Канал для замеров')
+    db.session.add(channel)
+    db.session.flush()
+    now = datetime.utcnow()
+    db.session.add_all(models.Video(
+        channel_id=channel.id, title=f'Видео {i}', description='описание ' * 20, file_path=f'/missing/{i}.mp4',
+        duration=60 + i, status='ready', tags='bench,video', views_count=i * 10, likes_count=i,
+        created_at=now - timedelta(minutes=i)) for i in range(videos))
+    db.session.flush()
+    video_id = models.Video.query.first().id
+    db.session.add_all(models.Room(owner_id=owner.id, video_id=video_id, name=f'Room {i}',
+                                   last_activity=now) for i in range(rooms))
+    db.session.commit()
+
+
+def legacy_video(v, thumbnail_url):
+    return {
+        'id': v.id, 'title': v.title, 'description': v.description, 'duration': v.duration,
+        'category': v.category or 'other', 'tags': v.tags, 'access_level': v.access_level,
+        'views_count': v.views_count or 0, 'likes_count': v.likes_count, 'dislikes_count': v.dislikes_count,
+        'comments_count': v.comments_count or 0, 'thumbnail_url': thumbnail_url(v),
+        'created_at': v.created_at.isoformat(), 'channel': {'id': v.channel.id, 'name': v.channel.name},
+    }
+
+
+def legacy_room(r, count):
+    return {
+        'id': r.id, 'owner_id': r.owner_id, 'video_id': r.video_id, 'name': r.name,
+        'max_participants': r.max_participants, 'current_participants': count,
+        'last_activity': r.last_activity.isoformat() if r.last_activity else None,
+        'created_at': r.created_at.isoformat(),
+    }
+
+
+def rate(fn, seconds: float) -> float:
+    """Calls per second of `fn`, run for about `seconds`."""
+    calls, started = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--videos', type=int, default=36, help='feed size (the feed sends 3 x 12)')
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=1.0, help='time per measurement')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='json-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+    os.environ.setdefault('LOG_FILE', os.path.join(work_dir, 'app.log'))
+    os.environ.setdefault('SOCKETIO_MESSAGE_QUEUE', '')
+    os.environ['STATS_AGGREGATOR'] = 'False'
+    logging.disable(logging.INFO)
+    sys.path.insert(0, ROOT_DIR)
+
+    from sqlalchemy.orm import joinedload
+    from app import create_app, db, models
+    from app.json_provider import orjson
+    from app.schemas import dump_feed_video, dump_room
+    from app.services.video_service import VideoService
+
+    app = create_app('benchmark')
+    with app.app_context():
+        seed(db, models, args.videos, args.rooms)
+        videos = models.Video.query.options(joinedload(models.Video.channel)).all()
+        rooms = models.Room.query.all()
+        builders = {
+            'feed': {
+                'hand-written': lambda: [legacy_video(v, VideoService.get_thumbnail_url) for v in videos],
+                'Schema.dump': lambda: dump_feed_video.schema.dump(videos, many=True),
+                'compiled': lambda: [dump_feed_video(v) for v in videos],
+            },
+            'rooms': {
+                'hand-written': lambda: [legacy_room(r, 0) for r in rooms],
+                'Schema.dump': lambda: dump_room.schema.dump(rooms, many=True),
+                'compiled': lambda: [dict(dump_room(r), current_participants=0) for r in rooms],
+            },
+        }
+        print(f'{args.videos} videos, {args.rooms} rooms, orjson {"installed" if orjson else "missing"}')
+        for payload, variants in builders.items():
+            print(f'\n{payload}: building dicts')
+            for name, fn in variants.items():
+                print(f'  {name:<16} {rate(fn, args.seconds):>10.0f} payloads/s')
+
+            data = variants['compiled']()
+            print(f'{payload}: encoding ({len(json.dumps(data))} bytes)')
+            print(f"  {'stdlib':<16} {rate(lambda: json.dumps(data, sort_keys=True), args.seconds):>10.0f} payloads/s")
+            app.json.use_orjson = False
+            print(f"  {'provider/std':<16} {rate(lambda: app.json.dumps(data), args.seconds):>10.0f} payloads/s")
+            if orjson is not None:
+                app.json.use_orjson = True
+                print(f"  {'provider/orjson':<16} {rate(lambda: app.json.dumps(data), args.seconds):>10.0f} payloads/s")
+
+
+if __name__ == '__main__':
+    main()
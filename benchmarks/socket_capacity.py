@@ -0,0 +1,93 @@
+"""How many room sockets can one server process hold, and what does each cost?
+
+Opens --clients Socket.IO connections, joins them to rooms of --room-size
+with real session tokens, holds them idle and reports server RSS growth per
+connection and idle CPU. By default it spawns `wsgi.py` (eventlet) on a
+scratch SQLite DB:
+
+    python benchmarks/socket_capacity.py --clients 5000
+    SOCKETIO_ASYNC_MODE=gevent python benchmarks/socket_capacity.py --clients 5000
+
+To measure an already running server pass --url and --server-pid.
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from common import (ProcStats, ServerProcess, create_room, join_room_socket,
+                    raise_fd_limit, register_user, upload_video)
+
+
+async def run(url: str, stats: ProcStats, clients: int, room_size: int, users: int, concurrency: int,
+              hold: float):
+    async with aiohttp.ClientSession() as http:
+        accounts = [await register_user(http, url, 'cap') for _ in range(max(1, users))]
+        video_id = await upload_video(http, url, accounts[0][1])
+        room_ids = [
+            await create_room(http, url, accounts[0][1], video_id, max_participants=room_size + users)
+            for _ in range(-(-clients // room_size))
+        ]
+
+    baseline_rss = stats.rss_kb() if stats else 0
+    sockets, failures = [], []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def connect(i):
+        async with sem:
+            try:
+                # Accounts are reused round-robin: registering thousands of users
+                # would mostly benchmark password hashing.
+                room_id = room_ids[i // room_size]
+                sockets.append(await join_room_socket(url, room_id, accounts[i % len(accounts)][1]))
+            except Exception as e:
+                failures.append(str(e))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(i) for i in range(clients)))
+    connect_time = time.perf_counter() - started
+
+    loaded_rss = stats.rss_kb() if stats else 0
+    cpu_before = stats.cpu_seconds() if stats else 0.0
+    await asyncio.sleep(hold)
+    idle_cpu = (stats.cpu_seconds() - cpu_before) / hold if stats else 0.0
+
+    print(f'connected sockets:     {len(sockets)} / {clients} in {len(room_ids)} rooms ({len(failures)} failed)')
+    print(f'connect+join time:     {connect_time:.1f}s ({len(sockets) / max(connect_time, 1e-9):.0f} joins/s)')
+    if stats:
+        grown = max(0, loaded_rss - baseline_rss)
+        print(f'server RSS:            {baseline_rss / 1024:.1f} MiB -> {loaded_rss / 1024:.1f} MiB')
+        print(f'memory per connection: {grown / max(len(sockets), 1):.1f} KiB')
+        print(f'idle server CPU:       {idle_cpu * 100:.1f}% of one core over {hold:.0f}s')
+    if failures:
+        print(f'first failure:         {failures[0]}')
+
+    await asyncio.gather(*(s.disconnect() for s in sockets), return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--room-size', type=int, default=100, help='sockets per room')
+    parser.add_argument('--users', type=int, default=10, help='distinct accounts shared by the sockets')
+    parser.add_argument('--concurrency', type=int, default=200, help='simultaneous connection attempts')
+    parser.add_argument('--hold', type=float, default=10.0, help='seconds to hold the sockets idle')
+    parser.add_argument('--url', help='attach to a running server instead of spawning wsgi.py')
+    parser.add_argument('--server-pid', type=int, help='pid of the --url server for CPU/RSS numbers')
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    print(f'file descriptor limit: {raise_fd_limit()}')
+    if args.url:
+        stats = ProcStats(args.server_pid) if args.server_pid else None
+        asyncio.run(run(args.url, stats, args.clients, args.room_size, args.users, args.concurrency, args.hold))
+        return
+    with ServerProcess(args.port) as server:
+        asyncio.run(run(server.url, ProcStats(server.pid), args.clients, args.room_size, args.users,
+                        args.concurrency, args.hold))
+
+
+if __name__ == '__main__':
+    main()
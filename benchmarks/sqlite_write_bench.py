@@ -0,0 +1,194 @@
+"""Mixed read/write throughput on a SQLite file, with and without tuning.
+
+Threads hammer the same paths the app does under load: feed-style reads, view
+counter increments and room position updates. Each scenario runs in its own
+process on a fresh database file:
+
+    baseline  default pysqlite settings, every write is its own transaction
+    pragmas   WAL, synchronous=NORMAL, busy_timeout, cache/mmap (SQLITE_TUNING)
+    queue     pragmas + the single-writer queue (SQLITE_WRITE_QUEUE)
+
+    python benchmarks/sqlite_write_bench.py --threads 16 --seconds 10 --write-ratio 0.3
+
+Queued writes are only durable after the final flush, so its time is counted
+in the elapsed time and the view counters are checked against the number of
+increments issued. Write latency is per call: until the commit without the
+queue, but only until the write is enqueued with it (marked `enqueue`), so
+those percentiles are not comparable with the others; compare writes/s.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+SCENARIOS = {
+    'baseline': {'SQLITE_TUNING': 'False', 'SQLITE_WRITE_QUEUE': 'False'},
+    'pragmas': {'SQLITE_TUNING': 'True', 'SQLITE_WRITE_QUEUE': 'False'},
+    'queue': {'SQLITE_TUNING': 'True', 'SQLITE_WRITE_QUEUE': 'True'},
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def seed(db, models, videos: int, rooms: int):
+    owner = models.User(username='bench', email='bench@example.com', login_code='0001')
+    owner.set_password('bench-password')
+    db.session.add(owner)
+    db.session.flush()
+    channel = models.Channel(author_id=owner.id, name='bench')
+    db.session.add(channel)
+    db.session.flush()
+    video_ids = []
+    for i in range(videos):
+        video = models.Video(channel_id=channel.id, title=f'video {i}', file_path='/dev/null', duration=60,
+                             status='ready')
+        db.session.add(video)
+        db.session.flush()
+        video_ids.append(video.id)
+    room_ids = []
+    for i in range(rooms):
+        room = models.Room(owner_id=owner.id, video_id=video_ids[i % len(video_ids)])
+        db.session.add(room)
+        db.session.flush()
+        room_ids.append(room.id)
+    db.session.commit()
+    return video_ids, room_ids
+
+
+def run_scenario(args):
+    logging.disable(logging.INFO)
+    sys.path.insert(0, ROOT_DIR)
+    from app import create_app, db, models
+    from app.write_queue import write_queue
+
+    app = create_app('benchmark')
+    with app.app_context():
+        video_ids, room_ids = seed(db, models, args.videos, args.rooms)
+
+    stats = {'reads': 0, 'writes': 0, 'increments': 0, 'errors': 0, 'write_latency': [], 'first_error': None}
+    stats_lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed_value):
+        rnd = random.Random(seed_value)
+        reads = writes = increments = errors = 0
+        latencies = []
+        first_error = None
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    if rnd.random() < args.write_ratio:
+                        if rnd.random() < 0.5:
+                            write_queue.increment(models.Video, rnd.choice(video_ids), 'views_count')
+                            increments += 1
+                        else:
+                            write_queue.update(models.Room, rnd.choice(room_ids),
+                                               current_position=rnd.randint(0, 3600))
+                        writes += 1
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        models.Video.query.filter_by(status='ready', access_level='public') \
+                            .order_by(models.Video.created_at.desc()).limit(12).all()
+                        db.session.get(models.Video, rnd.choice(video_ids))
+                        db.session.rollback()
+                        reads += 1
+                except Exception as e:
+                    db.session.rollback()
+                    errors += 1
+                    first_error = first_error or str(e).splitlines()[0]
+        with stats_lock:
+            stats['reads'] += reads
+            stats['writes'] += writes
+            stats['increments'] += increments
+            stats['errors'] += errors
+            stats['write_latency'].extend(latencies)
+            stats['first_error'] = stats['first_error'] or first_error
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    write_queue.flush()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stored_views = db.session.query(db.func.sum(models.Video.views_count)).scalar() or 0
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+    print('RESULT ' + json.dumps({
+        'journal': journal_mode,
+        'reads_per_s': stats['reads'] / elapsed,
+        'writes_per_s': stats['writes'] / elapsed,
+        'write_p50_ms': percentile(stats['write_latency'], 50) * 1000,
+        'write_p99_ms': percentile(stats['write_latency'], 99) * 1000,
+        # With the queue, increment()/update() return once the write is queued.
+        'write_latency': 'enqueue' if write_queue.enabled else 'commit',
+        'errors': stats['errors'],
+        'lost_views': stats['increments'] - stored_views,
+        'first_error': stats['first_error'],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    parser.add_argument('--videos', type=int, default=200)
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--scenarios', type=lambda v: v.split(','), default=list(SCENARIOS))
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_scenario(args)
+        return
+
+    print(f"{'scenario':<10} {'journal':<8} {'reads/s':>9} {'writes/s':>9} {'w p50 ms':>9} {'w p99 ms':>9} "
+          f"{'w until':>8} {'errors':>7} {'lost':>5}")
+    for name in args.scenarios:
+        with tempfile.TemporaryDirectory(prefix='sqlite-bench-') as work_dir:
+            env = dict(os.environ, **SCENARIOS[name])
+            env.update({
+                'FLASK_ENV': 'benchmark',
+                'LOG_FILE': os.path.join(work_dir, 'app.log'),
+                'DATABASE_URL': f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+                'REDIS_URL': env.get('REDIS_URL', 'redis://localhost:6379/0'),
+                'SOCKETIO_MESSAGE_QUEUE': '',
+            })
+            cmd = [sys.executable, os.path.abspath(__file__), '--scenario', name,
+                   '--threads', str(args.threads), '--seconds', str(args.seconds),
+                   '--write-ratio', str(args.write_ratio), '--videos', str(args.videos),
+                   '--rooms', str(args.rooms)]
+            out = subprocess.run(cmd, env=env, cwd=work_dir, capture_output=True, text=True)
+            lines = [line for line in out.stdout.splitlines() if line.startswith('RESULT ')]
+            if not lines:
+                print(f'{name:<10} failed: {out.stderr.strip().splitlines()[-1:]}')
+                continue
+            r = json.loads(lines[-1][len('RESULT '):])
+            print(f"{name:<10} {r['journal']:<8} {r['reads_per_s']:>9.0f} {r['writes_per_s']:>9.0f} "
+                  f"{r['write_p50_ms']:>9.2f} {r['write_p99_ms']:>9.2f} {r['write_latency']:>8} "
+                  f"{r['errors']:>7} {r['lost_views']:>5}")
+            if r['first_error']:
+                print(f"{'':<10} first error: {r['first_error'][:100]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from celery import Celery
+from celery.schedules import crontab
 
 load_dotenv()
 
@@ -24,3 +25,16 @@ class ContextTask(celery.Task):
 
 
 celery.Task = ContextTask
+
+celery.conf.beat_schedule = {
+    'compact-notifications': {
+        'task': 'celery_worker.compact_notifications',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+
+
+@celery.task
+def compact_notifications():
+    from app.services.notification_service import NotificationService
+    return NotificationService.compact()
@@ -22,6 +22,41 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
+    # Apply pending schema migrations on boot. Production runs `flask db-upgrade` instead.
+    SCHEMA_AUTO_MIGRATE = os.environ.get('SCHEMA_AUTO_MIGRATE', 'True').lower() == 'true'
+
+    # Read replica for @read_only views, see app/db_routing.py.
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL') or None
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 2))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 5))
+
+    # PostgreSQL profile (ignored on SQLite), see app/postgres_tuning.py.
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 90))
+    DB_PROCESS_COUNT = int(os.environ.get('DB_PROCESS_COUNT') or (
+        int(os.environ.get('WEB_CONCURRENCY', 1)) + int(os.environ.get('CELERY_CONCURRENCY', 0))
+    ))
+    DB_THREADS_PER_PROCESS = int(os.environ.get('DB_THREADS_PER_PROCESS', 10))
+    DB_POOL_SIZE = int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_APPLICATION_NAME = os.environ.get('DB_APPLICATION_NAME', 'videohosting')
+    # PgBouncer in transaction mode: per-transaction SET LOCAL instead of startup options.
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'False').lower() == 'true'
+
+    # SQLite profile (ignored on other databases), see app/sqlite_tuning.py.
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'True').lower() == 'true'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))
+    # Buffer view counters and room positions and apply them from one writer thread.
+    SQLITE_WRITE_QUEUE = os.environ.get('SQLITE_WRITE_QUEUE', 'True').lower() == 'true'
+    SQLITE_WRITE_QUEUE_INTERVAL_MS = int(os.environ.get('SQLITE_WRITE_QUEUE_INTERVAL_MS', 50))
 
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
 
@@ -33,12 +68,39 @@ class Config:
 
     UPLOAD_FOLDER = _abs_path(os.environ.get('UPLOAD_FOLDER') or os.path.join('uploads', 'videos'))
     THUMBNAIL_FOLDER = _abs_path(os.environ.get('THUMBNAIL_FOLDER') or os.path.join('uploads', 'thumbnails'))
+    # Resized WebP/AVIF copies of thumbnails, made on first request (app/services/thumbnail_service.py).
+    # AVIF needs an ffmpeg built with libaom: THUMBNAIL_FORMATS=avif,webp.
+    THUMBNAIL_DERIVATIVE_FOLDER = _abs_path(os.environ.get('THUMBNAIL_DERIVATIVE_FOLDER')
+                                            or os.path.join('uploads', 'thumbnails', 'derived'))
+    THUMBNAIL_WIDTHS = [int(w) for w in os.environ.get('THUMBNAIL_WIDTHS', '320,640,1280').split(',')]
+    THUMBNAIL_FORMATS = os.environ.get('THUMBNAIL_FORMATS', 'webp').split(',')
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    THUMBNAIL_MAX_CONCURRENT = int(os.environ.get('THUMBNAIL_MAX_CONCURRENT', 2))
+    THUMBNAIL_GENERATE_WAIT = float(os.environ.get('THUMBNAIL_GENERATE_WAIT', 5.0))
+    THUMBNAIL_GENERATE_TIMEOUT = int(os.environ.get('THUMBNAIL_GENERATE_TIMEOUT', 30))
+    THUMBNAIL_DERIVATIVE_MAX_AGE = int(os.environ.get('THUMBNAIL_DERIVATIVE_MAX_AGE', 365 * 24 * 3600))
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 524288000))
     ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv'}
 
     VIDEO_PROCESSING_ENABLED = os.environ.get('VIDEO_PROCESSING_ENABLED', 'True').lower() == 'true'
-
-    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or 'redis://localhost:6379/1'
+    # Seek-preview sprite sheets and WebVTT track, built after upload (app/services/preview_service.py).
+    PREVIEW_ASYNC = os.environ.get('PREVIEW_ASYNC', 'True').lower() == 'true'
+    PREVIEW_FOLDER = _abs_path(os.environ.get('PREVIEW_FOLDER') or os.path.join('uploads', 'previews'))
+    PREVIEW_INTERVAL = int(os.environ.get('PREVIEW_INTERVAL', 5))
+    PREVIEW_MAX_FRAMES = int(os.environ.get('PREVIEW_MAX_FRAMES', 1000))
+    # From this interval on only keyframes are decoded, which is much faster on long videos.
+    PREVIEW_KEYFRAMES_ONLY_INTERVAL = int(os.environ.get('PREVIEW_KEYFRAMES_ONLY_INTERVAL', 10))
+    PREVIEW_TILE_WIDTH = int(os.environ.get('PREVIEW_TILE_WIDTH', 160))
+    PREVIEW_TILE_HEIGHT = int(os.environ.get('PREVIEW_TILE_HEIGHT', 90))
+    PREVIEW_COLUMNS = int(os.environ.get('PREVIEW_COLUMNS', 10))
+    PREVIEW_ROWS = int(os.environ.get('PREVIEW_ROWS', 10))
+    PREVIEW_JPEG_QUALITY = int(os.environ.get('PREVIEW_JPEG_QUALITY', 5))
+    PREVIEW_MAX_CONCURRENT = int(os.environ.get('PREVIEW_MAX_CONCURRENT', 1))
+    PREVIEW_GENERATE_TIMEOUT = int(os.environ.get('PREVIEW_GENERATE_TIMEOUT', 600))
+    PREVIEW_MAX_AGE = int(os.environ.get('PREVIEW_MAX_AGE', 365 * 24 * 3600))
+
+    # Set SOCKETIO_MESSAGE_QUEUE to an empty string to keep broadcasts in-process.
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', 'redis://localhost:6379/1') or None
     SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE') or 'threading'
 
     CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL') or 'redis://localhost:6379/2'
@@ -47,6 +109,43 @@ class Config:
     DEFAULT_MAX_PARTICIPANTS = int(os.environ.get('DEFAULT_MAX_PARTICIPANTS', 10))
     SPONSOR_MAX_PARTICIPANTS = int(os.environ.get('SPONSOR_MAX_PARTICIPANTS', -1))
     INACTIVE_ROOM_RETENTION_HOURS = int(os.environ.get('INACTIVE_ROOM_RETENTION_HOURS', 24))
+    ROOM_CHAT_HISTORY_SIZE = int(os.environ.get('ROOM_CHAT_HISTORY_SIZE', 50))
+
+    # New-video notifications are inserted in a background task, this many subscribers per INSERT.
+    NOTIFICATION_FANOUT_ASYNC = os.environ.get('NOTIFICATION_FANOUT_ASYNC', 'True').lower() == 'true'
+    NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.environ.get('NOTIFICATION_FANOUT_CHUNK_SIZE', 1000))
+    # Cached unread badge counters are recounted from the DB once they expire.
+    NOTIFICATION_UNREAD_TTL = int(os.environ.get('NOTIFICATION_UNREAD_TTL', 3600))
+    NOTIFICATIONS_PAGE_SIZE = int(os.environ.get('NOTIFICATIONS_PAGE_SIZE', 50))
+    # Read notifications older than this are deleted by the compaction job.
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 30))
+    NOTIFICATION_COMPACTION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_COMPACTION_BATCH_SIZE', 5000))
+
+    # Admin dashboard (app/stats.py)
+    STATS_AGGREGATOR = os.environ.get('STATS_AGGREGATOR', 'True').lower() == 'true'
+    STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', 60))
+    STATS_SAMPLE_INTERVAL = int(os.environ.get('STATS_SAMPLE_INTERVAL', 60))
+    STATS_SERIES_HOURS = int(os.environ.get('STATS_SERIES_HOURS', 168))
+
+    # API responses are encoded with orjson when it is installed (app/json_provider.py).
+    JSON_USE_ORJSON = os.environ.get('JSON_USE_ORJSON', 'True').lower() == 'true'
+
+    # ETags and Cache-Control on public read endpoints (app/http_cache.py)
+    HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE_ENABLED', 'True').lower() == 'true'
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', 30))
+    # ETags roll over at least this often, which bounds staleness of view counts.
+    HTTP_CACHE_REVALIDATE_WINDOW = int(os.environ.get('HTTP_CACHE_REVALIDATE_WINDOW', 60))
+    HTTP_CACHE_VERSION_TTL = int(os.environ.get('HTTP_CACHE_VERSION_TTL', 7 * 24 * 3600))
+    # Whole anonymous responses kept in Redis; a miss is recomputed by one request per key.
+    HTTP_RESPONSE_CACHE_ENABLED = os.environ.get('HTTP_RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    HTTP_RESPONSE_CACHE_TTL = int(os.environ.get('HTTP_RESPONSE_CACHE_TTL', 30))
+    HTTP_RESPONSE_CACHE_LOCK_TIMEOUT = int(os.environ.get('HTTP_RESPONSE_CACHE_LOCK_TIMEOUT', 10))
+    HTTP_RESPONSE_CACHE_WAIT = float(os.environ.get('HTTP_RESPONSE_CACHE_WAIT', 2.0))
+
+    # gzip for dynamic responses (app/compression.py); static files are precompressed by `flask build-assets`.
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1400))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
 
     RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL') or 'redis://localhost:6379/4'
     RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT') or '100 per hour'
@@ -69,6 +168,7 @@ class ProductionConfig(Config):
 
     DEBUG = False
     TESTING = False
+    SCHEMA_AUTO_MIGRATE = os.environ.get('SCHEMA_AUTO_MIGRATE', 'False').lower() == 'true'
 
     @classmethod
     def init_app(cls, app):
@@ -79,6 +179,13 @@ class ProductionConfig(Config):
             raise ValueError('SQLite should not be used in production')
 
 
+class BenchmarkConfig(Config):
+    """Production settings on a local SQLite file, for benchmarks/."""
+
+    DEBUG = False
+    TESTING = False
+
+
 class TestingConfig(Config):
 
     TESTING = True
@@ -96,6 +203,10 @@ class TestingConfig(Config):
 
     RATELIMIT_ENABLED = False
 
+    SQLITE_WRITE_QUEUE = False
+    NOTIFICATION_FANOUT_ASYNC = False
+    STATS_AGGREGATOR = False
+
     VIDEO_PROCESSING_ENABLED = False
 
 
@@ -103,5 +214,6 @@ config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
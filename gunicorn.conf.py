@@ -0,0 +1,28 @@
+"""Gunicorn settings for the production entry point (wsgi:app).
+
+Socket.IO long-polling needs sticky sessions, so run one worker per process
+behind a sticky load balancer, or set SOCKETIO_MESSAGE_QUEUE and scale out
+with several single-worker processes.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+# Same .env as wsgi.py, so both pick the same SOCKETIO_ASYNC_MODE.
+load_dotenv()
+
+_async_mode = os.environ.get('SOCKETIO_ASYNC_MODE') or 'eventlet'
+if _async_mode == 'threading':
+    _async_mode = 'eventlet'
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gevent' if _async_mode == 'gevent' else 'eventlet'
+# Upper bound of simultaneous clients (sockets + HTTP) per worker.
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 10000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
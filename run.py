@@ -1,4 +1,5 @@
 import os
+import click
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,11 +11,27 @@ app = create_app()
 
 @app.cli.command()
 def init_db():
+    from app.schema_migration import upgrade
     with app.app_context():
-        db.create_all()
+        upgrade()
         print('Database initialized successfully.')
 
 
+@app.cli.command()
+def db_upgrade():
+    """Apply pending schema migrations."""
+    from app.schema_migration import current_version, head_version, upgrade
+    with app.app_context():
+        before = current_version()
+        applied = upgrade()
+        if not applied:
+            print(f'Schema is up to date (version {before}).')
+            return
+        for name in applied:
+            print(f'Applied {name}')
+        print(f'Schema version: {current_version()} (head {head_version()})')
+
+
 @app.cli.command()
 def drop_db():
     with app.app_context():
@@ -25,6 +42,59 @@ def drop_db():
             print('Operation cancelled.')
 
 
+@app.cli.command()
+def audit_queries():
+    """EXPLAIN every hot query and fail if any of them needs a full table scan."""
+    from app.query_plans import audit_queries as run_audit
+    with app.app_context():
+        results = run_audit()
+    failed = [name for name, result in results.items() if result['full_scans']]
+    for name, result in results.items():
+        print(f"{'FULL SCAN' if result['full_scans'] else 'ok':<10} {name}")
+        for line in result['plan']:
+            print(f'           {line}')
+    if failed:
+        print(f"{len(failed)} hot queries fall back to a full scan: {', '.join(failed)}")
+        raise SystemExit(1)
+    print(f'All {len(results)} hot queries use an index.')
+
+
+@app.cli.command()
+@click.option('--days', type=int, default=None, help='Retention window (default: NOTIFICATION_RETENTION_DAYS).')
+def compact_notifications(days):
+    """Delete read notifications older than the retention window."""
+    from app.services.notification_service import NotificationService
+    with app.app_context():
+        deleted = NotificationService.compact(retention_days=days)
+    print(f'Deleted {deleted} read notifications.')
+
+
+@app.cli.command()
+@click.option('--video-id', type=int, default=None, help='Only this video (default: every ready video without previews).')
+def generate_previews(video_id):
+    """Build seek-preview sprites and WebVTT tracks, e.g. for videos uploaded before they existed."""
+    from app.models import Video
+    from app.services.preview_service import PreviewService
+    with app.app_context():
+        if video_id is not None:
+            ids = [video_id]
+        else:
+            ids = [v.id for v in Video.query.filter_by(status='ready').order_by(Video.id)
+                   if PreviewService.get_track_url(v) is None]
+        built = sum(PreviewService.generate(i) for i in ids)
+    print(f'Built previews for {built} of {len(ids)} videos.')
+
+
+@app.cli.command()
+def build_assets():
+    """Fingerprint and precompress static files into static/dist (restart workers to pick it up)."""
+    from app.assets import brotli, build_assets as build
+    manifest = build(app.static_folder)
+    for source, target in sorted(manifest.items()):
+        print(f'{source} -> {target}')
+    print(f"Built {len(manifest)} assets (gzip{', brotli' if brotli else ''}).")
+
+
 @app.shell_context_processor
 def make_shell_context():
     from app import models
@@ -0,0 +1,72 @@
+"""Production entry point.
+
+Runs the app on a cooperative (green-thread) worker so every Socket.IO
+connection costs a greenlet instead of an OS thread. Monkey patching has to
+happen before anything imports socket/threading, which is why this module
+does it first and only then builds the app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app     # recommended
+    python wsgi.py                            # single process, same server
+
+SOCKETIO_ASYNC_MODE selects the worker: 'eventlet' (default) or 'gevent'.
+FLASK_ENV defaults to 'production' here (no debug, no SQL echo).
+"""
+
+import os
+
+# Only fills os.environ, so it is safe before patching, and it must run before
+# SOCKETIO_ASYNC_MODE is read: load_dotenv() never overrides variables already set.
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE') or 'eventlet'
+if ASYNC_MODE == 'threading':
+    ASYNC_MODE = 'eventlet'
+
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+else:
+    raise RuntimeError(f'Unsupported SOCKETIO_ASYNC_MODE for wsgi.py: {ASYNC_MODE}')
+
+# redis-py is pure Python and becomes cooperative after patching. psycopg2 is a
+# C extension and needs its wait callback swapped, otherwise every query blocks
+# the whole worker.
+try:
+    if ASYNC_MODE == 'eventlet':
+        from psycogreen.eventlet import patch_psycopg
+    else:
+        from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    PSYCOPG_GREEN = True
+except ImportError:
+    PSYCOPG_GREEN = False
+
+os.environ['SOCKETIO_ASYNC_MODE'] = ASYNC_MODE
+
+from app import create_app, socketio
+
+app = create_app(os.environ.get('FLASK_ENV') or 'production')
+
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    # sqlite3 calls are not cooperative: a slow write stalls every socket on
+    # this worker. Fine for demos, use PostgreSQL for real traffic.
+    app.logger.warning('Running a green-thread worker on SQLite; DB calls will block the event loop')
+elif app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres') and not PSYCOPG_GREEN:
+    app.logger.warning('psycogreen is not installed: every PostgreSQL query will block the event loop '
+                       '(pip install psycogreen)')
+
+
+if __name__ == '__main__':
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', '5000'))
+    server_options = {}
+    if ASYNC_MODE == 'eventlet':
+        # eventlet.wsgi caps concurrent connections at 1024 unless told otherwise.
+        server_options['max_size'] = int(os.environ.get('EVENTLET_MAX_CONNECTIONS', 10000))
+    socketio.run(app, host=host, port=port, debug=False, use_reloader=False, log_output=False,
+                 **server_options)